@@ -1,9 +1,13 @@
 # ai_crawler.py
-import os, json, time, random, requests, datetime, pymysql, re
+import os, json, time, random, requests, datetime, pymysql, re, threading, argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from dotenv import load_dotenv  # 1. 라이브러리 불러오기
 
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
+import http_client
+import provider_health
+
 # ====== 환경설정 ======
 # DB 연결은 환경변수로도 설정 가능 (없으면 기본값 사용)
 DB = dict(
@@ -20,6 +24,16 @@ GEMINI_API_KEY    = os.getenv("GEMINI_API_KEY")
 DEEPINFRA_API_KEY = os.getenv("DEEPINFRA_API_KEY")
 
 
+# 제공자 동시 호출 설정
+MAX_WORKERS = 4            # 동시에 호출할 제공자 수 상한
+PROVIDER_DEADLINE = 120    # 제공자별 전체 제한 시간(초, 재시도/대기 포함) — 제공자 dict의 "deadline"으로 개별 지정 가능
+REQUEST_TIMEOUT = 45       # 시도 1회 최대 대기(초), 남은 시간이 더 짧으면 그만큼만 대기
+
+# hedge 요청 (기본 꺼짐: AI_HEDGE=1 또는 --hedge)
+HEDGE_ENABLED = os.getenv("AI_HEDGE", "0") == "1"
+HEDGE_MIN_SECONDS = 5      # hedge 기준 시간 하한(초)
+HEDGE_MIN_SAMPLES = 5      # p95를 hedge 기준으로 쓰기 위한 최소 시도 수
+
 # 주 1회 저장 키 (KST 기준 주차)
 KST = datetime.timezone(datetime.timedelta(hours=9))
 def week_key_kst():
@@ -100,10 +114,14 @@ def sanitize_numbers(obj):
     # ✅ 보정 없이 그대로 반환
     return nums, reason
 
-def save_db(week_key, provider, agency, numbers, reasoning, raw):
-    conn = pymysql.connect(**DB)
-    cur = conn.cursor()
-    cur.execute(
+def save_results(cur, rows):
+    """
+    결과 일괄 저장 (executemany 1회)
+    rows: [(week_key, provider, agency, numbers, reasoning, raw), ...]
+    """
+    if not rows:
+        return 0
+    cur.executemany(
         """
         INSERT INTO ai_recommendations(week_key, provider, agency, numbers_json, reasoning, raw_response)
         VALUES(%s, %s, %s, %s, %s, %s)
@@ -113,13 +131,175 @@ def save_db(week_key, provider, agency, numbers, reasoning, raw):
           raw_response = VALUES(raw_response),
           agency       = VALUES(agency)
         """,
-        (week_key, provider, agency, json.dumps(numbers, ensure_ascii=False), reasoning, json.dumps(raw, ensure_ascii=False)),
+        [
+            (week_key, provider, agency, json.dumps(numbers, ensure_ascii=False), reasoning, json.dumps(raw, ensure_ascii=False))
+            for week_key, provider, agency, numbers, reasoning, raw in rows
+        ],
     )
-    conn.close()
+    return len(rows)
+
+def is_valid_numbers(numbers):
+    """저장된 추천 번호가 쓸 만한지: 1~45 정수 6개, 중복 없음"""
+    if not isinstance(numbers, list) or len(numbers) != 6:
+        return False
+    if not all(isinstance(n, int) and not isinstance(n, bool) and 1 <= n <= 45 for n in numbers):
+        return False
+    return len(set(numbers)) == 6
+
+def load_completed(cur, week_key):
+    """이번 주(week_key)에 유효한 결과가 이미 저장된 제공자 이름 집합"""
+    cur.execute("SELECT provider, numbers_json FROM ai_recommendations WHERE week_key = %s", (week_key,))
+    completed = set()
+    for provider, numbers_json in cur.fetchall():
+        try:
+            numbers = json.loads(numbers_json) if numbers_json else None
+        except Exception:
+            numbers = None
+        if is_valid_numbers(numbers):
+            completed.add(provider)
+    return completed
+
+# ====== 제한 시간 유틸 ======
+def provider_deadline(p):
+    """제공자별 절대 마감 시각 (time.monotonic 기준)"""
+    return time.monotonic() + p.get("deadline", PROVIDER_DEADLINE)
+
+def attempt_timeout(p, deadline):
+    """이번 시도에 쓸 timeout (남은 시간이 없으면 TimeoutError)"""
+    remaining = deadline - time.monotonic()
+    if remaining <= 1:
+        raise TimeoutError(f"{p['name']}: 제한 시간({p.get('deadline', PROVIDER_DEADLINE)}s) 초과")
+    return min(REQUEST_TIMEOUT, remaining)
+
+def sleep_before_retry(seconds, deadline):
+    """재시도 대기 (마감 시각을 넘기지 않도록)"""
+    time.sleep(max(0.0, min(seconds, deadline - time.monotonic())))
+
+# ====== 호출 기록 / hedge ======
+ATTEMPTS = provider_health.AttemptLog()
+_HEDGE_FUTURES = []          # 먼저 끝난 쪽을 쓰고 남은 hedge 요청 (기록 저장 전에 끝날 때까지 대기)
+_hedge_lock = threading.Lock()
+
+class AttemptError(Exception):
+    """시도 1회 실패 (outcome / http_status / 응답 본문은 기록용)"""
+    def __init__(self, message, outcome, http_status=None, data=None):
+        super().__init__(message)
+        self.outcome = outcome
+        self.http_status = http_status
+        self.data = data
+
+def usage_of(p, data):
+    """응답 본문 → (prompt_tokens, completion_tokens, total_tokens)"""
+    if not isinstance(data, dict):
+        return (None, None, None)
+    if p["type"] == "gemini_rest":
+        u = data.get("usageMetadata") or {}
+        return (u.get("promptTokenCount"), u.get("candidatesTokenCount"), u.get("totalTokenCount"))
+    u = data.get("usage") or {}
+    return (u.get("prompt_tokens"), u.get("completion_tokens"), u.get("total_tokens"))
+
+def timed_attempt(p, send, week_key, attempt_no, timeout, is_hedge=False):
+    """send(timeout) 1회 실행 + 지연 시간/HTTP 상태/결과/토큰 기록 → (j, data, valid)"""
+    started = time.perf_counter()
+    status, outcome, data, err = None, provider_health.OK, None, None
+    try:
+        j, data, valid = send(timeout)
+        status = 200
+        if not valid:
+            outcome = "invalid_json"
+        return j, data, valid
+    except AttemptError as e:
+        status, outcome, data, err = e.http_status, e.outcome, e.data, e
+        raise
+    except requests.exceptions.Timeout as e:
+        outcome, err = "timeout", e
+        raise
+    except Exception as e:
+        outcome, err = "exception", e
+        raise
+    finally:
+        ATTEMPTS.record(week_key, p["name"], attempt_no, is_hedge, (time.perf_counter() - started) * 1000,
+                        status, outcome, usage_of(p, data), err)
+
+def hedged_attempt(p, send, week_key, attempt_no, timeout, hedge_after, deadline):
+    """
+    hedge 요청: 첫 요청이 hedge_after 초 안에 안 끝나면 같은 요청을 하나 더 보내고
+    먼저 도착한 '유효한 JSON' 응답을 사용 (둘 다 JSON이 아니면 먼저 온 응답, 둘 다 실패면 예외)
+    """
+    pool = ThreadPoolExecutor(max_workers=2)
+    futs = [pool.submit(timed_attempt, p, send, week_key, attempt_no, timeout)]
+    try:
+        done, _ = wait(futs, timeout=hedge_after)
+        remaining = deadline - time.monotonic()
+        if not done and remaining > 1:
+            print(f"[{p['name']}] {hedge_after:.1f}s 동안 응답 없음 → hedge 요청 추가")
+            futs.append(pool.submit(timed_attempt, p, send, week_key, attempt_no, min(REQUEST_TIMEOUT, remaining), True))
+
+        fallback, last_err = None, None
+        for fut in as_completed(futs):
+            try:
+                result = fut.result()
+            except Exception as e:
+                last_err = e
+                continue
+            if result[2]:
+                return result
+            fallback = fallback or result
+        if fallback:
+            return fallback
+        raise last_err
+    finally:
+        with _hedge_lock:
+            _HEDGE_FUTURES.extend(f for f in futs if not f.done())
+        pool.shutdown(wait=False)
+
+def hedge_delay(p, health):
+    """hedge 기준 시간(초): 제공자 설정 "hedge_after" > 최근 p95 지연 > 없음(hedge 안 함)"""
+    if p.get("hedge_after"):
+        return float(p["hedge_after"])
+    if health and health.get("p95_latency_ms") and (health.get("attempts") or 0) >= HEDGE_MIN_SAMPLES:
+        return max(HEDGE_MIN_SECONDS, health["p95_latency_ms"] / 1000)
+    return None
+
+def call_with_retries(p, send, backoff, retries, deadline, week_key, hedge_after=None, on_failure=None):
+    """공통 재시도 루프 (마감 시각 / hedge / 시도 기록)"""
+    last_err = None
+    for attempt in range(retries + 1):
+        # 마감 시각을 넘겼으면 더 시도하지 않고 바로 실패 처리
+        timeout = attempt_timeout(p, deadline)
+        try:
+            if hedge_after:
+                j, data, _ = hedged_attempt(p, send, week_key, attempt, timeout, hedge_after, deadline)
+            else:
+                j, data, _ = timed_attempt(p, send, week_key, attempt, timeout)
+            return normalize_payload(j), data
+        except Exception as e:
+            if not isinstance(e, AttemptError):
+                print(f"[{p['name']}] exception: {e}")
+            last_err = e
+            if on_failure:
+                on_failure(attempt, e)
+            sleep_before_retry(backoff(attempt), deadline)
+    raise last_err or RuntimeError(f"{p['name']}: 호출 실패")
+
+def parse_json_text(text):
+    """모델 출력 → (dict, JSON 파싱 성공 여부)"""
+    text = strip_code_fences(text)
+    try:
+        return json.loads(text), True
+    except Exception:
+        m = re.search(r"\{.*\}", text or "", flags=re.DOTALL)
+        if m:
+            try:
+                return json.loads(m.group(0)), True
+            except Exception:
+                pass
+    return {"numbers": [], "reasoning": text}, False
 
 # ====== 호출 함수들 ======
-def ask_openai_compatible(p, retries=2):
+def ask_openai_compatible(p, retries=2, deadline=None, week_key=None, hedge_after=None):
     """OpenAI 호환(chat.completions) 엔드포인트용"""
+    deadline = deadline or provider_deadline(p)
     if not p.get("key"):
         raise RuntimeError(f"{p['name']}: API 키가 설정되지 않았습니다.")
 
@@ -136,52 +316,32 @@ def ask_openai_compatible(p, retries=2):
     if p.get("supports_json_response_format"):
         payload["response_format"] = {"type": "json_object"}
 
-    last_err = None
-    for attempt in range(retries + 1):
-        try:
-            r = requests.post(p["url"], headers=headers, json=payload, timeout=45)
-            if r.status_code != 200:
-                print(f"[{p['name']}] HTTP {r.status_code}: {r.text[:400]}")
-                last_err = RuntimeError(f"http {r.status_code}")
-                # 첫 시도 실패 시 response_format 제거 재시도(미지원인 모델 대비)
-                if attempt == 0 and payload.get("response_format"):
-                    payload.pop("response_format", None)
-                time.sleep(1 + attempt)
-                continue
+    def send(timeout):
+        # 공용 세션(keep-alive) 사용, 재시도/헤지는 call_with_retries가 담당하므로 POST 자체 재시도 없음
+        r = http_client.post(p["url"], headers=headers, json=payload, timeout=timeout)
+        if r.status_code != 200:
+            print(f"[{p['name']}] HTTP {r.status_code}: {r.text[:400]}")
+            raise AttemptError(f"http {r.status_code}", "http_error", r.status_code)
 
-            data = r.json()
-            choices = data.get("choices")
-            if not choices:
-                print(f"[{p['name']}] Unexpected body (no choices): {json.dumps(data)[:400]}")
-                last_err = RuntimeError("no choices in response")
-                time.sleep(1 + attempt)
-                continue
-
-            content = choices[0]["message"]["content"]
-            text = strip_code_fences(content)
-            try:
-                j = json.loads(text)
-            except Exception:
-                m = re.search(r"\{.*\}", text, flags=re.DOTALL)
-                if m:
-                    try:
-                        j = json.loads(m.group(0))
-                    except Exception:
-                        j = {"numbers": [], "reasoning": text}
-                else:
-                    j = {"numbers": [], "reasoning": text}
-            j = normalize_payload(j)
-            return j, data
+        data = r.json()
+        choices = data.get("choices")
+        if not choices:
+            print(f"[{p['name']}] Unexpected body (no choices): {json.dumps(data)[:400]}")
+            raise AttemptError("no choices in response", "bad_response", r.status_code, data)
 
+        j, valid = parse_json_text(choices[0]["message"]["content"])
+        return j, data, valid
 
-        except Exception as e:
-            print(f"[{p['name']}] exception: {e}")
-            last_err = e
-            time.sleep(1 + attempt)
+    def on_failure(attempt, err):
+        # 첫 시도 HTTP 실패 시 response_format 제거 재시도(미지원인 모델 대비)
+        if attempt == 0 and getattr(err, "outcome", None) == "http_error" and payload.get("response_format"):
+            payload.pop("response_format", None)
 
-    raise last_err or RuntimeError("ask_openai_compatible failed")
+    return call_with_retries(p, send, lambda attempt: 1 + attempt, retries, deadline,
+                             week_key or week_key_kst(), hedge_after, on_failure)
 
-def ask_gemini_rest(p, retries=2):
+def ask_gemini_rest(p, retries=2, deadline=None, week_key=None, hedge_after=None):
+    deadline = deadline or provider_deadline(p)
     if not p.get("key"):
         raise RuntimeError(f"{p['name']}: API 키가 설정되지 않았습니다.")
 
@@ -196,63 +356,124 @@ def ask_gemini_rest(p, retries=2):
         }
     }
 
-    last_err = None
-    for attempt in range(retries + 1):
+    def send(timeout):
+        r = http_client.post(url, headers={"Content-Type": "application/json"}, json=body, timeout=timeout)
+        if r.status_code != 200:
+            print(f"[{p['name']}] HTTP {r.status_code}: {r.text[:400]}")
+            raise AttemptError(f"http {r.status_code}", "http_error", r.status_code)
+
+        data = r.json()
+        candidates = data.get("candidates") or []
+        if not candidates:
+            print(f"[{p['name']}] Unexpected body (no candidates): {json.dumps(data)[:400]}")
+            raise AttemptError("no candidates", "bad_response", r.status_code, data)
+
+        parts = candidates[0].get("content", {}).get("parts", [])
+        text = "".join(pt.get("text","") for pt in parts if isinstance(pt, dict)).strip()
+        # response_mime_type 덕분에 여기 text는 JSON 문자열일 확률이 매우 높음
         try:
-            r = requests.post(url, headers={"Content-Type": "application/json"}, json=body, timeout=45)
-            if r.status_code != 200:
-                print(f"[{p['name']}] HTTP {r.status_code}: {r.text[:400]}")
-                last_err = RuntimeError(f"http {r.status_code}")
-                # 503/과부하 등 일시 에러에는 지수 백오프
-                time.sleep(1.5 ** attempt)
-                continue
-
-            data = r.json()
-            candidates = data.get("candidates") or []
-            if not candidates:
-                print(f"[{p['name']}] Unexpected body (no candidates): {json.dumps(data)[:400]}")
-                last_err = RuntimeError("no candidates")
-                time.sleep(1.5 ** attempt)
-                continue
-
-            parts = candidates[0].get("content", {}).get("parts", [])
-            text = "".join(pt.get("text","") for pt in parts if isinstance(pt, dict)).strip()
-            # response_mime_type 덕분에 여기 text는 JSON 문자열일 확률이 매우 높음
-            try:
-                j = json.loads(strip_code_fences(text))
-            except Exception:
-                j = {"numbers": [], "reasoning": text}
-
-            j = normalize_payload(j)
-            return j, data
-
-        except Exception as e:
-            print(f"[{p['name']}] exception: {e}")
-            last_err = e
-            time.sleep(1.5 ** attempt)
+            return json.loads(strip_code_fences(text)), data, True
+        except Exception:
+            return {"numbers": [], "reasoning": text}, data, False
 
-    raise last_err or RuntimeError("ask_gemini_rest failed")
+    # 503/과부하 등 일시 에러에는 지수 백오프
+    return call_with_retries(p, send, lambda attempt: 1.5 ** attempt, retries, deadline,
+                             week_key or week_key_kst(), hedge_after)
 
-def ask_provider(p):
+def ask_provider(p, **kwargs):
     if p["type"] == "openai_compatible":
-        return ask_openai_compatible(p)
+        return ask_openai_compatible(p, **kwargs)
     elif p["type"] == "gemini_rest":
-        return ask_gemini_rest(p)
+        return ask_gemini_rest(p, **kwargs)
     else:
         raise RuntimeError(f"Unknown provider type: {p['type']}")
 
 # ====== 메인 루틴 ======
-def fetch_all_providers():
+def run_provider(p, week_key, health=None, hedge=False):
+    """제공자 1개 호출 (스레드에서 실행) → (numbers, reasoning, raw)"""
+    kwargs = {"week_key": week_key}
+    if provider_health.breaker_state(health) == provider_health.HALF_OPEN:
+        # 쿨다운이 지난 실패 제공자: 재시도 없이 1회만 시험
+        print(f"[{p['name']}] 서킷 half-open: 시험 호출 1회")
+        kwargs["retries"] = 0
+    elif hedge:
+        kwargs["hedge_after"] = hedge_delay(p, health)
+    j, raw = ask_provider(p, **kwargs)
+    nums, reason = sanitize_numbers(j)
+    return nums, reason, raw
+
+def print_attempt_summary(rows):
+    """이번 실행의 제공자별 시도 수 / 지연 / 토큰 / 결과"""
+    by_provider = {}
+    for row in rows:
+        by_provider.setdefault(row[1], []).append(row)
+    for provider, items in sorted(by_provider.items()):
+        latency = sum(r[4] for r in items)
+        tokens = sum(r[9] or 0 for r in items)
+        outcomes = ", ".join(f"{'H' if r[3] else '#'}{r[2]}:{r[6]}({r[4]}ms)" for r in items)
+        print(f"[STAT] {provider}: 시도 {len(items)}회, 누적 {latency / 1000:.1f}s, 토큰 {tokens} | {outcomes}")
+
+def fetch_all_providers(hedge=HEDGE_ENABLED, force=False):
+    """
+    모든 제공자를 동시에 호출 (스레드 풀, 제공자별 제한 시간)
+    - 이어하기: 이번 주(week_key_kst) 결과가 이미 유효하게 저장된 제공자는 다시 호출하지 않음
+      (행이 없거나 numbers_json이 비었거나 개수/범위가 잘못된 제공자만 호출, force=True면 전체 호출)
+    - 느린 제공자 하나가 전체 작업을 붙잡지 않도록 각 제공자는 자기 마감 시각 안에서만 재시도
+    - 지난 실행들의 상태(ai_provider_health)로 서킷이 열린 제공자는 호출하지 않음
+    - hedge=True면 첫 요청이 느릴 때(최근 p95 초과) 같은 요청을 하나 더 보내 먼저 온 응답 사용
+    - 결과/시도 기록/상태는 마지막에 연결 1개로 일괄 저장
+    """
     wk = week_key_kst()
-    for p in PROVIDERS:
-        try:
-            j, raw = ask_provider(p)
-            nums, reason = sanitize_numbers(j)
-            save_db(wk, p["name"], p.get("agency","unknown"), nums, reason, raw)
-            print(f"[OK] {p['name']} -> {wk} / {nums}")
-        except Exception as e:
-            # 완전 실패 시에도 빈 레코드라도 남기고 싶다면 여기서 처리
-            print(f"[FAIL] {p['name']}: {e}")
+    rows = []
+    started = time.perf_counter()
+
+    conn = pymysql.connect(**DB)
+    try:
+        with conn.cursor() as cur:
+            provider_health.ensure_tables(cur)
+            health = provider_health.load_health(cur)
+            completed = set() if force else load_completed(cur, wk)
+
+        targets = []
+        for p in PROVIDERS:
+            if p["name"] in completed:
+                print(f"[SKIP] {p['name']}: {wk} 결과 이미 저장됨 (--force로 다시 호출)")
+                continue
+            h = health.get(p["name"])
+            if provider_health.breaker_state(h) == provider_health.OPEN:
+                print(f"[SKIP] {p['name']}: 서킷 open (연속 실패 {h['consecutive_failures']}회, "
+                      f"{provider_health.BREAKER_COOLDOWN - (h['seconds_since_attempt'] or 0)}s 후 재시험)")
+                continue
+            targets.append(p)
+
+        if targets:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(targets))) as pool:
+                futures = {pool.submit(run_provider, p, wk, health.get(p["name"]), hedge): p for p in targets}
+                for fut in as_completed(futures):
+                    p = futures[fut]
+                    try:
+                        nums, reason, raw = fut.result()
+                        rows.append((wk, p["name"], p.get("agency","unknown"), nums, reason, raw))
+                        print(f"[OK] {p['name']} -> {wk} / {nums} ({time.perf_counter() - started:.1f}s)")
+                    except Exception as e:
+                        # 완전 실패 시에도 빈 레코드라도 남기고 싶다면 여기서 처리
+                        print(f"[FAIL] {p['name']}: {e} ({time.perf_counter() - started:.1f}s)")
+
+        # 결과를 쓰지 않은 hedge 요청도 토큰을 쓰므로 끝날 때까지 기다렸다가 함께 기록 (각 요청 timeout으로 상한 있음)
+        with _hedge_lock:
+            pending = list(_HEDGE_FUTURES)
+            _HEDGE_FUTURES.clear()
+        wait(pending)
+
+        print_attempt_summary(ATTEMPTS.rows())
+        http_client.print_metrics()
+        with conn.cursor() as cur:
+            saved = save_results(cur, rows)
+            provider_health.refresh_health(cur, ATTEMPTS.flush(cur))
+    finally:
+        conn.close()
+    print(f"[DONE] {wk}: 호출 {len(targets)}개 중 {saved}개 저장, 기존 완료 {len(completed)}개 "
+          f"({time.perf_counter() - started:.1f}s)")
 
 def strip_code_fences(text: str) -> str:
     if not isinstance(text, str):
@@ -293,4 +514,8 @@ def normalize_payload(j: dict) -> dict:
 
 
 if __name__ == "__main__":
-    fetch_all_providers()
+    parser = argparse.ArgumentParser(description="AI 제공자별 로또 번호 추천 수집")
+    parser.add_argument("--hedge", action="store_true", help="느린 요청에 hedge 요청 추가 (AI_HEDGE=1 과 동일)")
+    parser.add_argument("--force", action="store_true", help="이번 주 결과가 이미 있어도 모든 제공자 다시 호출")
+    args = parser.parse_args()
+    fetch_all_providers(hedge=args.hedge or HEDGE_ENABLED, force=args.force)
@@ -0,0 +1,102 @@
+"""
+API 응답 포맷터 (flask/app.py와 code/ 배치 작업이 같이 사용)
+- 배치가 미리 만들어두는 응답(response_blobs.py)과 API가 직접 만드는 응답이
+  항상 같은 모양이 되도록 포맷 로직은 이 파일 한 곳에만 둡니다.
+"""
+from datetime import datetime, date
+from decimal import Decimal
+
+
+def format_speetto_status_result(row):
+    """
+    모든 컬럼을 순회하며 JSON 직렬화가 불가능한 객체(datetime, date, decimal)를 변환합니다.
+    """
+    for key, value in row.items():
+        # datetime 또는 date 객체인 경우 ISO 포맷 문자열로 변환
+        if isinstance(value, (datetime, date)):
+            row[key] = value.isoformat()
+        # Decimal 객체인 경우 float으로 변환
+        elif isinstance(value, Decimal):
+            row[key] = float(value)
+    return row
+
+
+def format_pension_result(row):
+    return {
+        "round": row["round"],
+        "draw_date": row["draw_date"].isoformat(),
+        "first_prize": row.get("first_prize"),
+        "second_prize": row.get("second_prize"),
+        "third_prize": row.get("third_prize"),
+        "fourth_prize": row.get("fourth_prize"),
+        "fifth_prize": row.get("fifth_prize"),
+        "sixth_prize": row.get("sixth_prize"),
+        "seventh_prize": row.get("seventh_prize"),
+        "bonus": row.get("bonus")
+    }
+
+
+def format_lotto_result(row):
+    return {
+        "round": row["round"],
+        "draw_date": row["draw_date"].isoformat(),
+        "numbers": [row["num1"], row["num2"], row["num3"], row["num4"], row["num5"], row["num6"]],
+        "bonus": row["bonus"]
+    }
+
+
+def format_lotto_numbers_result(row):
+    # 1. 안드로이드 기존 모델 호환용 필드
+    formatted = {
+        "round": row["ltEpsd"],
+        "draw_date": row["ltRflYmd"].isoformat() if isinstance(row["ltRflYmd"], (date, datetime)) else row["ltRflYmd"],
+        "numbers": [row["tm1WnNo"], row["tm2WnNo"], row["tm3WnNo"], row["tm4WnNo"], row["tm5WnNo"], row["tm6WnNo"]],
+        "bonus": row["bnsWnNo"]
+    }
+
+    # 2. 이월(0명)과 누락(데이터 없음) 판별 로직
+    # 모든 주요 수치가 0이면 데이터가 아예 없는 '누락' 회차로 판단합니다.
+    is_data_missing = (row.get("rnk1WnAmt", 0) == 0 and
+                       row.get("rnk1WnNope", 0) == 0 and
+                       row.get("wholEpsdSumNtslAmt", 0) == 0)
+
+    # 3. 추가 상세 정보 처리 (누락 시 null 반환)
+    detail_keys = {
+        "first_prize_amt": "rnk1WnAmt",
+        "first_winner_count": "rnk1WnNope",
+        "second_prize_amt": "rnk2WnAmt",
+        "total_sales": "wholEpsdSumNtslAmt"
+    }
+
+    for key, db_col in detail_keys.items():
+        val = row.get(db_col, 0)
+        if is_data_missing:
+            formatted[key] = None # 데이터 자체가 없으면 null
+        elif db_col == "rnk1WnNope" and val == 0:
+            formatted[key] = 0    # 다른 데이터는 있는데 당첨자만 0이면 '이월'
+        else:
+            formatted[key] = int(val) if isinstance(val, (int, float, Decimal)) else val
+
+    return formatted
+
+
+def format_combo_analysis_result(row):
+    """lotto_carryover_combo_analysis 1행 → /lotto/carryover/list-all 항목"""
+    # history_rounds 가공 (쉼표 분리 -> 5개 제한)
+    raw_history = row['history_rounds'].split(',') if row['history_rounds'] else []
+    # 빈 문자열('')이 들어있는 경우 필터링 및 최대 5개 슬라이싱
+    clean_history = [int(r) for r in raw_history if r.strip()][:5]
+
+    return {
+        "id": row['id'],
+        "target_round": row['target_round'],
+        "combo_count": row['combo_count'],
+        "include_bonus": bool(row['include_bonus']),
+        "numbers": [int(n) for n in row['numbers_combo'].split(',')],
+        "total_occur": row['total_occur'],
+        "total_appear": row['total_appear'],
+        "hit_rate": f"{row['hit_rate']}%",
+        "history_sample": clean_history, # 최대 5개
+        "history_count": len(raw_history), # 전체 몇 번이었는지 참고용
+        "created_at": row['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+    }
@@ -1,6 +1,11 @@
+import time
+import argparse
 import pymysql
 from itertools import combinations
 
+import response_blobs
+from lotto_index import LottoIndex, mask_of
+
 # DB 설정
 DB_CONFIG = {
     'host': '127.0.0.1',
@@ -11,114 +16,228 @@ DB_CONFIG = {
     'cursorclass': pymysql.cursors.DictCursor
 }
 
-def initialize_carryover_stats():
+def analyze_combos(index, target_round, last_main, last_bonus):
+    """
+    최신 회차 번호 조합(1~6개) × 보너스 포함/제외 이월 적중률 계산
+    - 조합마다 FIND_IN_SET 스캔 + 기회 회차마다 추가 조회하던 방식(N+1 SQL)을
+      비트마스크 행렬 연산 한 번으로 대체 (결과 값/저장 순서는 기존과 동일)
+    - 반환: lotto_carryover_combo_analysis INSERT용 튜플 리스트
+    """
+    combos = []
+    for include_bonus in [0, 1]:
+        candidates = last_main + ([last_bonus] if include_bonus else [])
+        for r in range(1, 7):
+            if r > len(candidates): continue
+            for combo in combinations(candidates, r):
+                combos.append((include_bonus, r, sorted(list(combo))))
+
+    # 과거 기회(Opportunity): 조합이 메인+보너스(7개)에 모두 포함되었던 target_round 이전 회차
+    # 이월 성공: 바로 다음 회차 메인(6개)에 조합 전체가 다시 등장
+    appear, success = index.combo_carryover_many([mask_of(c) for _, _, c in combos], before_round=target_round)
+    total_appears = appear.sum(axis=1)
+    total_occurs = success.sum(axis=1)
+    next_rounds = index.rounds[1:]
+
+    combo_rows = []
+    for (include_bonus, r, combo), total_appear, total_occur, hits in zip(combos, total_appears, total_occurs, success):
+        total_appear, total_occur = int(total_appear), int(total_occur)
+        success_rounds = next_rounds[hits[:-1]].tolist()
+        hit_rate = round((total_occur / total_appear) * 100, 2) if total_appear > 0 else 0
+        history_str = ",".join(map(str, sorted(success_rounds, reverse=True)))
+        combo_rows.append((target_round, r, include_bonus, ",".join(map(str, combo)),
+                           total_occur, total_appear, hit_rate, history_str))
+    return combo_rows
+
+
+_ROWS_SQL = "SELECT ltEpsd, ltRflYmd, tm1WnNo, tm2WnNo, tm3WnNo, tm4WnNo, tm5WnNo, tm6WnNo, bnsWnNo FROM lotto_numbers ORDER BY ltEpsd ASC"
+
+_HISTORY_SQL = "INSERT INTO lotto_carryover_history (round, match_count, match_count_with_bonus, matched_numbers, bonus_matched_numbers) VALUES (%s, %s, %s, %s, %s)"
+
+
+def history_row(prev, curr):
+    """이전 회차 → 이번 회차 이월 결과 (lotto_carryover_history INSERT용 튜플)"""
+    prev_main = {prev[f'tm{j}WnNo'] for j in range(1, 7)}
+    prev_bonus = {prev['bnsWnNo']}
+    curr_main = {curr[f'tm{j}WnNo'] for j in range(1, 7)}
+
+    main_carry = prev_main & curr_main
+    bonus_carry = prev_bonus & curr_main
+    all_carry = main_carry | bonus_carry
+
+    return (
+        curr['ltEpsd'], len(main_carry), len(all_carry),
+        ",".join(map(str, sorted(list(all_carry)))),
+        ",".join(map(str, sorted(list(bonus_carry))))
+    )
+
+
+def write_combo_analysis(cursor, rows, index=None):
+    """
+    최신 회차 기준 조합 분석을 다시 계산해 교체 (이전 기준 회차 행은 삭제)
+    - 호출한 쪽의 트랜잭션 안에서 DELETE + INSERT 하므로 커밋 전까지 API는 기존 결과를 봅니다.
+    - index: 전체 회차가 들어 있는 LottoIndex (있으면 rows는 마지막 행만 사용)
+    """
+    latest = rows[-1]
+    target_round = latest['ltEpsd']
+    last_main = [latest[f'tm{j}WnNo'] for j in range(1, 7)]
+    last_bonus = latest['bnsWnNo']
+
+    print(f"3. {target_round}회차 기반 모든 번호 조합(1~6개) 적중률 분석 시작...")
+    started = time.perf_counter()
+
+    # 이미 읽어둔 rows로 비트마스크 인덱스 구성 (추가 DB 조회 없음)
+    if index is None:
+        index = LottoIndex()
+        index.append_rows(rows)
+    combo_rows = analyze_combos(index, target_round, last_main, last_bonus)
+
+    cursor.execute("DELETE FROM lotto_carryover_combo_analysis")
+    cursor.executemany("""
+        INSERT INTO lotto_carryover_combo_analysis 
+        (target_round, combo_count, include_bonus, numbers_combo, total_occur, total_appear, hit_rate, history_rounds)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, combo_rows)
+    print(f"   > 조합 {len(combo_rows)}개 분석 완료 ({(time.perf_counter() - started) * 1000:.1f}ms)")
+    return target_round
+
+
+def load_rows(cursor):
+    """이월 분석용 lotto_numbers 전체 (회차 오름차순)"""
+    cursor.execute(_ROWS_SQL)
+    return cursor.fetchall()
+
+
+def rebuild_carryover_stats(cursor, rows=None):
+    """
+    [복구용] 히스토리/요약/조합 분석 전체 재계산
+    - TRUNCATE(DDL → 암묵적 커밋) 대신 DELETE를 써서 전체가 한 트랜잭션으로 교체됩니다.
+    - rows: 이미 읽어둔 load_rows() 결과 (생략 시 직접 조회)
+    - 반환: 기준 회차 (데이터 없으면 None)
+    """
+    if rows is None:
+        rows = load_rows(cursor)
+    if not rows:
+        print("❌ 분석할 로또 데이터가 없습니다.")
+        return None
+
+    # --- 1. 기존 데이터 초기화 ---
+    print("1. 모든 통계 데이터 초기화 중...")
+    cursor.execute("DELETE FROM lotto_carryover_history")
+    cursor.execute("UPDATE lotto_carryover_summary SET occurrence_total = 0, occurrence_with_bonus = 0")
+
+    # --- 2. 히스토리 및 요약 테이블 생성 ---
+    summary_6 = {i: 0 for i in range(7)}
+    summary_7 = {i: 0 for i in range(7)}
+    history_data = []
+
+    print(f"2. {len(rows)}회차 히스토리 분석 시작...")
+    for i in range(1, len(rows)):
+        row = history_row(rows[i-1], rows[i])
+        history_data.append(row)
+        summary_6[row[1]] += 1
+        summary_7[row[2]] += 1
+
+    # 히스토리/요약 저장
+    cursor.executemany(_HISTORY_SQL, history_data)
+    cursor.executemany(
+        "UPDATE lotto_carryover_summary SET occurrence_total = %s, occurrence_with_bonus = %s WHERE match_count = %s",
+        [(summary_6[i], summary_7[i], i) for i in range(7)]
+    )
+    print("✅ 히스토리 및 요약 업데이트 완료.")
+
+    # --- 3. [핵심] 최신 회차 조합 분석 (Combo Analysis) ---
+    return write_combo_analysis(cursor, rows)
+
+
+def update_carryover_incremental(cursor, rows=None, index=None):
+    """
+    [기본] 새로 들어온 회차만 반영
+    - 히스토리 마지막 회차 이후의 회차만 히스토리 행 추가 + 요약 테이블에 +1 누적
+    - 조합 분석은 새 기준 회차에 대해서만 계산 (이미 최신이면 건너뜀)
+    - 히스토리가 비어 있으면 전체 재계산으로 대체
+    - rows: 이미 읽어둔 load_rows() 결과 (생략 시 직접 조회)
+    - index: 최신 LottoIndex (post_ingest.py) — 있으면 히스토리 마지막 회차 이후 행만 인덱스에서 복원하고
+      lotto_numbers를 다시 읽지 않음
+    - 반환: 기준 회차 (변경 없으면 None)
+    """
+    cursor.execute("SELECT MAX(round) AS last_round FROM lotto_carryover_history")
+    last_round = (cursor.fetchone() or {}).get('last_round')
+    if not last_round:
+        print("ℹ️ 이월 히스토리가 비어 있어 전체 재계산을 진행합니다.")
+        return rebuild_carryover_stats(cursor, rows)
+
+    if index is not None:
+        start = index.position(last_round)
+        if start < 0:
+            print(f"ℹ️ 히스토리 마지막 회차({last_round}회)가 lotto_numbers에 없어 전체 재계산을 진행합니다.")
+            return rebuild_carryover_stats(cursor)
+        rows = index.rows(start)
+    elif rows is None:
+        rows = load_rows(cursor)
+    if not rows:
+        print("❌ 분석할 로또 데이터가 없습니다.")
+        return None
+
+    # --- 1. 신규 회차 히스토리 + 요약 증분 ---
+    history_data = [history_row(rows[i-1], rows[i]) for i in range(1, len(rows)) if rows[i]['ltEpsd'] > last_round]
+    if history_data:
+        delta_6 = {i: 0 for i in range(7)}
+        delta_7 = {i: 0 for i in range(7)}
+        for row in history_data:
+            delta_6[row[1]] += 1
+            delta_7[row[2]] += 1
+
+        cursor.executemany(_HISTORY_SQL, history_data)
+        cursor.executemany("""
+            UPDATE lotto_carryover_summary
+            SET occurrence_total = occurrence_total + %s,
+                occurrence_with_bonus = occurrence_with_bonus + %s
+            WHERE match_count = %s
+        """, [(delta_6[i], delta_7[i], i) for i in range(7) if delta_6[i] or delta_7[i]])
+        for row in history_data:
+            print(f"📊 {row[0]}회차 통계 반영: 제외({row[1]}개), 포함({row[2]}개) | 번호: {row[3]}")
+
+    # --- 2. 조합 분석 (기준 회차가 바뀐 경우만) ---
+    target_round = rows[-1]['ltEpsd']
+    cursor.execute("SELECT COUNT(*) AS cnt FROM lotto_carryover_combo_analysis WHERE target_round = %s", (target_round,))
+    if not history_data and cursor.fetchone()['cnt'] > 0:
+        print(f"✅ 이미 최신 상태입니다. (기준 회차: {target_round}회)")
+        return None
+    return write_combo_analysis(cursor, rows, index)
+
+
+def run(rebuild=False):
     conn = pymysql.connect(**DB_CONFIG)
     try:
         with conn.cursor() as cursor:
-            # --- 1. 기존 데이터 초기화 ---
-            print("1. 모든 통계 데이터 초기화 중...")
-            cursor.execute("TRUNCATE TABLE lotto_carryover_history")
-            cursor.execute("TRUNCATE TABLE lotto_carryover_combo_analysis")
-            cursor.execute("UPDATE lotto_carryover_summary SET occurrence_total = 0, occurrence_with_bonus = 0")
-
-            # --- 2. 기본 데이터 로드 ---
-            cursor.execute("SELECT ltEpsd, tm1WnNo, tm2WnNo, tm3WnNo, tm4WnNo, tm5WnNo, tm6WnNo, bnsWnNo FROM lotto_numbers ORDER BY ltEpsd ASC")
-            rows = cursor.fetchall()
-            if not rows:
-                print("❌ 분석할 로또 데이터가 없습니다.")
-                return
-
-            # --- 3. 히스토리 및 요약 테이블 생성 ---
-            summary_6 = {i: 0 for i in range(7)}
-            summary_7 = {i: 0 for i in range(7)}
-            history_data = []
-
-            print(f"2. {len(rows)}회차 히스토리 분석 시작...")
-            for i in range(1, len(rows)):
-                prev, curr = rows[i-1], rows[i]
-                prev_main = {prev[f'tm{j}WnNo'] for j in range(1, 7)}
-                prev_bonus = {prev['bnsWnNo']}
-                curr_main = {curr[f'tm{j}WnNo'] for j in range(1, 7)}
-
-                main_carry = prev_main & curr_main
-                bonus_carry = prev_bonus & curr_main
-                all_carry = main_carry | bonus_carry
-
-                match_6, match_7 = len(main_carry), len(all_carry)
-                history_data.append((
-                    curr['ltEpsd'], match_6, match_7,
-                    ",".join(map(str, sorted(list(all_carry)))),
-                    ",".join(map(str, sorted(list(bonus_carry))))
-                ))
-                summary_6[match_6] += 1
-                summary_7[match_7] += 1
-
-            # 히스토리/요약 저장
-            cursor.executemany("INSERT INTO lotto_carryover_history (round, match_count, match_count_with_bonus, matched_numbers, bonus_matched_numbers) VALUES (%s, %s, %s, %s, %s)", history_data)
-            for i in range(7):
-                cursor.execute("UPDATE lotto_carryover_summary SET occurrence_total = %s, occurrence_with_bonus = %s WHERE match_count = %s", (summary_6[i], summary_7[i], i))
-            
-            print("✅ 히스토리 및 요약 업데이트 완료.")
-
-            # --- 4. [핵심] 최신 회차 조합 분석 (Combo Analysis) ---
-            latest = rows[-1]
-            target_round = latest['ltEpsd']
-            last_main = [latest[f'tm{j}WnNo'] for j in range(1, 7)]
-            last_bonus = latest['bnsWnNo']
-            
-            print(f"3. {target_round}회차 기반 모든 번호 조합(1~6개) 적중률 분석 시작...")
-
-            for include_bonus in [0, 1]:
-                candidates = last_main + ([last_bonus] if include_bonus else [])
-                bonus_tag = "보너스 포함" if include_bonus else "보너스 제외"
-                
-                for r in range(1, 7):
-                    if r > len(candidates): continue
-                    print(f"   > {bonus_tag}: {r}개 조합 분석 중...")
-                    
-                    for combo in combinations(candidates, r):
-                        combo = sorted(list(combo))
-                        combo_str = ",".join(map(str, combo))
-                        
-                        # 과거 기회(Opportunity) 찾기
-                        # 해당 조합이 메인+보너스(7개)에 모두 포함되었던 회차들
-                        where_clauses = [f"FIND_IN_SET({n}, CONCAT_WS(',', tm1WnNo, tm2WnNo, tm3WnNo, tm4WnNo, tm5WnNo, tm6WnNo, bnsWnNo))" for n in combo]
-                        sql_appear = f"SELECT ltEpsd FROM lotto_numbers WHERE {' AND '.join(where_clauses)} AND ltEpsd < %s"
-                        cursor.execute(sql_appear, (target_round,))
-                        opp_rounds = [row['ltEpsd'] for row in cursor.fetchall()]
-                        
-                        total_appear = len(opp_rounds)
-                        success_rounds = []
-
-                        # 실제 이월 성공 여부 확인
-                        if total_appear > 0:
-                            for rd in opp_rounds:
-                                next_rd = rd + 1
-                                check_clauses = [f"FIND_IN_SET({n}, CONCAT_WS(',', tm1WnNo, tm2WnNo, tm3WnNo, tm4WnNo, tm5WnNo, tm6WnNo))" for n in combo]
-                                sql_check = f"SELECT COUNT(*) as ok FROM lotto_numbers WHERE ltEpsd = %s AND {' AND '.join(check_clauses)}"
-                                cursor.execute(sql_check, (next_rd,))
-                                if cursor.fetchone()['ok'] > 0:
-                                    success_rounds.append(next_rd)
-
-                        total_occur = len(success_rounds)
-                        hit_rate = round((total_occur / total_appear) * 100, 2) if total_appear > 0 else 0
-                        history_str = ",".join(map(str, sorted(success_rounds, reverse=True)))
-
-                        # 결과 저장
-                        cursor.execute("""
-                            INSERT INTO lotto_carryover_combo_analysis 
-                            (target_round, combo_count, include_bonus, numbers_combo, total_occur, total_appear, hit_rate, history_rounds)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """, (target_round, r, include_bonus, combo_str, total_occur, total_appear, hit_rate, history_str))
+            if rebuild:
+                target_round = rebuild_carryover_stats(cursor)
+            else:
+                target_round = update_carryover_incremental(cursor)
 
+            # 히스토리/요약/조합 분석을 한 번에 커밋 (API는 중간 상태를 보지 않음)
             conn.commit()
+            if target_round is None:
+                return
             print(f"🎉 모든 분석이 완료되었습니다! (기준 회차: {target_round}회)")
 
+        # ✅ /lotto/carryover/list-all 응답 사전 생성
+        response_blobs.rebuild(conn, response_blobs.CARRYOVER_LIST_ALL)
+
     except Exception as e:
         print(f"❌ 에러 발생: {e}")
         conn.rollback()
     finally:
         conn.close()
 
+
+def initialize_carryover_stats():
+    """전체 재계산 (python3 carryover_init.py --rebuild 와 동일)"""
+    run(rebuild=True)
+
+
 if __name__ == "__main__":
-    initialize_carryover_stats()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="로또 이월 통계 갱신 (기본: 신규 회차만 증분 반영)")
+    parser.add_argument("--rebuild", action="store_true", help="히스토리/요약/조합 분석 전체 재계산 (복구용)")
+    args = parser.parse_args()
+    run(rebuild=args.rebuild)
@@ -0,0 +1,60 @@
+"""
+데이터셋 버전 관리 (API 캐시 무효화용)
+- 크롤러/배치가 새 데이터를 커밋할 때 bump_versions()로 버전을 올리면,
+  Flask 워커들이 주기적으로 fetch_versions()를 읽어 해당 데이터셋의 캐시를 버립니다.
+- 크롤러(code/)와 API(flask/)가 같이 쓰는 모듈이므로 커서만 받고 DB 설정은 갖지 않습니다.
+"""
+
+# 데이터셋 이름 (캐시가 어떤 테이블 변경에 의존하는지 표현)
+LOTTO = "lotto"                              # lotto_numbers 신규 회차
+PENSION = "pension"                          # pension 신규 회차
+LOTTO_NUMBER_STATS = "lotto_number_stats"    # lotto_statistics.py
+PENSION_DIGIT_STATS = "pension_digit_stats"  # pension_statistics.py
+LOTTO_GAP_STATS = "lotto_gap_stats"          # lotto_gap_stats_main
+SPEETTO_STATUS = "speetto_status"            # speetto_status 내용 변경 (speetto_changes.py)
+
+
+def ensure_table(cursor):
+    """
+    테이블 생성 확인
+    ⚠️ DDL은 MySQL에서 암묵적 커밋을 일으키므로 트랜잭션 시작 전에 호출하세요.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS dataset_versions (
+      name VARCHAR(64) NOT NULL PRIMARY KEY,
+      version BIGINT NOT NULL DEFAULT 0,
+      updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def bump_versions(cursor, *names):
+    """데이터셋 버전 +1 (호출한 쪽 트랜잭션과 함께 커밋됨)"""
+    if not names:
+        return
+    cursor.executemany("""
+        INSERT INTO dataset_versions (name, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, [(n,) for n in names])
+
+
+def current_version(cursor, name) -> int:
+    """데이터셋 하나의 버전 (같은 트랜잭션에서 bump_versions 직후 읽으면 방금 올린 값, 없으면 0)"""
+    cursor.execute("SELECT version FROM dataset_versions WHERE name = %s", (name,))
+    row = cursor.fetchone()
+    if not row:
+        return 0
+    return int(row["version"] if isinstance(row, dict) else row[0])
+
+
+def fetch_versions(cursor) -> dict:
+    """{데이터셋 이름: 버전} (DictCursor / 기본 커서 모두 지원)"""
+    cursor.execute("SELECT name, version FROM dataset_versions")
+    versions = {}
+    for row in cursor.fetchall():
+        if isinstance(row, dict):
+            versions[row["name"]] = int(row["version"])
+        else:
+            versions[row[0]] = int(row[1])
+    return versions
@@ -0,0 +1,140 @@
+"""
+HTML 파싱 공용 모듈 (네이버 검색 결과 / 동행복권 통계 페이지 크롤러에서 사용)
+- 예전에는 큰 페이지 전체를 BeautifulSoup(html.parser) 트리로 만든 뒤 요소 몇 개만 읽었습니다.
+- parse(html, targets)는 필요한 하위 트리만 트리로 만들고, 백엔드를 골라 쓸 수 있습니다.
+    selectolax  : C(Modest/Lexbor) 파서, 전체를 파싱해도 가장 빠름 (pip install selectolax)
+    lxml        : BeautifulSoup + lxml 트리 빌더, SoupStrainer로 대상 하위 트리만 생성 (pip install lxml)
+    html.parser : 표준 라이브러리 파서 + SoupStrainer (추가 설치 없이 항상 사용 가능한 대체 경로)
+- 기본 백엔드는 환경변수 HTML_PARSER, 없으면 설치된 것 중 위 순서대로 선택
+- 어떤 백엔드든 Node(.text / .select / .select_one)로 같은 방식으로 읽습니다.
+
+targets: 파싱을 제한할 대상 목록 — "tag", ".class", "#id"를 섞어 써도 됩니다.
+         (SoupStrainer는 조건을 AND로만 묶으므로, 종류가 섞이면 종류별 SoupStrainer 중 하나라도 맞는 요소를 남김)
+"""
+import os
+import re
+import importlib.util
+
+BACKENDS = ("selectolax", "lxml", "html.parser")
+_MODULES = {"selectolax": "selectolax", "lxml": "lxml", "html.parser": "bs4"}
+
+
+def available_backends():
+    """설치된 백엔드 (빠른 순)"""
+    return [b for b in BACKENDS if importlib.util.find_spec(_MODULES[b]) is not None]
+
+
+def default_backend():
+    wanted = os.getenv("HTML_PARSER")
+    available = available_backends()
+    if wanted in available:
+        return wanted
+    return available[0] if available else "html.parser"
+
+
+def _target_kind(target):
+    return "." if target.startswith(".") else "#" if target.startswith("#") else "tag"
+
+
+def _single_strainer(kind, targets):
+    """한 종류(tag / .class / #id)로만 된 targets → SoupStrainer"""
+    from bs4 import SoupStrainer
+
+    if kind == ".":
+        # 파싱 중에는 class 값이 나뉘기 전 문자열("text _select_trigger")이라 목록/문자열 비교로는
+        # 여러 클래스를 가진 요소가 빠짐 → 단어 경계 정규식으로 비교
+        names = "|".join(re.escape(t[1:]) for t in targets)
+        return SoupStrainer(class_=re.compile(rf"(?:^|\s)(?:{names})(?:\s|$)"))
+    if kind == "#":
+        return SoupStrainer(id=[t[1:] for t in targets])
+    return SoupStrainer(list(targets))
+
+
+_ANY_STRAINER = None
+
+
+def _any_strainer(strainers):
+    """여러 SoupStrainer 중 하나라도 맞으면 통과하는 SoupStrainer (bs4는 설치돼 있을 때만 import)"""
+    global _ANY_STRAINER
+    if _ANY_STRAINER is None:
+        from bs4 import SoupStrainer
+
+        class AnyStrainer(SoupStrainer):
+            def __init__(self, strainers):
+                super().__init__()
+                self.strainers = strainers
+
+            # bs4 4.13+: 파싱 중 태그 생성 여부
+            def allow_tag_creation(self, nsprefix, name, attrs):
+                return any(s.allow_tag_creation(nsprefix, name, attrs) for s in self.strainers)
+
+            def allow_string_creation(self, string):
+                return False
+
+            # bs4 4.12 이하: 파싱 중 태그 생성 여부 (맞은 태그 이름/마크업 또는 None)
+            def search_tag(self, markup_name=None, markup_attrs={}):
+                for s in self.strainers:
+                    found = s.search_tag(markup_name, markup_attrs)
+                    if found:
+                        return found
+                return None
+
+            def search(self, markup):
+                for s in self.strainers:
+                    found = s.search(markup)
+                    if found:
+                        return found
+                return None
+
+        _ANY_STRAINER = AnyStrainer
+    return _ANY_STRAINER(strainers)
+
+
+def make_strainer(targets):
+    """targets → SoupStrainer (비어 있으면 None = 전체 파싱)"""
+    if not targets:
+        return None
+    groups = {}
+    for target in targets:
+        groups.setdefault(_target_kind(target), []).append(target)
+    strainers = [_single_strainer(kind, group) for kind, group in groups.items()]
+    return strainers[0] if len(strainers) == 1 else _any_strainer(strainers)
+
+
+class Node:
+    """백엔드별 요소(bs4 Tag / selectolax Node)를 같은 방식으로 읽는 래퍼"""
+
+    __slots__ = ("_node", "_selectolax")
+
+    def __init__(self, node, selectolax=False):
+        self._node = node
+        self._selectolax = selectolax
+
+    @property
+    def text(self):
+        return self._node.text(deep=True) if self._selectolax else self._node.get_text()
+
+    def select(self, css):
+        found = self._node.css(css) if self._selectolax else self._node.select(css)
+        return [Node(n, self._selectolax) for n in found]
+
+    def select_one(self, css):
+        found = self._node.css_first(css) if self._selectolax else self._node.select_one(css)
+        return Node(found, self._selectolax) if found is not None else None
+
+
+def parse(html, targets=None, backend=None):
+    """
+    HTML → 문서 Node
+    - targets: 실제로 읽을 요소들 (예: [".winning_number", ".bonus_number"]), bs4 백엔드에서 파싱 범위 제한
+    - backend: BACKENDS 중 하나 (생략 시 default_backend())
+    """
+    backend = backend or default_backend()
+    if backend == "selectolax":
+        from selectolax.parser import HTMLParser
+        return Node(HTMLParser(html), selectolax=True)
+    if backend not in BACKENDS:
+        raise ValueError(f"알 수 없는 HTML 파서: {backend} (가능: {', '.join(BACKENDS)})")
+
+    from bs4 import BeautifulSoup
+    return Node(BeautifulSoup(html, backend, parse_only=make_strainer(targets)))
@@ -0,0 +1,237 @@
+"""
+html_parse.py 백엔드별 파싱 시간 마이크로 벤치마크
+- 페이지마다: 예전 방식(html.parser 전체 트리) vs 설치된 각 백엔드(+ SoupStrainer 대상 제한)
+  파싱 + 요소 추출까지의 시간(중앙값, ms)을 비교하고, 추출 결과가 예전 방식과 같은지도 확인합니다.
+- 픽스처: FIXTURE_DIR(기본 code/fixtures, --dir로 변경)에 저장한 실제 페이지(아래 FIXTURES의 파일명)를 씁니다.
+  페이지는 --capture로 크롤러와 같은 방식(네이버 로또는 HTTP, 나머지는 Selenium 렌더링 후 page_source)으로 저장합니다.
+- 저장된 페이지가 없으면 그 페이지는 건너뜁니다. --synthetic을 주면 대신 크롤러가 읽는 구조(클래스/ID)를 흉내 낸
+  합성 페이지로 측정하지만, 합성 페이지 수치는 상대 비교용이며 실제 페이지와 크기/구조가 다릅니다.
+
+사용 예:
+    python3 html_parse_bench.py --capture            # 실제 페이지를 code/fixtures에 저장 (네트워크 + Chromium 필요)
+    python3 html_parse_bench.py --repeat 50
+    python3 html_parse_bench.py --synthetic          # 저장된 페이지가 없을 때 합성 페이지로 대신 측정
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import html_parse
+import http_client
+import lotto_crawler
+import lotto_statistics
+import pension_crawler
+import pension_statistics
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _noise(blocks):
+    """검색 결과/통계 페이지 주변 마크업 흉내 (광고, 다른 검색 결과, 스크립트 등)"""
+    parts = []
+    for i in range(blocks):
+        parts.append(
+            f'<div class="api_subject_bx" data-i="{i}"><div class="title_area"><h2>관련 결과 {i}</h2></div>'
+            f'<ul class="lst_total">' +
+            "".join(f'<li class="bx"><a href="/r/{i}/{j}" class="link_tit">문서 {j} 제목</a>'
+                    f'<div class="dsc_txt">설명 텍스트 {j} <b>로또</b> 당첨 정보 &amp; 기타</div>'
+                    f'<span class="sub_txt">2026.01.0{j % 9 + 1}.</span></li>' for j in range(8)) +
+            '</ul></div>'
+            f'<script>window.__state_{i} = {{"k": [{",".join(str(n) for n in range(40))}]}};</script>'
+        )
+    return "".join(parts)
+
+
+def _page(body, noise=300):
+    half = noise // 2
+    return (
+        '<!doctype html><html><head><meta charset="utf-8"><title>검색</title>'
+        '<style>.a{color:red}</style></head><body>'
+        f'<div id="header">{_noise(half)}</div><div id="main_pack">{body}</div>'
+        f'<div id="footer">{_noise(noise - half)}</div></body></html>'
+    )
+
+
+def synth_naver_lotto():
+    balls = "".join(f'<span class="ball type{n // 10}">{n}</span>' for n in (3, 11, 19, 27, 34, 42))
+    return _page(
+        '<div class="lotto_wrap"><div class="select_tab">'
+        '<a class="text _select_trigger" href="#">1205회차 (2026.01.03.)</a></div>'
+        f'<div class="win_number_box"><div class="winning_number">{balls}</div>'
+        '<div class="bonus_number"><span class="ball type4">45</span></div></div></div>'
+    )
+
+
+def synth_naver_pension():
+    balls = "".join(f'<span class="ball">{d}</span>' for d in "3482917")
+    rows = "".join(
+        f'<tr><td>{name}</td>' + "".join(f'<td class="type_bold">{d}</td>' for d in digits) + '</tr>'
+        for name, digits in (("2등", "482917"), ("보너스", "105263"))
+    )
+    return _page(
+        '<div class="lottery_wrap"><div class="select_tab">'
+        '<a class="text _select_trigger" href="#">296회차 (2026.01.08.)</a></div>'
+        f'<div class="winning_number">{balls}</div>'
+        f'<table class="win_table"><tbody>{rows}</tbody></table></div>'
+    )
+
+
+def synth_lotto_stats():
+    boxes = "".join(
+        f'<div class="result-ballBox"><span class="result-ball">{n}</span>'
+        f'<span class="result-txt">{150 + n}회</span></div>' for n in range(1, 46)
+    )
+    return _page(f'<div class="result-grid">{boxes}</div>', noise=120)
+
+
+def synth_pension_stats():
+    sections = "".join(
+        f'<div id="{div_id}" class="result-wrap">' +
+        "".join(f'<div class="result-ballBox"><span class="wf-ball">{d}</span>'
+                f'<span class="result-txt">{30 + d}회</span></div>' for d in range(10)) +
+        '</div>' for div_id in pension_statistics.ID_TO_POSITION
+    )
+    return _page(sections, noise=120)
+
+
+# 이름 → (파일명, 합성 함수, 파싱 대상, 추출 함수)
+FIXTURES = {
+    "naver_lotto": (
+        "naver_lotto.html", synth_naver_lotto, lotto_crawler.NAVER_TARGETS,
+        lambda doc: (doc.select_one("a._select_trigger").text.strip(),
+                     [b.text.strip() for b in doc.select(".winning_number .ball")],
+                     doc.select_one(".bonus_number .ball").text.strip()),
+    ),
+    "naver_pension": (
+        "naver_pension.html", synth_naver_pension, pension_crawler.NAVER_TARGETS,
+        lambda doc: (doc.select_one("a._select_trigger").text.strip(),
+                     [b.text.strip() for b in doc.select(".winning_number .ball")],
+                     [[td.text.strip() for td in tr.select("td")] for tr in doc.select("tr")]),
+    ),
+    "lotto_stats": (
+        "lotto_stats.html", synth_lotto_stats, [".result-ballBox"],
+        lambda doc: [(b.select_one(".result-ball").text, b.select_one(".result-txt").text)
+                     for b in doc.select(".result-ballBox")],
+    ),
+    "pension_stats": (
+        "pension_stats.html", synth_pension_stats, [f"#{i}" for i in pension_statistics.ID_TO_POSITION],
+        lambda doc: [[(b.select_one(".wf-ball").text, b.select_one(".result-txt").text)
+                      for b in doc.select_one(f"div#{i}").select(".result-ballBox")]
+                     for i in pension_statistics.ID_TO_POSITION],
+    ),
+}
+
+
+# 이름 → 실제 페이지 (URL, 브라우저 필요 여부, 렌더링 완료까지 기다릴 CSS, 먼저 클릭할 요소 ID)
+SOURCES = {
+    "naver_lotto": ("https://search.naver.com/search.naver?query=로또+1205회", False, None, None),
+    "naver_pension": ("https://search.naver.com/search.naver?query=연금복권+296회", True, ".winning_number .ball", None),
+    "lotto_stats": (lotto_statistics.URL, True, "#noDiv .result-ballBox", "li-2"),
+    "pension_stats": (pension_statistics.URL, True, "#wnBndDiv .result-ballBox", None),
+}
+
+
+def load_fixture(name, directory, synthetic=False):
+    """저장된 실제 페이지 → (html, "saved"), 없으면 synthetic일 때만 (합성 페이지, "synthetic"), 아니면 (None, path)"""
+    filename, synth, _, _ = FIXTURES[name]
+    path = os.path.join(directory, filename)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return f.read(), "saved"
+    if synthetic:
+        return synth(), "synthetic"
+    return None, path
+
+
+def capture_page(driver, url, wait_css, click_id):
+    """브라우저로 열어 렌더링이 끝난 page_source (크롤러와 같은 경로)"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    driver.get(url)
+    wait = WebDriverWait(driver, 20)
+    if click_id:
+        tab = wait.until(EC.element_to_be_clickable((By.ID, click_id)))
+        driver.execute_script("arguments[0].click();", tab)
+    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, wait_css)))
+    time.sleep(1)  # JS 렌더링 안정화
+    return driver.page_source
+
+
+def capture_fixtures(directory):
+    """SOURCES의 실제 페이지를 directory에 저장 (실패한 페이지는 건너뜀), 반환: 저장 수"""
+    os.makedirs(directory, exist_ok=True)
+    driver = None
+    saved = 0
+    try:
+        for name, (url, browser, wait_css, click_id) in SOURCES.items():
+            filename = FIXTURES[name][0]
+            try:
+                if browser:
+                    driver = driver or pension_crawler.new_driver()
+                    html = capture_page(driver, url, wait_css, click_id)
+                else:
+                    response = http_client.get(url, headers=lotto_crawler.HEADERS, timeout=10)
+                    response.raise_for_status()
+                    html = response.text
+            except Exception as e:
+                print(f"❌ {name} 저장 실패: {e}")
+                continue
+            with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+                f.write(html)
+            saved += 1
+            print(f"💾 {name} → {os.path.join(directory, filename)} ({len(html.encode('utf-8')):,} bytes)")
+    finally:
+        if driver is not None:
+            driver.quit()
+    return saved
+
+
+def time_parse(html, targets, backend, extract, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = extract(html_parse.parse(html, targets=targets, backend=backend))
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+def run(directory=FIXTURE_DIR, repeat=10, synthetic=False):
+    """반환: 측정한 페이지 수"""
+    backends = html_parse.available_backends()
+    print(f"🧪 사용 가능한 백엔드: {', '.join(backends)} (기본: {html_parse.default_backend()})")
+    for missing in sorted(set(html_parse.BACKENDS) - set(backends)):
+        print(f"   ∟ ⚠️ {missing} 미설치 → 측정 생략")
+
+    measured = 0
+    for name, (_, _, targets, extract) in FIXTURES.items():
+        html, source = load_fixture(name, directory, synthetic)
+        if html is None:
+            print(f"\n⚠️ {name}: 저장된 페이지 없음 ({source}) → 건너뜀 (--capture로 저장, 또는 --synthetic)")
+            continue
+        measured += 1
+        print(f"\n📄 {name} ({source}, {len(html.encode('utf-8')):,} bytes)")
+        baseline_ms, expected = time_parse(html, None, "html.parser", extract, repeat)
+        print(f"   html.parser (전체 트리, 예전 방식) {baseline_ms:8.2f} ms")
+        for backend in backends:
+            ms, result = time_parse(html, targets, backend, extract, repeat)
+            mark = "✅" if result == expected else "❌ 추출 결과 다름"
+            print(f"   {backend:<11} (대상 제한)        {ms:8.2f} ms  ×{baseline_ms / ms:5.1f}  {mark}")
+    return measured
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTML 파싱 백엔드 벤치마크 (저장된 실제 페이지 기준)")
+    parser.add_argument("--dir", default=FIXTURE_DIR, help=f"저장된 실제 페이지 폴더 (기본: {FIXTURE_DIR})")
+    parser.add_argument("--repeat", type=int, default=10, help="페이지·백엔드별 반복 횟수 (중앙값)")
+    parser.add_argument("--capture", action="store_true", help="실제 페이지를 --dir에 저장하고 종료")
+    parser.add_argument("--synthetic", action="store_true", help="저장된 페이지가 없으면 합성 페이지로 대신 측정")
+    args = parser.parse_args()
+
+    if args.capture:
+        sys.exit(0 if capture_fixtures(args.dir) == len(SOURCES) else 1)
+    sys.exit(0 if run(args.dir, args.repeat, args.synthetic) else 1)
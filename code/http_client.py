@@ -0,0 +1,164 @@
+"""
+공용 HTTP 클라이언트 (code/ 크롤러 전체가 사용)
+- 호스트별 requests.Session 1개를 프로세스 안에서 재사용 → keep-alive로 TCP/TLS 핸드셰이크 재사용
+  (여러 스레드가 같은 호스트에 동시에 요청해도 되도록 연결 풀 크기 POOL_MAXSIZE)
+- 기본 timeout(연결, 읽기)을 모든 요청에 적용
+- 멱등 요청(GET 등)은 연결 오류/타임아웃/429·5xx에서 지수 백오프 + 지터로 재시도 (Retry-After 우선)
+  POST는 재시도하지 않음 (ai_crawler처럼 호출한 쪽이 자체 재시도/헤지를 하는 경우)
+- limiter(rate_limit.AdaptiveRateLimiter)를 넘기면 시도마다 예산을 지키고 429/503에서 감속
+- 호스트별 요청 수 / 오류 / 재시도 / 지연(p50·p95) / 받은 바이트를 모아 print_metrics()로 출력
+"""
+import time
+import random
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = (5, 15)     # (연결, 읽기) 초
+POOL_MAXSIZE = 8              # 호스트별 keep-alive 연결 수 (동시 요청 작업자 수 이상)
+RETRIES = 3                   # 멱등 요청 재시도 횟수
+BACKOFF_BASE = 0.5            # 재시도 대기: 0 ~ min(BACKOFF_MAX, BACKOFF_BASE × 2^시도) 사이 무작위 (full jitter)
+BACKOFF_MAX = 8.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+SLOWDOWN_STATUSES = (429, 503)   # limiter가 있으면 감속 대상
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+LATENCY_WINDOW = 500          # 호스트별 지연 백분위 계산에 쓰는 최근 요청 수
+
+_lock = threading.Lock()
+_sessions = {}
+_metrics = {}
+
+
+def _host(url):
+    return urlsplit(url).netloc
+
+
+def session_for(url):
+    """호스트별 공용 세션 (없으면 생성)"""
+    host = _host(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+class HostMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_in = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def snapshot(self):
+        ordered = sorted(self.latencies)
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 1) if ordered else None
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes_in": self.bytes_in,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "avg_ms": round(sum(ordered) / len(ordered), 1) if ordered else None,
+        }
+
+
+def _record(host, latency_ms, nbytes=0, error=False, retry=False):
+    with _lock:
+        m = _metrics.setdefault(host, HostMetrics())
+        m.requests += 1
+        m.errors += int(error)
+        m.retries += int(retry)
+        m.bytes_in += nbytes
+        m.latencies.append(latency_ms)
+
+
+def metrics():
+    """{호스트: {"requests", "errors", "retries", "bytes_in", "p50_ms", "p95_ms", "avg_ms"}}"""
+    with _lock:
+        return {host: m.snapshot() for host, m in _metrics.items()}
+
+
+def print_metrics():
+    for host, m in sorted(metrics().items()):
+        print(f"🌐 {host}: 요청 {m['requests']}회 (오류 {m['errors']}, 재시도 {m['retries']}), "
+              f"{m['bytes_in']:,} bytes, p50 {m['p50_ms']}ms / p95 {m['p95_ms']}ms")
+
+
+def retry_after(response):
+    """Retry-After 헤더(초)만 지원, 없거나 날짜 형식이면 None"""
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt, wait_hint=None):
+    """재시도 전 대기 시간 (Retry-After가 있으면 그 값)"""
+    if wait_hint is not None:
+        return min(wait_hint, BACKOFF_MAX * 4)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def request(method, url, *, retries=None, timeout=DEFAULT_TIMEOUT, limiter=None, idempotent=None, **kwargs):
+    """
+    공용 세션으로 요청 (requests.Session.request와 같은 인자)
+    - retries: 생략 시 RETRIES, 멱등이 아닌 요청은 항상 0
+    - 재시도 횟수를 다 쓰면 마지막 응답을 그대로 반환하거나 마지막 예외를 다시 발생
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    retries = (RETRIES if retries is None else retries) if idempotent else 0
+    host = _host(url)
+    session = session_for(url)
+
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            _record(host, (time.perf_counter() - started) * 1000, error=True, retry=attempt < retries)
+            if attempt >= retries:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        status = response.status_code
+        will_retry = status in RETRY_STATUSES and attempt < retries
+        _record(host, (time.perf_counter() - started) * 1000, len(response.content),
+                error=status >= 500 or status == 429, retry=will_retry)
+        if limiter is not None:
+            if status in SLOWDOWN_STATUSES:
+                limiter.penalize(retry_after(response))
+            else:
+                limiter.reward()
+        if not will_retry:
+            return response
+        if limiter is None or status not in SLOWDOWN_STATUSES:
+            # limiter가 있는 429/503은 penalize()가 다음 acquire()를 늦추므로 따로 대기하지 않음
+            time.sleep(backoff_delay(attempt, retry_after(response)))
+    return response
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
@@ -0,0 +1,129 @@
+"""
+lotto_numbers 압축 표현 (columnar JSON / packed binary)
+- /lotto/numbers/all 의 회차별 dict(키 8개 × 1,100회 이상 반복) 대신 쓰는 컴팩트 포맷
+- 입력/출력 단위는 format_lotto_numbers_result()가 만든 dict 이므로 값의 의미(누락 회차 null 등)는 동일
+
+1) columnar JSON  (format=columnar, Accept: application/vnd.lotto645.columnar+json)
+   {"format": "columnar-v1", "count": N,
+    "round": [...], "draw_date": [...], "numbers": [[n1..n6], ...], "bonus": [...],
+    "first_prize_amt": [...], "first_winner_count": [...], "second_prize_amt": [...], "total_sales": [...]}
+   같은 인덱스 i가 한 회차입니다. (정렬: 최신 회차부터)
+
+2) packed binary  (format=packed, Accept: application/vnd.lotto645.packed)
+   모든 정수는 little-endian.
+
+   헤더 12바이트
+     offset size 내용
+     0      4    매직 b"LT45"
+     4      1    포맷 버전 (1)
+     5      1    예약 (0)
+     6      2    레코드 크기 uint16 (= 42)
+     8      4    레코드 수 uint32
+
+   레코드 42바이트 × 레코드 수 (정렬: 최신 회차부터)
+     offset size 내용
+     0      2    회차 uint16
+     2      4    추첨일 uint32 (YYYYMMDD, 예: 20260103)
+     6      6    당첨번호 6개 uint8
+     12     1    보너스 번호 uint8
+     13     1    플래그 uint8
+                   bit0 = 상세 정보 전체 누락 → 아래 금액/인원 4개 모두 null
+                   bit1~4 = 1등 당첨금 / 1등 당첨자 수 / 2등 당첨금 / 총 판매금액 각각 null (값은 0으로 기록)
+     14     8    1등 당첨금 uint64
+     22     4    1등 당첨자 수 uint32
+     26     8    2등 당첨금 uint64
+     34     8    총 판매금액 uint64
+
+   디코딩 예 (Python): decode_packed(body) / Kotlin·Java: ByteBuffer.order(LITTLE_ENDIAN) 후 위 순서대로 읽기
+"""
+import json
+import struct
+
+MAGIC = b"LT45"
+VERSION = 1
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.lotto645.columnar+json"
+PACKED_MEDIA_TYPE = "application/vnd.lotto645.packed"
+
+_HEADER = struct.Struct("<4sBBHI")
+_RECORD = struct.Struct("<HI6sBBQIQQ")
+
+FLAG_DATA_MISSING = 0x01
+
+_DETAIL_KEYS = ("first_prize_amt", "first_winner_count", "second_prize_amt", "total_sales")
+# 상세 값별 null 플래그 (bit1부터 _DETAIL_KEYS 순서)
+_FIELD_NULL_FLAGS = {key: 0x02 << i for i, key in enumerate(_DETAIL_KEYS)}
+
+
+def _date_to_int(draw_date):
+    return int(str(draw_date).replace("-", "")) if draw_date else 0
+
+
+def _int_to_date(value):
+    if not value:
+        return None
+    s = f"{value:08d}"
+    return f"{s[:4]}-{s[4:6]}-{s[6:]}"
+
+
+def encode_columnar(items) -> bytes:
+    """format_lotto_numbers_result() 결과 리스트 → columnar JSON 바이트"""
+    payload = {
+        "format": "columnar-v1",
+        "count": len(items),
+        "round": [it["round"] for it in items],
+        "draw_date": [it["draw_date"] for it in items],
+        "numbers": [it["numbers"] for it in items],
+        "bonus": [it["bonus"] for it in items],
+    }
+    for key in _DETAIL_KEYS:
+        payload[key] = [it[key] for it in items]
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_packed(items) -> bytes:
+    """format_lotto_numbers_result() 결과 리스트 → packed binary"""
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, 0, _RECORD.size, len(items)))
+    for it in items:
+        # 상세 값은 하나만 null이어도 pack이 실패하지 않도록 필드별로 0 + null 플래그
+        flags = 0
+        for key, bit in _FIELD_NULL_FLAGS.items():
+            if it[key] is None:
+                flags |= bit
+        if all(it[key] is None for key in _DETAIL_KEYS):
+            flags |= FLAG_DATA_MISSING
+        out += _RECORD.pack(
+            it["round"],
+            _date_to_int(it["draw_date"]),
+            bytes(it["numbers"]),
+            it["bonus"],
+            flags,
+            *(it[key] or 0 for key in _DETAIL_KEYS),
+        )
+    return bytes(out)
+
+
+def decode_packed(data: bytes) -> list:
+    """packed binary → format_lotto_numbers_result()와 같은 모양의 dict 리스트"""
+    magic, version, _, record_size, count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("LT45 포맷이 아닙니다.")
+    if version != VERSION or record_size != _RECORD.size:
+        raise ValueError(f"지원하지 않는 버전입니다. (version={version}, record_size={record_size})")
+
+    items = []
+    offset = _HEADER.size
+    for _ in range(count):
+        rnd, ymd, balls, bonus, flags, *details = _RECORD.unpack_from(data, offset)
+        offset += record_size
+        missing = bool(flags & FLAG_DATA_MISSING)
+        item = {
+            "round": rnd,
+            "draw_date": _int_to_date(ymd),
+            "numbers": list(balls),
+            "bonus": bonus,
+        }
+        for key, value in zip(_DETAIL_KEYS, details):
+            item[key] = None if missing or flags & _FIELD_NULL_FLAGS[key] else value
+        items.append(item)
+    return items
@@ -1,9 +1,22 @@
+"""
+레거시 lotto 테이블 수집
+- 기본: lotto_numbers(공식 JSON 수집분)에서 없는 회차만 INSERT ... SELECT (lotto_legacy.py, 네트워크 요청 없음)
+  lotto_numbers_crawler.py 후처리(post_ingest.py legacy 단계)에서도 같은 동기화를 실행하므로
+  이 스크립트는 수동 복구용입니다.
+- --naver: 예전 방식 (네이버 검색 결과를 회차마다 크롤링, lotto_numbers에 없는 회차가 필요할 때만)
+"""
+import argparse
+import os
 import pymysql
-import requests
-from bs4 import BeautifulSoup
 import time
 import re
 
+import html_parse
+import http_client
+import lotto_legacy
+import rate_limit
+import response_blobs
+
 # 1. DB 연결 설정
 DB_CONFIG = {
     "host": "127.0.0.1",
@@ -20,7 +33,16 @@ HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
 }
 
-# 3. 네이버 날짜 형식 (2026.01.03.) → YYYY-MM-DD 변환
+# 3. 네이버 요청 예산 (--naver 백필): 작업자 여러 개가 같은 제한기를 공유하므로 전체 속도는 NAVER_RPS 이하
+NAVER_RPS = float(os.getenv("NAVER_RPS", "1.0"))   # 초당 요청 수 (예전 순차 + 2초 대기 ≈ 0.4건/초)
+NAVER_WORKERS = 3
+LIMITER = rate_limit.AdaptiveRateLimiter(NAVER_RPS)
+
+# 4. 검색 결과 페이지에서 실제로 읽는 요소 (이 하위 트리만 파싱, html_parse.py)
+NAVER_HEADER = "._select_trigger"
+NAVER_TARGETS = [NAVER_HEADER, ".winning_number", ".bonus_number"]
+
+# 5. 네이버 날짜 형식 (2026.01.03.) → YYYY-MM-DD 변환
 def convert_draw_date_naver(date_str):
     match = re.search(r"(\d{4})\.(\d{2})\.(\d{2})", date_str)
     if match:
@@ -39,8 +61,8 @@ def get_max_round():
 # ✅ 네이버 사이트에서 최신 회차 확인
 def get_latest_round():
     url = "https://search.naver.com/search.naver?query=로또"
-    response = requests.get(url, headers=HEADERS, timeout=10)
-    soup = BeautifulSoup(response.text, "html.parser")
+    response = http_client.get(url, headers=HEADERS, timeout=10, limiter=LIMITER)
+    soup = html_parse.parse(response.text, targets=[NAVER_HEADER])
     
     # 제공해주신 a._select_trigger 클래스 활용
     target = soup.select_one("a._select_trigger")
@@ -53,9 +75,10 @@ def get_latest_round():
 
 # ✅ 지정 회차 네이버 크롤링 → 당첨번호 + 보너스 추출
 def crawl_round_naver(round_num):
+    print(f"🔎 {round_num}회 수집 중...")
     url = f"https://search.naver.com/search.naver?query=로또+{round_num}회"
-    response = requests.get(url, headers=HEADERS, timeout=10)
-    soup = BeautifulSoup(response.text, "html.parser")
+    response = http_client.get(url, headers=HEADERS, timeout=10, limiter=LIMITER)
+    soup = html_parse.parse(response.text, targets=NAVER_TARGETS)
 
     # 1. 회차 및 날짜 정보 추출
     target = soup.select_one("a._select_trigger")
@@ -87,8 +110,11 @@ def crawl_round_naver(round_num):
     }
 
 # ✅ DB에 insert
-def insert_lotto_data(data):
-    connection = pymysql.connect(**DB_CONFIG)
+def insert_lotto_data(data, connection=None):
+    """connection을 넘기면 그 연결로 저장 (백필에서 연결 1개 재사용), 없으면 새로 연결"""
+    own = connection is None
+    if own:
+        connection = pymysql.connect(**DB_CONFIG)
     try:
         cursor = connection.cursor()
         sql = """
@@ -107,10 +133,33 @@ def insert_lotto_data(data):
             data["bonus"]
         )
         cursor.execute(sql, values)
+    finally:
+        if own:
+            connection.close()
+
+# ✅ lotto_numbers → lotto 동기화 (기본 실행 흐름)
+def sync_from_lotto_numbers():
+    print("🚀 레거시 lotto 테이블 동기화 시작 (대상: lotto_numbers)")
+    connection = pymysql.connect(**DB_CONFIG)
+    try:
+        connection.begin()
+        with connection.cursor() as cursor:
+            inserted = lotto_legacy.sync_from_lotto_numbers(cursor)
+        connection.commit()
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ 동기화 오류: {e}")
+        return
     finally:
         connection.close()
 
-# ✅ 전체 실행 흐름
+    print(f"✅ {inserted}개 회차 추가" if inserted else "✅ 이미 모든 데이터가 최신 상태입니다.")
+    # /lotto/all 응답 사전 생성
+    if inserted > 0:
+        response_blobs.materialize_quietly(response_blobs.LOTTO_ALL)
+    print("🏁 업데이트 프로세스 완료")
+
+# ✅ 네이버 크롤링 실행 흐름 (--naver)
 def main():
     print("🚀 로또 당첨번호 업데이트 시작 (대상: 네이버)")
 
@@ -129,19 +178,34 @@ def main():
         print("✅ 이미 모든 데이터가 최신 상태입니다.")
         return
 
-    # 2. 부족한 회차만큼 반복해서 크롤링 및 저장
-    for r in range(db_max_round + 1, latest_round + 1):
-        print(f"🔎 {r}회 수집 중...")
-        try:
-            data = crawl_round_naver(r)
-            if data:
-                insert_lotto_data(data)
-                print(f"   ∟ ✅ {r}회 DB 저장 완료: {data['numbers']} + {data['bonus']}")
-                time.sleep(2)  # 네이버 차단 방지용 딜레이
-        except Exception as e:
-            print(f"   ∟ ❌ {r}회 처리 중 에러: {e}")
+    # 2. 부족한 회차를 작업자 NAVER_WORKERS개가 동시에 크롤링 (전체 속도는 LIMITER 예산 이하)
+    #    앞 회차가 모두 끝난 만큼씩 회차 순서대로 이 스레드에서 저장 → 수집과 DB 쓰기가 겹쳐서 진행
+    rounds = list(range(db_max_round + 1, latest_round + 1))
+    started = time.perf_counter()
+    connection = pymysql.connect(**DB_CONFIG)
+    try:
+        def write(r, data):
+            insert_lotto_data(data, connection)
+            print(f"   ∟ ✅ {r}회 DB 저장 완료: {data['numbers']} + {data['bonus']}")
+
+        saved = rate_limit.run_backfill(rounds, crawl_round_naver, write, workers=NAVER_WORKERS)
+    finally:
+        connection.close()
+    inserted = len(saved)
+    print(f"⏱️ {inserted}/{len(rounds)}회 저장 ({time.perf_counter() - started:.1f}s, 요청 제한 {LIMITER.stats()})")
+    http_client.print_metrics()
+
+    # 3. /lotto/all 응답 사전 생성
+    if inserted > 0:
+        response_blobs.materialize_quietly(response_blobs.LOTTO_ALL)
 
     print("🏁 업데이트 프로세스 완료")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="레거시 lotto 테이블 수집 (기본: lotto_numbers에서 동기화)")
+    parser.add_argument("--naver", action="store_true", help="예전 방식: 네이버 검색 결과를 회차마다 크롤링")
+    args = parser.parse_args()
+    if args.naver:
+        main()
+    else:
+        sync_from_lotto_numbers()
\ No newline at end of file
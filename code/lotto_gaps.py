@@ -0,0 +1,183 @@
+"""
+로또 번호별 미출현(gap) 통계 엔진
+- lotto_gap_stats_main (/lotto/gaps)을 유지: 번호별 현재 미출현 기간 + 마지막 출현 회차/날짜 (보너스 제외/포함)
+- 신규 회차는 저장된 45행에 그 회차 번호(최대 7개)만 반영하므로 회차당 O(45) 작업
+- 번호별 과거 미출현 기간 분포(최대/평균/백분위)는 LottoIndex에서 바로 계산 (/lotto/gaps/distribution)
+
+용어: 미출현 기간(weeks_since) = 최신 회차 - 마지막 출현 회차 (최신 회차에 나왔으면 0)
+      과거 간격(gap) = 연속된 두 출현 사이에 거른 회차 수 (= 다음 출현 직전까지 도달한 weeks_since)
+"""
+import numpy as np
+
+import dataset_version
+
+# 분포 응답에 포함할 백분위
+PERCENTILES = (50, 75, 90, 95)
+
+_UPSERT_SQL = """
+    INSERT INTO lotto_gap_stats_main
+      (number, weeks_since, last_round, last_date,
+       weeks_since_with_bonus, last_round_with_bonus, last_date_with_bonus)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+      weeks_since = VALUES(weeks_since),
+      last_round = VALUES(last_round),
+      last_date = VALUES(last_date),
+      weeks_since_with_bonus = VALUES(weeks_since_with_bonus),
+      last_round_with_bonus = VALUES(last_round_with_bonus),
+      last_date_with_bonus = VALUES(last_date_with_bonus)
+"""
+
+_COLUMNS = ("number", "weeks_since", "last_round", "last_date",
+            "weeks_since_with_bonus", "last_round_with_bonus", "last_date_with_bonus")
+
+
+def ensure_table(cursor):
+    """
+    테이블 생성 확인
+    ⚠️ DDL은 MySQL에서 암묵적 커밋을 일으키므로 트랜잭션 시작 전에 호출하세요.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS lotto_gap_stats_main (
+      number TINYINT NOT NULL PRIMARY KEY,   -- 1~45
+      weeks_since INT NULL,
+      last_round INT NULL,
+      last_date DATE NULL,
+      weeks_since_with_bonus INT NULL,
+      last_round_with_bonus INT NULL,
+      last_date_with_bonus DATE NULL,
+      updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+# --- 현재 미출현 기간 (lotto_gap_stats_main) ---
+def _rows_from_last_seen(last_seen, latest_round):
+    """
+    {번호: {"main": (회차, 날짜) 또는 None, "bonus": ...}} → UPSERT용 튜플 45개
+    """
+    rows = []
+    for n in range(1, 46):
+        values = [n]
+        for kind in ("main", "bonus"):
+            seen = last_seen[n][kind]
+            if seen is None:
+                values += [None, None, None]
+            else:
+                values += [latest_round - seen[0], seen[0], seen[1]]
+        rows.append(tuple(values))
+    return rows
+
+
+def compute_rows(index):
+    """LottoIndex 전체 → lotto_gap_stats_main 45행"""
+    gaps = index.gaps(include_bonus=False)
+    gaps_bonus = index.gaps(include_bonus=True)
+    last_seen = {
+        n: {
+            "main": (gaps[n]["last_round"], gaps[n]["last_date"]) if gaps[n]["last_round"] else None,
+            "bonus": (gaps_bonus[n]["last_round"], gaps_bonus[n]["last_date"]) if gaps_bonus[n]["last_round"] else None,
+        }
+        for n in range(1, 46)
+    }
+    return _rows_from_last_seen(last_seen, index.last_round)
+
+
+def save_rows(cursor, rows):
+    cursor.executemany(_UPSERT_SQL, rows)
+    dataset_version.bump_versions(cursor, dataset_version.LOTTO_GAP_STATS)
+    return len(rows)
+
+
+def _stored_last_seen(cursor, prev_latest):
+    """
+    저장된 45행 → {번호: {"main": (회차, 날짜), "bonus": ...}}
+    - 행이 45개가 아니거나, weeks_since + last_round 가 직전 최신 회차와 맞지 않으면 None (전체 재계산 필요)
+    """
+    cursor.execute(f"SELECT {', '.join(_COLUMNS)} FROM lotto_gap_stats_main")
+    stored = {}
+    for row in cursor.fetchall():
+        if not isinstance(row, dict):
+            row = dict(zip(_COLUMNS, row))
+        item = {}
+        for kind, suffix in (("main", ""), ("bonus", "_with_bonus")):
+            last_round = row["last_round" + suffix]
+            if last_round is None:
+                item[kind] = None
+                continue
+            if row["weeks_since" + suffix] is None or row["weeks_since" + suffix] + last_round != prev_latest:
+                return None
+            item[kind] = (int(last_round), row["last_date" + suffix])
+        stored[int(row["number"])] = item
+    return stored if len(stored) == 45 else None
+
+
+def apply_new_rounds(cursor, index, new_rounds):
+    """
+    신규 회차 반영 (post_ingest.py gaps 단계)
+    - 신규 회차가 인덱스 맨 뒤에 붙은 경우: 저장된 45행 + 신규 회차 번호만으로 갱신 (회차당 O(45))
+    - 그 외(최초 실행, 중간 회차 복구, 저장값 불일치): 인덱스 전체로 다시 계산
+    - 반환: "incremental" / "full"
+    """
+    positions = sorted(index.position(r) for r in new_rounds if index.position(r) >= 0)
+    first = positions[0] if positions else -1
+    appended = first > 0 and positions == list(range(first, len(index)))
+    stored = _stored_last_seen(cursor, int(index.rounds[first - 1])) if appended else None
+    if stored is None:
+        save_rows(cursor, compute_rows(index))
+        return "full"
+
+    for pos in positions:
+        seen = (int(index.rounds[pos]), index.dates[pos].item())
+        main = int(index.main[pos])
+        bonus = int(index.bonus[pos])
+        for n in range(1, 46):
+            bit = 1 << n
+            if main & bit:
+                stored[n]["main"] = seen
+            if (main | bonus) & bit:
+                stored[n]["bonus"] = seen
+    save_rows(cursor, _rows_from_last_seen(stored, index.last_round))
+    return "incremental"
+
+
+# --- 과거 미출현 간격 분포 (/lotto/gaps/distribution) ---
+def gap_history(index, include_bonus=False):
+    """
+    {번호: 과거 간격 배열(int64, 오래된 순)}
+    - 회차 번호 차이 - 1 (중간 회차가 비어 있어도 회차 번호 기준)
+    """
+    bits = index.bit_matrix(include_bonus)
+    history = {}
+    for col in range(45):
+        rounds = index.rounds[bits[:, col]].astype(np.int64)
+        history[col + 1] = np.diff(rounds) - 1
+    return history
+
+
+def gap_distribution(index, include_bonus=False, percentiles=PERCENTILES):
+    """
+    번호별 미출현 분포
+    [{"number", "current_gap", "max_gap", "mean_gap", "p50"..., "gap_count", "current_percentile"}, ...]
+    - current_percentile: 과거 간격 중 현재 미출현 기간 이하인 비율(%) — 높을수록 이례적으로 오래 안 나온 번호
+    """
+    current = index.gaps(include_bonus)
+    result = []
+    for n, gaps in gap_history(index, include_bonus).items():
+        weeks_since = current[n]["weeks_since"] if current else None
+        item = {"number": n, "current_gap": weeks_since, "gap_count": int(len(gaps))}
+        if len(gaps):
+            item["max_gap"] = int(gaps.max())
+            item["mean_gap"] = round(float(gaps.mean()), 2)
+            for p, value in zip(percentiles, np.percentile(gaps, percentiles)):
+                item[f"p{p}"] = round(float(value), 2)
+            item["current_percentile"] = (
+                round(float((gaps <= weeks_since).mean() * 100), 1) if weeks_since is not None else None
+            )
+        else:
+            item["max_gap"] = item["mean_gap"] = item["current_percentile"] = None
+            for p in percentiles:
+                item[f"p{p}"] = None
+        result.append(item)
+    return result
@@ -0,0 +1,328 @@
+"""
+로또 당첨번호 비트마스크 인덱스 (메모리 상주)
+- lotto_numbers 전체를 한 번 읽어 회차별 메인 6개 / 보너스 1개를 64비트 정수 마스크로 보관
+  (번호 n → 비트 n, 1~45번 사용)
+- 새 회차는 refresh()로 뒤에 붙이기만 하므로 전체 재로딩이 필요 없음
+  (중간 회차가 나중에 채워지거나 행이 지워진 경우는 COUNT/MIN 비교로 감지해 전체 재로딩)
+- 배열은 불변 스냅샷(LottoSnapshot) 하나에 묶어 두고 갱신 시 참조 1개만 교체
+  → 여러 스레드(API)는 snapshot()을 한 번 받아 그 안의 배열만 쓰면 서로 맞지 않는 배열을 섞어 읽지 않음
+- FIND_IN_SET / CONCAT_WS 문자열 매칭 대신 NumPy 비트 연산으로 분석
+- flask/app.py(API)와 code/ 배치(carryover_init.py 등)가 같이 사용하는 모듈
+"""
+import os
+
+import numpy as np
+
+NUMBERS = np.arange(1, 46)
+_BITS = np.uint64(1) << NUMBERS.astype(np.uint64)
+
+_COLUMNS = "ltEpsd, ltRflYmd, tm1WnNo, tm2WnNo, tm3WnNo, tm4WnNo, tm5WnNo, tm6WnNo, bnsWnNo"
+# 행 내용 확인용 CRC (번호/추첨일이 제자리에서 수정돼도 값이 바뀜)
+_ROW_CRC = f"CRC32(CONCAT_WS(',', {_COLUMNS}))"
+
+
+def mask_of(numbers) -> int:
+    """번호 목록 → 비트마스크"""
+    m = 0
+    for n in numbers:
+        m |= 1 << int(n)
+    return m
+
+
+def numbers_of(mask) -> list:
+    """비트마스크 → 오름차순 번호 목록"""
+    mask = int(mask)
+    return [n for n in range(1, 46) if mask >> n & 1]
+
+
+def popcount(masks):
+    """마스크 배열의 비트 수 (NumPy 2.0+는 bitwise_count 사용)"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(masks).astype(np.int64)
+    return ((masks[..., None] & _BITS) != 0).sum(axis=-1)
+
+
+def _row_value(row, key, idx):
+    return row[key] if isinstance(row, dict) else row[idx]
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+class LottoSnapshot:
+    """
+    회차 순서(오름차순)로 정렬된 읽기 전용 배열 묶음 (만든 뒤에는 바뀌지 않음)
+    - rounds: 회차 (int32)
+    - main:   메인 번호 6개 마스크 (uint64)
+    - bonus:  보너스 번호 마스크 (uint64, 비트 1개)
+    - dates:  추첨일 (datetime64[D])
+    """
+
+    __slots__ = ("rounds", "main", "bonus", "dates")
+
+    def __init__(self, rounds=None, main=None, bonus=None, dates=None):
+        self.rounds = _frozen(np.empty(0, dtype=np.int32) if rounds is None else rounds)
+        self.main = _frozen(np.empty(0, dtype=np.uint64) if main is None else main)
+        self.bonus = _frozen(np.empty(0, dtype=np.uint64) if bonus is None else bonus)
+        self.dates = _frozen(np.empty(0, dtype="datetime64[D]") if dates is None else dates)
+
+    def with_rows(self, rows):
+        """
+        rows(dict 또는 _COLUMNS 순서의 tuple)를 합친 새 스냅샷 (없던 회차만 추가)
+        - 마지막 회차 뒤에 붙는 일반적인 경우는 concatenate, 중간 회차(백필)가 섞이면 회차순 재정렬
+        - 반환: (새 스냅샷, 추가된 회차 수)
+        """
+        have = set(self.rounds.tolist())
+        new = {}
+        for r in rows:
+            round_no = int(_row_value(r, "ltEpsd", 0))
+            if round_no not in have:
+                new[round_no] = r
+        if not new:
+            return self, 0
+        rows = [new[k] for k in sorted(new)]
+
+        rounds = np.array([_row_value(r, "ltEpsd", 0) for r in rows], dtype=np.int32)
+        main = np.array(
+            [mask_of(_row_value(r, f"tm{j}WnNo", j + 1) for j in range(1, 7)) for r in rows],
+            dtype=np.uint64,
+        )
+        bonus = np.array([1 << int(_row_value(r, "bnsWnNo", 8)) for r in rows], dtype=np.uint64)
+        dates = np.array([str(_row_value(r, "ltRflYmd", 1))[:10] for r in rows], dtype="datetime64[D]")
+
+        arrays = [np.concatenate([old, add]) for old, add in
+                  ((self.rounds, rounds), (self.main, main), (self.bonus, bonus), (self.dates, dates))]
+        if len(self.rounds) and rounds[0] <= self.rounds[-1]:
+            order = np.argsort(arrays[0], kind="stable")
+            arrays = [a[order] for a in arrays]
+        return LottoSnapshot(*arrays), len(rows)
+
+    def rows(self, start=0):
+        """
+        위치 start부터 lotto_numbers 행 모양(dict)으로 복원 (carryover_init 등 행 단위 코드용)
+        - 메인 번호는 오름차순 (공식 API 순서와 같음), 추첨일은 date
+        """
+        result = []
+        for pos in range(start, len(self.rounds)):
+            row = {"ltEpsd": int(self.rounds[pos]), "ltRflYmd": self.dates[pos].item()}
+            for j, n in enumerate(numbers_of(self.main[pos]), 1):
+                row[f"tm{j}WnNo"] = n
+            row["bnsWnNo"] = numbers_of(self.bonus[pos])[0]
+            result.append(row)
+        return result
+
+    # --- 기본 정보 ---
+    def __len__(self):
+        return len(self.rounds)
+
+    @property
+    def last_round(self) -> int:
+        return int(self.rounds[-1]) if len(self.rounds) else 0
+
+    def position(self, round_no) -> int:
+        """회차 → 배열 위치 (없으면 -1)"""
+        i = int(np.searchsorted(self.rounds, round_no))
+        return i if i < len(self.rounds) and self.rounds[i] == round_no else -1
+
+    def masks(self, include_bonus=False):
+        return self.main | self.bonus if include_bonus else self.main
+
+    # --- 분석 primitive ---
+    def rounds_containing(self, numbers, include_bonus=False, before_round=None):
+        """numbers를 모두 포함한 회차들 (include_bonus=True면 메인+보너스 7개 기준)"""
+        want = np.uint64(mask_of(numbers))
+        hit = (self.masks(include_bonus) & want) == want
+        if before_round is not None:
+            hit &= self.rounds < before_round
+        return self.rounds[hit]
+
+    def next_round_pairs(self):
+        """
+        (이전 위치, 다음 위치) 인덱스 배열 중 회차가 정확히 1 차이나는 쌍만
+        - 중간 회차가 비어 있으면 이월 비교 대상에서 제외
+        """
+        prev = np.arange(len(self.rounds) - 1)
+        ok = self.rounds[1:] == self.rounds[:-1] + 1
+        return prev[ok], prev[ok] + 1
+
+    def carryover_masks(self, include_bonus=False):
+        """
+        회차 r → r+1 이월 번호 마스크 (r+1 회차 기준 배열, next_round_pairs()의 다음 위치와 같은 순서)
+        - include_bonus=True: 지난주 메인+보너스 중 이번 주 메인에 나온 번호
+        """
+        prev, curr = self.next_round_pairs()
+        return self.rounds[curr], self.masks(include_bonus)[prev] & self.main[curr]
+
+    def combo_carryover_many(self, combo_masks, before_round=None):
+        """
+        여러 조합의 이월 기회/성공을 한 번에 계산 (carryover_init.py의 조합 분석 기준)
+        - 기회: 조합 전체가 어떤 회차의 메인+보너스(7개)에 포함 (before_round 미만)
+        - 성공: 바로 다음 회차(회차 번호 +1) 메인(6개)에 조합 전체가 다시 등장
+        - 반환: (appear, success) 모두 (조합 수, 회차 수) bool 행렬
+          success[c, i]가 True면 i번째 회차가 기회였고 i+1번째 회차에서 이월 성공
+        """
+        wants = np.asarray(combo_masks, dtype=np.uint64)[:, None]
+        appear = (self.masks(include_bonus=True)[None, :] & wants) == wants
+        if before_round is not None:
+            appear &= (self.rounds < before_round)[None, :]
+
+        next_hit = np.zeros_like(appear)
+        consecutive = self.rounds[1:] == self.rounds[:-1] + 1
+        next_hit[:, :-1] = consecutive[None, :] & ((self.main[None, 1:] & wants) == wants)
+        return appear, appear & next_hit
+
+    def combo_carryover(self, numbers, before_round=None):
+        """조합 1개의 (기회 회차 배열, 성공 회차 배열) — 성공 회차는 '다음 회차' 번호"""
+        appear, success = self.combo_carryover_many([mask_of(numbers)], before_round)
+        return self.rounds[appear[0]], self.rounds[1:][success[0, :-1]]
+
+    def bit_matrix(self, include_bonus=False):
+        """(회차 수, 45) bool 행렬: [i, n-1] = i번째 회차에 n번이 나왔는지"""
+        return (self.masks(include_bonus)[:, None] & _BITS) != 0
+
+    def frequency(self, include_bonus=False) -> dict:
+        """번호별 당첨 횟수 {번호: 횟수}"""
+        counts = self.bit_matrix(include_bonus).sum(axis=0)
+        return {int(n): int(c) for n, c in zip(NUMBERS, counts)}
+
+    def gaps(self, include_bonus=False) -> dict:
+        """
+        번호별 현재 미출현 기간
+        {번호: {"weeks_since", "last_round", "last_date"}} (한 번도 안 나왔으면 last_* = None)
+        """
+        result = {}
+        if not len(self.rounds):
+            return result
+        bits = self.bit_matrix(include_bonus)
+        seen = bits.any(axis=0)
+        last_pos = len(self.rounds) - 1 - np.argmax(bits[::-1], axis=0)
+        latest = self.last_round
+        for n, ok, pos in zip(NUMBERS, seen, last_pos):
+            if ok:
+                last_round = int(self.rounds[pos])
+                result[int(n)] = {
+                    "weeks_since": latest - last_round,
+                    "last_round": last_round,
+                    "last_date": self.dates[pos].item(),
+                }
+            else:
+                result[int(n)] = {"weeks_since": None, "last_round": None, "last_date": None}
+        return result
+
+
+class LottoIndex:
+    """
+    최신 LottoSnapshot을 들고 있는 갱신용 홀더
+    - refresh / append_rows는 새 스냅샷을 만든 뒤 참조 하나만 교체 (교체 자체가 원자적)
+    - 분석 메서드/배열 속성은 현재 스냅샷으로 위임 (배치 스크립트처럼 한 스레드에서 쓸 때 편의용)
+    - 다른 스레드가 갱신할 수 있는 곳(API)에서는 snapshot()을 한 번 받아 그 객체만 사용
+    - 마지막 refresh 때 DB에서 본 checked_round 이하 행들의 CRC XOR(checksum)을 같이 들고 있다가
+      다음 refresh에서 비교 → 기존 회차가 제자리에서 수정됐으면 전체를 다시 읽음
+    """
+
+    def __init__(self):
+        self._snapshot = LottoSnapshot()
+        self._checked_round = 0
+        self._checksum = 0
+        self.content_changed = False  # 마지막 refresh에서 기존 회차 내용이 바뀐 것을 발견했는지
+
+    # --- 로딩 ---
+    @classmethod
+    def load(cls, cursor):
+        index = cls()
+        index.refresh(cursor)
+        return index
+
+    @classmethod
+    def load_file(cls, path):
+        """save()로 저장한 파일에서 읽기 (없거나 깨졌으면 빈 인덱스 → 이후 refresh가 전체 로딩)"""
+        index = cls()
+        try:
+            with np.load(path) as data:
+                index._snapshot = LottoSnapshot(
+                    data["rounds"].astype(np.int32),
+                    data["main"].astype(np.uint64),
+                    data["bonus"].astype(np.uint64),
+                    data["dates"].astype("datetime64[D]"),
+                )
+                index._checked_round = int(data["checked_round"][0])
+                index._checksum = int(data["checksum"][0])
+        except (OSError, KeyError, ValueError, IndexError):
+            # 확인값이 없는 예전 파일도 빈 인덱스로 (전체 로딩)
+            index = cls()
+        return index
+
+    def save(self, path):
+        """현재 스냅샷을 npz 파일로 저장 (임시 파일에 쓴 뒤 교체하므로 중간에 끊겨도 이전 파일 유지)"""
+        snap = self._snapshot
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f, rounds=snap.rounds, main=snap.main, bonus=snap.bonus, dates=snap.dates,
+                checked_round=np.array([self._checked_round], dtype=np.int64),
+                checksum=np.array([self._checksum], dtype=np.uint64),
+            )
+        os.replace(tmp, path)
+
+    def snapshot(self) -> LottoSnapshot:
+        return self._snapshot
+
+    def refresh(self, cursor) -> int:
+        """
+        마지막 회차 이후 데이터만 읽어 추가, 추가된 회차 수 반환
+        - DB의 COUNT / MIN이 (현재 + 새로 읽은 회차)와 다르면 중간 회차가 채워졌거나(--full 백필)
+          지워진 것이므로 전체를 다시 읽어 교체
+        - 지난 refresh에서 확인한 회차까지의 행 CRC XOR가 달라졌으면(번호/보너스/추첨일 정정) 역시 전체를 다시 읽음
+          (CRC 집계는 DB 안에서만 계산하므로 행을 가져오지 않음)
+        """
+        snap = self._snapshot
+        cursor.execute(f"""
+            SELECT COUNT(*) AS cnt, MIN(ltEpsd) AS first_round,
+                   COALESCE(BIT_XOR(CASE WHEN ltEpsd <= %s THEN {_ROW_CRC} END), 0) AS checked_sum,
+                   COALESCE(BIT_XOR({_ROW_CRC}), 0) AS total_sum
+            FROM lotto_numbers
+        """, (self._checked_round,))
+        row = cursor.fetchone()
+        count, first_round, checked_sum, total_sum = (
+            (row["cnt"], row["first_round"], row["checked_sum"], row["total_sum"]) if isinstance(row, dict) else row
+        )
+
+        added = None
+        self.content_changed = int(checked_sum) != self._checksum
+        if not self.content_changed:
+            cursor.execute(
+                f"SELECT {_COLUMNS} FROM lotto_numbers WHERE ltEpsd > %s ORDER BY ltEpsd ASC",
+                (snap.last_round,),
+            )
+            new_snap, added = snap.with_rows(cursor.fetchall())
+            if count == len(new_snap) and (not count or int(first_round) == int(new_snap.rounds[0])):
+                self._snapshot = new_snap
+            else:
+                added = None
+
+        if added is None:
+            cursor.execute(f"SELECT {_COLUMNS} FROM lotto_numbers ORDER BY ltEpsd ASC")
+            self._snapshot, _ = LottoSnapshot().with_rows(cursor.fetchall())
+            added = len(self._snapshot) - len(snap)
+        self._checked_round = self._snapshot.last_round
+        self._checksum = int(total_sum)
+        return added
+
+    def append_rows(self, rows) -> int:
+        """
+        lotto_numbers 행(dict 또는 위 _COLUMNS 순서의 tuple) 추가, 추가된 회차 수 반환
+        - 이미 있는 회차는 무시 (크롤러가 방금 넣은 행을 그대로 넘겨도 안전)
+        - 마지막 회차보다 앞선 회차(백필)도 회차 순서 자리에 들어감
+        """
+        self._snapshot, added = self._snapshot.with_rows(rows)
+        return added
+
+    # --- 현재 스냅샷으로 위임 ---
+    def __len__(self):
+        return len(self._snapshot)
+
+    def __getattr__(self, name):
+        return getattr(self._snapshot, name)
@@ -0,0 +1,21 @@
+"""
+레거시 lotto 테이블 동기화 (/lotto/all, /lotto/count가 읽는 테이블)
+- 예전에는 lotto_crawler.py가 네이버 검색 결과를 회차마다 요청(회차당 2초 대기)해서 채웠지만,
+  같은 당첨번호가 이미 공식 JSON으로 수집한 lotto_numbers에 있으므로
+  lotto에 없는 회차를 INSERT ... SELECT 한 번으로 옮깁니다 (네트워크 요청 없음).
+- 중간 회차가 빠져 있어도 회차 기준 anti-join이라 누락분까지 같이 채워집니다.
+"""
+
+SYNC_SQL = """
+    INSERT INTO lotto (round, draw_date, num1, num2, num3, num4, num5, num6, bonus)
+    SELECT n.ltEpsd, n.ltRflYmd, n.tm1WnNo, n.tm2WnNo, n.tm3WnNo, n.tm4WnNo, n.tm5WnNo, n.tm6WnNo, n.bnsWnNo
+    FROM lotto_numbers n
+    LEFT JOIN lotto l ON l.round = n.ltEpsd
+    WHERE l.round IS NULL
+    ORDER BY n.ltEpsd ASC
+"""
+
+
+def sync_from_lotto_numbers(cursor):
+    """lotto에 없는 회차를 lotto_numbers에서 복사, 추가된 행 수 반환 (호출한 쪽 트랜잭션과 함께 커밋됨)"""
+    return cursor.execute(SYNC_SQL)
@@ -1,16 +1,14 @@
 import re
+import sys
 import time
+import argparse
 import shutil
 import traceback
 import pymysql
-from bs4 import BeautifulSoup
 
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import WebDriverException, ElementClickInterceptedException
+import dataset_version
+import html_parse
+from lotto_index import LottoIndex
 
 # --- 1. DB 설정 (성공했던 오라클 서버 주소 적용)
 DB_CONFIG = {
@@ -50,25 +48,72 @@ def ensure_table():
     cur.execute(sql)
     conn.close()
 
-def insert_stats_bulk(stats_map: dict, include_bonus: int):
-    if not stats_map: return
-    conn = pymysql.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    sql = """
-      INSERT INTO lotto_number_stats (number, include_bonus, win_count)
-      VALUES (%s, %s, %s)
-      ON DUPLICATE KEY UPDATE 
-        win_count = VALUES(win_count),
-        updated_at = CURRENT_TIMESTAMP
+_UPSERT_SQL = """
+  INSERT INTO lotto_number_stats (number, include_bonus, win_count)
+  VALUES (%s, %s, %s)
+  ON DUPLICATE KEY UPDATE 
+    win_count = VALUES(win_count),
+    updated_at = CURRENT_TIMESTAMP
+"""
+
+# --- 로컬 통계 엔진 (lotto_numbers 기준, Selenium 불필요)
+def compute_stats(index) -> dict:
+    """{include_bonus(0/1): {번호: 당첨 횟수}} — 전체 회차 기준"""
+    return {0: index.frequency(include_bonus=False), 1: index.frequency(include_bonus=True)}
+
+def round_deltas(index, rounds) -> dict:
+    """지정 회차들만의 번호별 출현 횟수 {include_bonus: {번호: 증가분}}"""
+    positions = [p for p in (index.position(r) for r in rounds) if p >= 0]
+    deltas = {}
+    for include_bonus in (0, 1):
+        counts = index.bit_matrix(include_bonus=bool(include_bonus))[positions].sum(axis=0)
+        deltas[include_bonus] = {n: int(c) for n, c in enumerate(counts, start=1) if c}
+    return deltas
+
+def save_stats(cursor, stats: dict):
+    """전체 값 저장 (45개 × 보너스 제외/포함) + API 캐시(/lotto/number-stats) 무효화"""
+    rows = [(num, include_bonus, cnt)
+            for include_bonus in (0, 1)
+            for num, cnt in sorted(stats[include_bonus].items())]
+    cursor.executemany(_UPSERT_SQL, rows)
+    dataset_version.bump_versions(cursor, dataset_version.LOTTO_NUMBER_STATS)
+    return len(rows)
+
+def _stored_totals(cursor) -> dict:
+    """{include_bonus: (행 수, win_count 합계)}"""
+    cursor.execute("SELECT include_bonus, COUNT(*) AS cnt, SUM(win_count) AS total FROM lotto_number_stats GROUP BY include_bonus")
+    totals = {}
+    for row in cursor.fetchall():
+        if not isinstance(row, dict):
+            row = dict(zip(("include_bonus", "cnt", "total"), row))
+        totals[int(row["include_bonus"])] = (int(row["cnt"]), int(row["total"] or 0))
+    return totals
+
+def apply_new_rounds(cursor, index, new_rounds) -> str:
     """
-    rows = [(num, include_bonus, cnt) for num, cnt in sorted(stats_map.items())]
-    cur.executemany(sql, rows)
-    conn.close()
-    print(f"✅ DB 저장 완료: {len(rows)}개 항목 (보너스 포함 여부: {include_bonus})")
+    신규 회차만큼 win_count 증분 반영 (post_ingest.py stats 단계)
+    - 저장된 합계가 '신규 회차 이전 회차 수 × 6(보너스 포함 7)'과 맞을 때만 증분
+    - 맞지 않으면(최초 실행, 스크래핑 값이 남아있음, 누락 회차 복구 등) 전체 값으로 다시 저장
+    - 반환: "incremental" / "full"
+    """
+    new_rounds = [r for r in new_rounds if index.position(r) >= 0]
+    before = len(index) - len(new_rounds)
+    expected = {0: (45, before * 6), 1: (45, before * 7)}
+    if not new_rounds or _stored_totals(cursor) != expected:
+        save_stats(cursor, compute_stats(index))
+        return "full"
+
+    deltas = round_deltas(index, new_rounds)
+    cursor.executemany(
+        "UPDATE lotto_number_stats SET win_count = win_count + %s WHERE number = %s AND include_bonus = %s",
+        [(cnt, num, include_bonus) for include_bonus in (0, 1) for num, cnt in sorted(deltas[include_bonus].items())]
+    )
+    dataset_version.bump_versions(cursor, dataset_version.LOTTO_NUMBER_STATS)
+    return "incremental"
 
 # ✅ [수정] 새로운 div 그리드 구조 파싱 함수
 def parse_grid_data(html_text: str) -> dict:
-    soup = BeautifulSoup(html_text, "html.parser")
+    soup = html_parse.parse(html_text, targets=[".result-ballBox"])
     # 주신 HTML 구조: result-ballBox 안에 번호(result-ball)와 횟수(result-txt)가 있음
     items = soup.select(".result-ballBox")
     result = {}
@@ -82,7 +127,7 @@ def parse_grid_data(html_text: str) -> dict:
                 result[num] = count
     return result
 
-# --- Selenium 설정부
+# --- Selenium 설정부 (교차 검증 모드에서만 사용 → 필요할 때만 import)
 def find_chrome_binary():
     for cand in ["google-chrome", "chromium-browser", "chromium", "chrome.exe"]:
         p = shutil.which(cand)
@@ -90,6 +135,9 @@ def find_chrome_binary():
     return None
 
 def setup_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
     options = Options()
     options.add_argument(f"--user-agent={HEADERS['User-Agent']}")
     options.add_argument("--headless=new") # 화면 없이 실행
@@ -104,8 +152,14 @@ def setup_driver():
     except Exception as e:
         raise RuntimeError(f"드라이버 구동 실패: {e}")
 
-# --- 메인 크롤링 로직
-def crawl_statistics():
+# --- 사이트 통계 스크래핑 (교차 검증용)
+def crawl_statistics() -> dict:
+    """사이트 '당첨번호 통계' 값 {include_bonus: {번호: 횟수}} (DB에는 저장하지 않음)"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    scraped = {}
     driver = setup_driver()
     wait = WebDriverWait(driver, 20)
     
@@ -123,9 +177,7 @@ def crawl_statistics():
         print("📊 보너스 미포함 데이터 수집 중...")
         # 결과 테이블(noDiv)이 나타날 때까지 대기
         wait.until(EC.presence_of_element_located((By.ID, "noDiv")))
-        stats_exc = parse_grid_data(driver.page_source)
-        if stats_exc:
-            insert_stats_bulk(stats_exc, include_bonus=0)
+        scraped[0] = parse_grid_data(driver.page_source)
         
         # --- B. 보너스 포함 (include_bonus = 1) 설정 및 수집
         print("🔘 '보너스 포함 여부' 체크 중...")
@@ -143,21 +195,59 @@ def crawl_statistics():
         wait.until(EC.presence_of_element_located((By.ID, "noDiv")))
         
         print("📊 보너스 포함 데이터 수집 중...")
-        stats_inc = parse_grid_data(driver.page_source)
-        if stats_inc:
-            insert_stats_bulk(stats_inc, include_bonus=1)
+        scraped[1] = parse_grid_data(driver.page_source)
 
     except Exception as e:
         print(f"❌ 오류 발생: {e}")
         traceback.print_exc()
     finally:
         driver.quit()
+    return scraped
 
-def main():
-    print("🚀 로또 번호별 통계 업데이트 시작")
+def cross_check(local: dict, scraped: dict) -> list:
+    """로컬 계산값과 사이트 값 비교 → 다른 항목 [(include_bonus, 번호, 로컬, 사이트)]"""
+    diffs = []
+    for include_bonus in (0, 1):
+        site = scraped.get(include_bonus) or {}
+        for num in range(1, 46):
+            mine, theirs = local[include_bonus].get(num, 0), site.get(num)
+            if mine != theirs:
+                diffs.append((include_bonus, num, mine, theirs))
+    return diffs
+
+def main(check=False):
+    print("🚀 로또 번호별 통계 업데이트 시작 (lotto_numbers 기준 로컬 계산)")
     ensure_table()
-    crawl_statistics()
+
+    conn = pymysql.connect(**DB_CONFIG)
+    try:
+        cur = conn.cursor()
+        dataset_version.ensure_table(cur)
+        started = time.perf_counter()
+        index = LottoIndex.load(cur)
+        if not len(index):
+            print("❌ 계산할 로또 데이터가 없습니다.")
+            return 1
+        local = compute_stats(index)
+        saved = save_stats(cur, local)
+        print(f"✅ DB 저장 완료: {saved}개 항목 ({len(index)}회차, {(time.perf_counter() - started) * 1000:.1f}ms)")
+    finally:
+        conn.close()
+
+    if check:
+        print("🔎 사이트 통계와 교차 검증 (Selenium)")
+        diffs = cross_check(local, crawl_statistics())
+        if diffs:
+            for include_bonus, num, mine, theirs in diffs:
+                print(f"⚠️ 불일치: {num}번 (보너스 {'포함' if include_bonus else '미포함'}) 로컬 {mine} / 사이트 {theirs}")
+            return 1
+        print("✅ 교차 검증 일치 (45개 × 2)")
+
     print("🎯 모든 통계 데이터 갱신 완료")
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="로또 번호별 당첨 횟수 통계 (lotto_number_stats)")
+    parser.add_argument("--cross-check", action="store_true", help="사이트 통계를 Selenium으로 스크래핑해 로컬 계산값과 비교")
+    args = parser.parse_args()
+    sys.exit(main(check=args.cross_check))
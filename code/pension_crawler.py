@@ -1,13 +1,18 @@
 import time
 import re
+import json
+import argparse
+import os
+import sys
+import threading
+from datetime import date, datetime, timedelta, timezone
 import pymysql
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service # 상단에 추가
+
+import dataset_version
+import html_parse
+import http_client
+import pension_statistics
+import rate_limit
 
 # --- 1. DB 설정 (오라클 서버 주소)
 DB_CONFIG = {
@@ -20,18 +25,221 @@ DB_CONFIG = {
     "autocommit": True
 }
 
-def get_max_round():
-    print("🔍 DB에서 현재 최대 회차 조회 중...")
+# --- 2. 동행복권 JSON 결과 API (--json 으로만 사용, lotto_numbers_crawler.py와 같은 방식)
+# ⚠️ 로또(lt645/selectPstLt645Info.do) 엔드포인트 이름 규칙에서 추정한 주소/필드명이며 아직 실제 응답으로 확인하지 못했습니다.
+#    그래서 기본 수집 경로는 Selenium(네이버)입니다. --capture PATH로 실제 응답을 저장해 JSON_URL / JSON_FIELDS를
+#    맞춘 뒤에 기본 경로로 바꾸세요.
+JSON_URL = "https://www.dhlottery.co.kr/pt720/selectPstPt720Info.do"
+JSON_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36',
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+    'ajax': 'true',
+    'X-Requested-With': 'XMLHttpRequest',
+    'Referer': 'https://www.dhlottery.co.kr/pt720/result'
+}
+JSON_EPSD_PARAM = "srchPsltEpsd"
+JSON_FIELDS = {
+    "round": "psltEpsd",      # 회차
+    "draw_date": "psltRflYmd",  # 추첨일 (YYYYMMDD)
+    "jo": "wnBndNo",          # 1등 조
+    "number": "wnRnkVl",      # 1등 6자리
+    "bonus": "bnsRnkVl",      # 보너스 6자리
+}
+TIMEOUT = 15
+
+# Selenium(네이버) 백필: 브라우저 NAVER_WORKERS개가 같은 제한기를 공유 (전체 속도는 NAVER_RPS 이하)
+NAVER_RPS = float(os.getenv("NAVER_RPS", "1.0"))
+NAVER_WORKERS = 2   # 워커마다 Chromium 1개를 띄우므로 작게 유지
+NAVER_LIMITER = rate_limit.AdaptiveRateLimiter(NAVER_RPS)
+# 검색 결과에서 읽는 요소 (보너스는 "보너스" 칸이 있는 표의 행에서 찾으므로 tr 포함,
+# 종류가 섞여 있어 bs4 백엔드는 전체 파싱 → selectolax가 설치돼 있으면 그쪽이 빠름)
+NAVER_TARGETS = ["._select_trigger", ".winning_number", "tr"]
+
+# 주 1회(목요일) 추첨 → 마지막 저장 추첨일 + DRAW_INTERVAL_DAYS일(다음 추첨일)이 KST 기준으로 지났는데
+# JSON에 신규 회차가 없으면 실패로 보고 Selenium으로 재확인
+KST = timezone(timedelta(hours=9))
+DRAW_INTERVAL_DAYS = 7
+
+COLUMNS = ("round", "draw_date", "first_prize", "second_prize", "bonus", "third_prize", "fourth_prize",
+           "fifth_prize", "sixth_prize", "seventh_prize")
+
+INSERT_SQL = f"INSERT INTO pension ({', '.join(COLUMNS)}) VALUES ({', '.join(['%s'] * len(COLUMNS))})"
+
+
+def make_row(round_num, draw_date, jo_number, number_part, bonus):
+    """회차 정보 → pension 행 dict (2~7등 번호는 1등 6자리의 뒷자리에서 같이 계산)"""
+    return {
+        "round": round_num,
+        "draw_date": draw_date,
+        "first_prize": f"{jo_number}조{number_part}",
+        "second_prize": number_part,
+        "bonus": bonus,
+        "third_prize": number_part[-5:],
+        "fourth_prize": number_part[-4:],
+        "fifth_prize": number_part[-3:],
+        "sixth_prize": number_part[-2:],
+        "seventh_prize": number_part[-1:],
+    }
+
+
+def to_params(row):
+    return tuple(row[k] for k in COLUMNS)
+
+
+def fetch_json_rounds(srch_epsd):
+    """srch_epsd='all' 이면 전체 이력, 회차 번호면 해당 회차만 요청"""
+    params = {JSON_EPSD_PARAM: srch_epsd, "_": str(int(time.time() * 1000))}
+    response = http_client.get(JSON_URL, params=params, headers=JSON_HEADERS, timeout=TIMEOUT)
+    response.raise_for_status()
+    return response_items(response.json())
+
+
+def response_items(payload):
+    """JSON 응답 본문 → 회차 항목 목록 (data.list)"""
+    return (payload.get("data") or {}).get("list", []) or []
+
+
+def json_item_to_row(item):
+    """JSON 응답 1건 → pension 행 dict (필드가 없거나 형식이 다르면 KeyError/ValueError)"""
+    raw_date = str(item[JSON_FIELDS["draw_date"]]).replace("-", "").replace(".", "")
+    number_part = str(item[JSON_FIELDS["number"]]).zfill(6)
+    bonus = str(item[JSON_FIELDS["bonus"]]).zfill(6)
+    if len(raw_date) != 8 or not (number_part.isdigit() and len(number_part) == 6 and bonus.isdigit()):
+        raise ValueError(f"예상과 다른 응답 형식: {item}")
+    return make_row(
+        int(item[JSON_FIELDS["round"]]),
+        f"{raw_date[:4]}-{raw_date[4:6]}-{raw_date[6:]}",
+        str(item[JSON_FIELDS["jo"]]),
+        number_part,
+        bonus,
+    )
+
+
+def capture_sample(path, srch_epsd="all"):
+    """실제 JSON 응답을 그대로 path에 저장 (JSON_URL / JSON_FIELDS 확인용)"""
+    params = {JSON_EPSD_PARAM: srch_epsd, "_": str(int(time.time() * 1000))}
+    response = http_client.get(JSON_URL, params=params, headers=JSON_HEADERS, timeout=TIMEOUT)
+    response.raise_for_status()
+    payload = response.json()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"💾 응답 저장: {path} (항목 {len(response_items(payload))}개)")
+
+
+def fetch_new_json_rounds(last_db_round):
+    """
+    [증분] MAX(round) 다음 회차부터 한 회차씩 요청, 빈 응답이 오면 종료
+    - 평소(주 1회)에는 신규 회차 1건 + 다음 회차(아직 없음) 확인 1건, 총 2번 요청
+    - 반환: (가져온 항목 목록, 요청 수)
+    """
+    items, requests_made = [], 0
+    next_epsd = last_db_round + 1
+    while True:
+        fetched = [it for it in fetch_json_rounds(next_epsd)
+                   if int(it[JSON_FIELDS["round"]]) >= next_epsd]
+        requests_made += 1
+        if not fetched:
+            break
+        items.extend(fetched)
+        next_epsd = max(int(it[JSON_FIELDS["round"]]) for it in fetched) + 1
+    return items, requests_made
+
+
+def insert_rows(conn, rows):
+    """pension 행 일괄 저장 + API 캐시 무효화 (한 트랜잭션)"""
+    if not rows:
+        return 0
+    with conn.cursor() as cursor:
+        # DDL은 암묵적 커밋이 일어나므로 트랜잭션 시작 전에 확인
+        dataset_version.ensure_table(cursor)
+    conn.begin()
+    try:
+        with conn.cursor() as cursor:
+            cursor.executemany(INSERT_SQL, [to_params(row) for row in rows])
+            dataset_version.bump_versions(cursor, dataset_version.PENSION)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
+
+
+def ingest_json(full=False):
+    """
+    JSON API로 신규 회차 수집 → executemany 일괄 저장
+    - 기본(증분): DB 최신 회차 이후만 요청
+    - full=True(복구용) 또는 DB가 비어 있으면 전체 이력을 받아 DB에 없는 회차를 모두 채움
+    - 반환: 저장한 행 목록 (JSON 경로 실패 시 예외 → 호출한 쪽에서 Selenium으로 전환)
+    """
     conn = pymysql.connect(**DB_CONFIG)
-    cursor = conn.cursor()
-    cursor.execute("SELECT MAX(round) FROM pension")
-    result = cursor.fetchone()
-    conn.close()
-    res = result[0] if result[0] else 0
-    print(f"✅ 현재 DB 최대 회차: {res}")
-    return res
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT MAX(round), MAX(draw_date) FROM pension")
+            last_db_round, last_draw_date = cursor.fetchone()
+            last_db_round = last_db_round or 0
+            print(f"✅ 현재 DB 최대 회차: {last_db_round}")
+
+            if full or last_db_round == 0:
+                print(f"📥 전체 이력 요청 ({JSON_EPSD_PARAM}=all)")
+                items = fetch_json_rounds("all")
+                requests_made = 1
+                cursor.execute("SELECT round FROM pension")
+                existing = {row[0] for row in cursor.fetchall()}
+            else:
+                items, requests_made = fetch_new_json_rounds(last_db_round)
+                existing = set()
+
+        # 회차 오름차순 (중복 응답 제거), DB에 없는 회차만 저장
+        fetched = {}
+        for item in items:
+            row = json_item_to_row(item)
+            fetched[row["round"]] = row
+        new_rows = [fetched[r] for r in sorted(fetched)
+                    if r not in existing and r > (0 if full else last_db_round)]
+        print(f"🚀 JSON 요청 {requests_made}회, 가져온 행 {len(items)}개 / 저장할 행 {len(new_rows)}개")
+        http_client.print_metrics()
+
+        if isinstance(last_draw_date, str):
+            last_draw_date = date.fromisoformat(last_draw_date[:10])
+        if not new_rows and last_draw_date:
+            # 다음 추첨일이 지났는데(추첨 다음 날부터) 신규 회차가 없으면 응답이 잘못된 것으로 봄
+            next_draw = last_draw_date + timedelta(days=DRAW_INTERVAL_DAYS)
+            today = datetime.now(KST).date()
+            if today > next_draw:
+                raise RuntimeError(f"다음 추첨일({next_draw})이 지났는데(오늘 {today} KST) JSON 응답에 신규 회차가 없습니다.")
+
+        insert_rows(conn, new_rows)
+        for row in new_rows:
+            print(f"✅ {row['round']}회 DB 저장 완료")
+        return new_rows
+    finally:
+        conn.close()
+
+
+# --- 3. Selenium(네이버) 수집: JSON 경로가 실패했을 때만 사용
+def get_missing_rounds(latest):
+    """
+    1 ~ latest 중 DB에 없는 회차 (오름차순)
+    - MAX(round)+1부터가 아니라 실제로 빠진 회차를 찾으므로, 지난 실행에서 중간 회차만 실패했어도 다시 채움
+    """
+    print("🔍 DB에서 누락 회차 조회 중...")
+    conn = pymysql.connect(**DB_CONFIG)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT round FROM pension WHERE round BETWEEN 1 AND %s", (latest,))
+            existing = {row[0] for row in cursor.fetchall()}
+    finally:
+        conn.close()
+    missing = [r for r in range(1, latest + 1) if r not in existing]
+    print(f"✅ DB {len(existing)}개 회차 보유, 누락 {len(missing)}개")
+    return missing
 
 def get_latest_pension_round(driver):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     url = "https://search.naver.com/search.naver?query=연금복권"
     driver.get(url)
     wait = WebDriverWait(driver, 10)
@@ -42,11 +250,21 @@ def get_latest_pension_round(driver):
 
 def crawl_round(driver, round_num):
     print(f"➡️ {round_num}회 크롤링 시작")
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     url = f"https://search.naver.com/search.naver?query=연금복권+{round_num}회"
+    NAVER_LIMITER.acquire()
     driver.get(url)
-    time.sleep(2)
+    # 고정 2초 대기 대신 당첨번호가 그려질 때까지만 대기 (없으면 아래 파싱에서 경고 후 None)
+    try:
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CSS_SELECTOR, ".winning_number .ball")))
+    except TimeoutException:
+        pass
 
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+    soup = html_parse.parse(driver.page_source, targets=NAVER_TARGETS)
 
     # 1. 회차 및 날짜 정보
     header_tag = soup.select_one("a._select_trigger")
@@ -69,47 +287,42 @@ def crawl_round(driver, round_num):
     first_prize = f"{jo_number}조{number_part}"
 
     # 3. ✅ [수정] 보너스 번호 추출 로직
-    # "보너스" 텍스트를 포함한 td를 먼저 찾고, 그 부모 행(tr)에서 숫자들을 가져옵니다.
+    # "보너스" 텍스트를 가진 td가 있는 행(tr)을 찾고, 그 행에서 숫자들을 가져옵니다.
     bonus = "000000"
-    bonus_row = soup.find("td", string=re.compile("보너스"))
-    if bonus_row:
-        parent_tr = bonus_row.find_parent("tr")
-        bonus_digits = parent_tr.select("td.type_bold")
-        if bonus_digits:
-            bonus = "".join([d.text.strip() for d in bonus_digits])
+    for row in soup.select("tr"):
+        if any("보너스" in td.text for td in row.select("td")):
+            bonus_digits = row.select("td.type_bold")
+            if bonus_digits:
+                bonus = "".join([d.text.strip() for d in bonus_digits])
+            break
     
     print(f"💎 1등: {first_prize} / 🌟 보너스: {bonus}")
 
-    return {
-        "round": round_num,
-        "draw_date": draw_date,
-        "first_prize": first_prize,
-        "second_prize": number_part,
-        "bonus": bonus,
-        "third_prize": number_part[-5:],
-        "fourth_prize": number_part[-4:],
-        "fifth_prize": number_part[-3:],
-        "sixth_prize": number_part[-2:],
-        "seventh_prize": number_part[-1:],
-    }
+    return make_row(round_num, draw_date, jo_number, number_part, bonus)
 
 def insert_data(data):
     conn = pymysql.connect(**DB_CONFIG)
     cursor = conn.cursor()
-    sql = """
-    INSERT INTO pension (round, draw_date, first_prize, second_prize, bonus, third_prize, fourth_prize,
-                         fifth_prize, sixth_prize, seventh_prize)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    cursor.execute(sql, (
-        data["round"], data["draw_date"], data["first_prize"], data["second_prize"], data["bonus"],
-        data["third_prize"], data["fourth_prize"], data["fifth_prize"], data["sixth_prize"], data["seventh_prize"]
-    ))
+    cursor.execute(INSERT_SQL, to_params(data))
     conn.close()
     print(f"✅ {data['round']}회 DB 저장 완료")
 
-def main():
-    print("🎉 [Naver] 연금복권 업데이트 프로세스 시작")
+def bump_pension_version():
+    """신규 회차 저장 후 API 캐시(/pension/latest 등) 무효화"""
+    conn = pymysql.connect(**DB_CONFIG)
+    try:
+        with conn.cursor() as cursor:
+            dataset_version.ensure_table(cursor)
+            dataset_version.bump_versions(cursor, dataset_version.PENSION)
+    finally:
+        conn.close()
+
+def new_driver():
+    # Selenium은 이 경로에서만 필요하므로 여기서 import
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
     options = Options()
     options.add_argument("--headless=new")
     options.add_argument("--no-sandbox")
@@ -122,25 +335,103 @@ def main():
     service = Service(executable_path="/usr/bin/chromedriver")
 
     # 3. 드라이버 실행
-    driver = webdriver.Chrome(service=service, options=options)
+    return webdriver.Chrome(service=service, options=options)
+
+class DriverPool:
+    """작업자 스레드마다 드라이버 1개 (WebDriver는 스레드 간에 공유할 수 없음)"""
+    def __init__(self, first=None):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._drivers = [first] if first else []
+        self._spare = first
 
+    def get(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            with self._lock:
+                driver, self._spare = self._spare, None
+            if driver is None:
+                driver = new_driver()
+                with self._lock:
+                    self._drivers.append(driver)
+            self._local.driver = driver
+        return driver
 
+    def quit_all(self):
+        for driver in self._drivers:
+            driver.quit()
+
+def crawl_with_selenium():
+    """
+    네이버 검색 결과를 브라우저로 열어 수집 (JSON 경로가 실패했을 때만)
+    - DB에 없는 회차를 브라우저 NAVER_WORKERS개로 동시에 열고(요청 간격은 NAVER_LIMITER가 제한),
+      회차 순서대로 이 스레드에서 바로 저장 → 중간에 실패해도 진행분이 남고 다음 실행에서 빠진 회차부터 다시 수집
+    - 반환: 저장한 행 목록
+    """
+    first = new_driver()
+    pool = DriverPool(first)
+    saved = []
     try:
-        db_max = get_max_round()
-        latest = get_latest_pension_round(driver)
-        print(f"📊 비교 결과: DB {db_max}회 vs 네이버 {latest}회")
+        NAVER_LIMITER.acquire()
+        latest = get_latest_pension_round(first)
+        rounds = get_missing_rounds(latest)
+        print(f"📊 비교 결과: 네이버 최신 {latest}회, 누락 {len(rounds)}개")
 
-        if db_max >= latest:
+        if not rounds:
             print("✨ 이미 모든 데이터가 최신입니다.")
         else:
-            for r in range(db_max + 1, latest + 1):
-                data = crawl_round(driver, r)
-                if data:
-                    insert_data(data)
-                    time.sleep(2)
+            started = time.perf_counter()
+            saved = rate_limit.run_backfill(
+                rounds,
+                lambda r: crawl_round(pool.get(), r),
+                lambda r, data: insert_data(data),
+                workers=NAVER_WORKERS,
+            )
+            print(f"⏱️ {len(saved)}/{len(rounds)}회 저장 ({time.perf_counter() - started:.1f}s, "
+                  f"요청 제한 {NAVER_LIMITER.stats()})")
+            if saved:
+                bump_pension_version()
+    finally:
+        pool.quit_all()
+    return saved
+
+def main(full=False, use_json=False):
+    """
+    기본: Selenium(네이버)으로 누락 회차 수집
+    use_json=True: 검증 전인 JSON API를 먼저 쓰고, 실패하면 Selenium으로 전환
+    """
+    print("🎉 연금복권 업데이트 프로세스 시작")
+    try:
+        new_rows = None
+        if use_json:
+            try:
+                new_rows = ingest_json(full=full)
+                if not new_rows:
+                    print("✨ 이미 모든 데이터가 최신입니다.")
+            except Exception as e:
+                print(f"⚠️ JSON 수집 실패, Selenium(네이버)으로 전환합니다: {e}")
+        if new_rows is None:
+            print("🌐 [Naver] Selenium 수집 시작")
+            new_rows = crawl_with_selenium()
+
+        if new_rows:
+            # ✅ 자리수 통계(pension_digit_stats)도 신규 회차만큼 바로 반영 (브라우저 통계 크롤링 불필요)
+            pension_statistics.update_from_new_rounds([row["first_prize"] for row in new_rows])
     finally:
-        driver.quit()
         print("🎯 연금복권 업데이트 종료")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="연금복권 당첨번호 수집 (기본: 네이버 Selenium, --json: JSON API 우선)")
+    parser.add_argument("--json", action="store_true", help="JSON API(주소/필드 미검증)로 먼저 수집, 실패 시 Selenium")
+    parser.add_argument("--full", action="store_true", help="JSON 전체 이력을 받아 누락 회차까지 채움 (--json 포함)")
+    parser.add_argument("--capture", metavar="PATH", help="실제 JSON 응답(전체 이력)을 PATH에 저장하고 종료")
+    args = parser.parse_args()
+
+    if args.capture:
+        try:
+            capture_sample(args.capture)
+        except Exception as e:
+            print(f"❌ 응답 저장 실패: {e}")
+            sys.exit(1)
+    else:
+        main(full=args.full, use_json=args.json or args.full)
@@ -1,12 +1,12 @@
+import sys
 import time
 import re
+import argparse
+import numpy as np
 import pymysql
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+
+import dataset_version
+import html_parse
 
 # --- 1. DB 설정 (오라클 서버 주소 반영)
 DB_CONFIG = {
@@ -32,6 +32,13 @@ ID_TO_POSITION = {
     "wnNo6Div": "1"      # 일
 }
 
+# 자리 순서 (first_prize "N조123456" 의 글자 순서와 동일)
+POSITIONS = ["jo", "100k", "10k", "1k", "100", "10", "1"]
+DIGIT_RANGE = {pos: range(0, 10) for pos in POSITIONS}
+DIGIT_RANGE["jo"] = range(1, 6)  # 조는 1~5
+
+_FIRST_PRIZE_RE = re.compile(r"^\s*(\d)\s*조\s*(\d{6})\s*$")
+
 def _to_int_safe(text: str):
     """숫자만 추출해 int 변환 (예: '65회' -> 65)"""
     s = re.sub(r"[^\d]", "", text or "")
@@ -54,29 +61,114 @@ def ensure_table():
     cur.execute(sql)
     conn.close()
 
-def insert_digit_stats_bulk(rows: list[dict]):
-    """데이터 UPSERT (저장 및 갱신)"""
-    if not rows:
-        print("ℹ️ 저장할 데이터가 없습니다.")
-        return
+_UPSERT_SQL = """
+    INSERT INTO pension_digit_stats (position, digit, win_count)
+    VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+      win_count = VALUES(win_count),
+      updated_at = CURRENT_TIMESTAMP
+"""
 
-    conn = pymysql.connect(**DB_CONFIG)
-    cur = conn.cursor()
-    sql = """
-        INSERT INTO pension_digit_stats (position, digit, win_count)
-        VALUES (%s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-          win_count = VALUES(win_count),
-          updated_at = CURRENT_TIMESTAMP
+# --- 로컬 통계 엔진 (pension.first_prize 기준, 브라우저 불필요)
+def digit_matrix(first_prizes) -> np.ndarray:
     """
-    data = [(r["position"], r["digit"], r["win_count"]) for r in rows]
-    cur.executemany(sql, data)
-    conn.commit()
-    conn.close()
-    print(f"✅ 자리수 통계 {len(rows)}건 DB 저장 완료")
+    "N조123456" 목록 → (회차 수, 7) uint8 자리수 행렬 (열 순서 = POSITIONS)
+    - 형식이 맞지 않는 값(누락/파싱 실패)은 제외
+    """
+    digits = []
+    for prize in first_prizes:
+        m = _FIRST_PRIZE_RE.match(prize or "")
+        if m:
+            digits.append(m.group(1) + m.group(2))
+    if not digits:
+        return np.empty((0, len(POSITIONS)), dtype=np.uint8)
+    # ASCII 숫자 7글자씩 이어 붙인 바이트를 한 번에 행렬로 변환
+    return np.frombuffer("".join(digits).encode("ascii"), dtype=np.uint8).reshape(-1, len(POSITIONS)) - ord("0")
+
+def count_digits(matrix) -> dict:
+    """자리수 행렬 → {(position, digit): 출현 횟수} (자리마다 bincount 1회)"""
+    counts = {}
+    for col, pos in enumerate(POSITIONS):
+        hist = np.bincount(matrix[:, col], minlength=10)
+        for digit in DIGIT_RANGE[pos]:
+            counts[(pos, digit)] = int(hist[digit])
+    return counts
+
+def compute_stats(cursor) -> tuple:
+    """pension 전체 → (자리수 통계, 집계에 쓰인 회차 수)"""
+    cursor.execute("SELECT first_prize FROM pension")
+    prizes = [row["first_prize"] if isinstance(row, dict) else row[0] for row in cursor.fetchall()]
+    matrix = digit_matrix(prizes)
+    return count_digits(matrix), len(matrix)
+
+def save_stats(cursor, counts: dict):
+    """전체 값 저장 + API 캐시(/pension/digit-stats) 무효화"""
+    data = [(pos, digit, cnt) for (pos, digit), cnt in counts.items()]
+    cursor.executemany(_UPSERT_SQL, data)
+    dataset_version.bump_versions(cursor, dataset_version.PENSION_DIGIT_STATS)
+    return len(data)
+
+def _stored_totals(cursor) -> dict:
+    """{position: win_count 합계} (= 해당 자리가 집계된 회차 수)"""
+    cursor.execute("SELECT position, SUM(win_count) AS total FROM pension_digit_stats GROUP BY position")
+    totals = {}
+    for row in cursor.fetchall():
+        if not isinstance(row, dict):
+            row = dict(zip(("position", "total"), row))
+        totals[row["position"]] = int(row["total"] or 0)
+    return totals
+
+def apply_new_rounds(cursor, new_first_prizes) -> str:
+    """
+    신규 회차(pension_crawler가 방금 저장한 first_prize 목록)만큼 증분 반영
+    - 저장된 자리별 합계가 모두 '기존 회차 수'와 같을 때만 증분 (pension은 이미 신규 회차 포함 상태)
+    - 맞지 않으면(최초 실행, 스크래핑 값이 남아있음, 형식 오류 회차 등) 전체 재계산
+    - 반환: "incremental" / "full"
+    """
+    new_matrix = digit_matrix(new_first_prizes)
+    cursor.execute("SELECT COUNT(*) AS cnt FROM pension")
+    row = cursor.fetchone()
+    total_rounds = int(row["cnt"] if isinstance(row, dict) else row[0])
+    before = total_rounds - len(new_matrix)
+
+    if not len(new_matrix) or _stored_totals(cursor) != {pos: before for pos in POSITIONS}:
+        counts, _ = compute_stats(cursor)
+        save_stats(cursor, counts)
+        return "full"
+
+    deltas = count_digits(new_matrix)
+    cursor.executemany(
+        "UPDATE pension_digit_stats SET win_count = win_count + %s WHERE position = %s AND digit = %s",
+        [(cnt, pos, digit) for (pos, digit), cnt in deltas.items() if cnt]
+    )
+    dataset_version.bump_versions(cursor, dataset_version.PENSION_DIGIT_STATS)
+    return "incremental"
+
+def update_from_new_rounds(new_first_prizes):
+    """pension_crawler에서 호출: 신규 회차 반영 (한 트랜잭션), 실패해도 수집 결과에는 영향 없음"""
+    conn = pymysql.connect(**DB_CONFIG)
+    try:
+        with conn.cursor() as cur:
+            # DDL은 암묵적 커밋이 일어나므로 트랜잭션 시작 전에 확인
+            dataset_version.ensure_table(cur)
+            conn.begin()
+            mode = apply_new_rounds(cur, new_first_prizes)
+        conn.commit()
+        print(f"✅ 자리수 통계 반영 완료 ({'증분' if mode == 'incremental' else '전체 재계산'})")
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️ 자리수 통계 반영 실패: {e}")
+    finally:
+        conn.close()
 
 def crawl_pension_stats():
-    """연금복권 통계 페이지 크롤링"""
+    """연금복권 통계 페이지 크롤링 (교차 검증용, 필요할 때만 Selenium import)"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     options = Options()
     options.add_argument("--headless=new")
     options.add_argument("--no-sandbox")
@@ -96,12 +188,13 @@ def crawl_pension_stats():
         wait.until(EC.presence_of_element_located((By.ID, "wnBndDiv")))
         time.sleep(1) # JS 렌더링 안정화
         
-        soup = BeautifulSoup(driver.page_source, "html.parser")
+        # ID_TO_POSITION 섹션만 파싱
+        soup = html_parse.parse(driver.page_source, targets=[f"#{div_id}" for div_id in ID_TO_POSITION])
         
         # ID_TO_POSITION에 정의된 각 ID 섹션을 순회하며 파싱
         for div_id, pos_name in ID_TO_POSITION.items():
             print(f"📊 {pos_name} 데이터 수집 중...")
-            container = soup.find("div", id=div_id)
+            container = soup.select_one(f"div#{div_id}")
             
             if not container:
                 print(f"⚠️ {div_id} 섹션을 찾을 수 없습니다.")
@@ -130,15 +223,46 @@ def crawl_pension_stats():
         
     return results
 
-def main():
-    print("🚀 연금복권 자리수 통계 수집 프로세스 시작")
+def cross_check(local: dict, scraped_rows: list) -> list:
+    """로컬 계산값과 사이트 값 비교 → 다른 항목 [(position, digit, 로컬, 사이트)]"""
+    site = {(r["position"], r["digit"]): r["win_count"] for r in scraped_rows}
+    return [(pos, digit, cnt, site.get((pos, digit)))
+            for (pos, digit), cnt in local.items() if site.get((pos, digit)) != cnt]
+
+def main(check=False):
+    print("🚀 연금복권 자리수 통계 계산 시작 (pension 테이블 기준 로컬 계산)")
     ensure_table()
-    
-    stats_data = crawl_pension_stats()
-    if stats_data:
-        insert_digit_stats_bulk(stats_data)
-        
+
+    conn = pymysql.connect(**DB_CONFIG)
+    try:
+        cur = conn.cursor()
+        dataset_version.ensure_table(cur)
+        started = time.perf_counter()
+        counts, rounds = compute_stats(cur)
+        if not rounds:
+            print("ℹ️ 저장할 데이터가 없습니다.")
+            return 1
+        conn.begin()
+        saved = save_stats(cur, counts)
+        conn.commit()
+        print(f"✅ 자리수 통계 {saved}건 DB 저장 완료 ({rounds}회차, {(time.perf_counter() - started) * 1000:.1f}ms)")
+    finally:
+        conn.close()
+
+    if check:
+        print("🔎 사이트 통계와 교차 검증 (Selenium)")
+        diffs = cross_check(counts, crawl_pension_stats())
+        if diffs:
+            for pos, digit, mine, theirs in diffs:
+                print(f"⚠️ 불일치: {pos} 자리 {digit} → 로컬 {mine} / 사이트 {theirs}")
+            return 1
+        print(f"✅ 교차 검증 일치 ({len(counts)}개 항목)")
+
     print("🏁 모든 작업이 완료되었습니다.")
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="연금복권 자리수별 출현 횟수 통계 (pension_digit_stats)")
+    parser.add_argument("--cross-check", action="store_true", help="사이트 통계를 Selenium으로 스크래핑해 로컬 계산값과 비교")
+    args = parser.parse_args()
+    sys.exit(main(check=args.cross_check))
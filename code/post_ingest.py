@@ -0,0 +1,240 @@
+"""
+로또 신규 회차 수집 후처리 파이프라인 (같은 프로세스에서 실행)
+- 예전에는 lotto_numbers_crawler.py가 subprocess로 carryover_init.py를 따로 실행해
+  인터프리터 기동 + import + DB 접속 + lotto_numbers 전체 재조회 비용을 매번 치렀습니다.
+- 여기서는 크롤러의 DB 연결을 그대로 쓰고, 크롤러가 방금 저장한 행(new_rows)을
+  지난 실행이 저장해 둔 비트마스크 인덱스(INDEX_CACHE 파일) 뒤에 붙여서
+  모든 단계(이월/미출현/번호 통계/레거시 lotto/응답 blob)가 같은 인덱스를 공유합니다.
+  (평소에는 lotto_numbers 전체를 다시 읽지 않음: ltEpsd > 마지막 회차 + COUNT/MIN/행 CRC 확인만,
+   캐시가 없거나 DB와 어긋나면(기존 회차 정정 포함) LottoIndex.refresh가 전체를 다시 읽음)
+- 전체 재조회(load_rows)는 --rebuild와 중간 회차가 채워진 경우(이월 전체 재계산)에만 합니다.
+- 이월 단계(IN_TRANSACTION_STAGES)는 크롤러가 신규 회차를 INSERT하는 트랜잭션 안에서 run_in_transaction으로
+  실행합니다. 실패하면 신규 회차도 함께 롤백되어, 새 회차만 보이고 이월 히스토리/조합 분석은 예전인 상태가 없습니다.
+- 나머지 단계(AFTER_COMMIT_STAGES)는 단계마다 별도 트랜잭션: 한 단계가 실패해도 롤백 후 다음 단계는 계속 진행하고,
+  단계별 소요 시간과 성공/실패를 결과로 돌려줍니다. (크롤러는 실패 단계가 있으면 0이 아닌 종료 코드로 끝남)
+
+단독 실행(복구/수동 재실행): python3 post_ingest.py [단계 이름 ...] [--rebuild]
+"""
+import os
+import sys
+import time
+import argparse
+import traceback
+import pymysql
+
+import carryover_init
+import dataset_version
+import lotto_gaps
+import lotto_legacy
+import lotto_statistics
+import response_blobs
+from lotto_index import LottoIndex
+
+DB_CONFIG = carryover_init.DB_CONFIG
+
+# 실행 사이에 재사용하는 인덱스 파일 (없어지면 다음 실행에서 전체 로딩 후 다시 저장)
+# 여러 사용자가 쓰는 임시 폴더가 아니라 실행 계정의 캐시 폴더(권한 700)에 둠
+INDEX_CACHE = os.getenv("LOTTO_INDEX_CACHE", os.path.join(
+    os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "lottery_app", "lotto_index.npz",
+))
+
+
+class PostIngestContext:
+    """단계들이 공유하는 입력"""
+
+    def __init__(self, conn, index, new_rounds, rebuild=False):
+        self.conn = conn
+        self.index = index                    # lotto_numbers 전체 비트마스크 인덱스 (회차 오름차순)
+        self.new_rounds = list(new_rounds)    # 이번 수집에서 새로 저장된 회차
+        self.rebuild = rebuild                # True면 이월/미출현/번호 통계를 전체로 재계산 (--rebuild, 기존 회차 정정)
+
+
+def load_index(cursor, new_rows=(), rebuild=False):
+    """
+    후처리용 인덱스
+    - 기본: 캐시 파일 + 크롤러가 넘긴 new_rows + refresh (ltEpsd > 마지막 회차만 조회, COUNT/MIN/행 CRC가 다르면 전체)
+      기존 회차가 정정된 경우 index.content_changed=True → 단계들은 rebuild처럼 전체 재계산
+    - rebuild=True: lotto_numbers 전체를 새로 읽음
+    """
+    if rebuild:
+        return LottoIndex.load(cursor)
+    index = LottoIndex.load_file(INDEX_CACHE)
+    index.append_rows(new_rows)
+    index.refresh(cursor)
+    return index
+
+
+def save_index(index):
+    """다음 실행용 캐시 저장 (실패해도 후처리 결과에는 영향 없음)"""
+    try:
+        os.makedirs(os.path.dirname(INDEX_CACHE), mode=0o700, exist_ok=True)
+        index.save(INDEX_CACHE)
+    except OSError as e:
+        print(f"⚠️ 인덱스 캐시 저장 실패 ({INDEX_CACHE}): {e}")
+
+
+# --- 단계: (ctx, cursor) → 결과 설명(문자열, 로그용) ---
+def stage_carryover(ctx, cursor):
+    """
+    이월 히스토리/요약 증분 + 새 기준 회차 조합 분석
+    - 평소: 인덱스에서 히스토리 마지막 회차 이후 행만 복원해 반영 (lotto_numbers 재조회 없음)
+    - 중간 회차가 채워진 경우(--full 복구 수집)나 --rebuild: 앞뒤 회차 비교가 바뀌므로 전체 재계산
+    """
+    new_rounds = set(ctx.new_rounds)
+    backfilled = bool(new_rounds) and any(
+        int(r) not in new_rounds for r in ctx.index.rounds if r > min(new_rounds)
+    )
+    if ctx.rebuild or backfilled:
+        target_round = carryover_init.rebuild_carryover_stats(cursor)
+    else:
+        target_round = carryover_init.update_carryover_incremental(cursor, index=ctx.index)
+    return f"기준 회차 {target_round}회 갱신" if target_round else "변경 없음"
+
+
+def stage_gaps(ctx, cursor):
+    """번호별 현재 미출현 기간 (lotto_gap_stats_main, /lotto/gaps) — 신규 회차당 O(45) 증분"""
+    # 테이블 확인(DDL)은 이 단계에서 아직 쓴 내용이 없을 때 실행 (이전 단계는 이미 커밋됨)
+    lotto_gaps.ensure_table(cursor)
+    mode = lotto_gaps.apply_new_rounds(cursor, ctx.index, [] if ctx.rebuild else ctx.new_rounds)
+    return f"{'증분 반영' if mode == 'incremental' else '전체 재계산'} (기준 {ctx.index.last_round}회)"
+
+
+def stage_stats(ctx, cursor):
+    """번호별 당첨 횟수 (lotto_number_stats, /lotto/number-stats) — 신규 회차만큼 증분"""
+    mode = lotto_statistics.apply_new_rounds(cursor, ctx.index, [] if ctx.rebuild else ctx.new_rounds)
+    return "증분 반영" if mode == "incremental" else "전체 재계산"
+
+
+def stage_legacy(ctx, cursor):
+    """레거시 lotto 테이블 (/lotto/all, /lotto/count) — lotto_numbers에서 INSERT ... SELECT"""
+    inserted = lotto_legacy.sync_from_lotto_numbers(cursor)
+    return f"{inserted}회차 추가" if inserted else "변경 없음"
+
+
+def stage_blobs(ctx, cursor):
+    """대용량 응답 사전 생성 (/lotto/numbers/all 3종 + /lotto/all + /lotto/carryover/list-all)"""
+    # 테이블 확인(DDL)은 이 단계에서 아직 쓴 내용이 없을 때 실행, 커밋은 run_post_ingest가 단계 끝에서
+    response_blobs.ensure_table(cursor)
+    changed = response_blobs.materialize(
+        ctx.conn,
+        response_blobs.LOTTO_NUMBERS_ALL,
+        response_blobs.LOTTO_NUMBERS_COLUMNAR,
+        response_blobs.LOTTO_NUMBERS_PACKED,
+        response_blobs.LOTTO_ALL,
+        response_blobs.CARRYOVER_LIST_ALL,
+    )
+    return f"변경 {sum(changed.values())}/{len(changed)}개"
+
+
+# 실행 순서대로
+STAGES = {
+    "carryover": stage_carryover,
+    "gaps": stage_gaps,
+    "stats": stage_stats,
+    "legacy": stage_legacy,
+    "blobs": stage_blobs,
+}
+# 크롤러의 INSERT 트랜잭션 안에서 실행하는 단계 / 커밋 후 run_post_ingest로 실행하는 단계
+IN_TRANSACTION_STAGES = ("carryover",)
+AFTER_COMMIT_STAGES = tuple(name for name in STAGES if name not in IN_TRANSACTION_STAGES)
+
+
+def run_in_transaction(conn, cursor, new_rows):
+    """
+    크롤러가 신규 회차를 INSERT한 트랜잭션 안에서 IN_TRANSACTION_STAGES 실행 (커밋/롤백은 호출한 쪽)
+    - 실패하면 예외를 그대로 올려서 호출한 쪽이 신규 회차 저장까지 롤백하게 함
+    - 반환: 인덱스 (커밋 후 run_post_ingest(index=...)에 넘기면 다시 만들지 않음)
+    """
+    new_rows = list(new_rows)
+    index = load_index(cursor, new_rows)
+    ctx = PostIngestContext(conn, index, [row["ltEpsd"] for row in new_rows], index.content_changed)
+    for name in IN_TRANSACTION_STAGES:
+        t0 = time.perf_counter()
+        detail = STAGES[name](ctx, cursor)
+        print(f"   ✅ [{name}] {detail} ({(time.perf_counter() - t0) * 1000:.1f}ms, 수집과 같은 트랜잭션)")
+    return index
+
+
+def run_post_ingest(conn, new_rows=(), stages=None, rebuild=False, index=None):
+    """
+    후처리 단계 실행
+    - conn: DictCursor 연결 (autocommit 꺼짐, 크롤러 연결 재사용 가능)
+    - new_rows: 이번 수집에서 새로 저장한 lotto_numbers 행 (dict, ltRflYmd는 YYYY-MM-DD)
+    - stages: 실행할 단계 이름 목록 (생략 시 STAGES 전체)
+    - rebuild: lotto_numbers 전체를 다시 읽고 이월 통계를 전체 재계산 (복구용)
+    - index: run_in_transaction이 만든 인덱스 (있으면 다시 로드하지 않음)
+    - 반환: [{"stage", "ok", "elapsed_ms", "detail", "error"}, ...]
+    """
+    names = list(stages or STAGES)
+    results = []
+    new_rows = list(new_rows)
+
+    started = time.perf_counter()
+    if index is None:
+        try:
+            with conn.cursor() as cursor:
+                index = load_index(cursor, new_rows, rebuild)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ 후처리 입력(lotto_numbers 인덱스) 로드 실패: {e}")
+            return [{"stage": name, "ok": False, "elapsed_ms": 0.0, "detail": None, "error": str(e)} for name in names]
+    if not len(index):
+        print("❌ 분석할 로또 데이터가 없습니다.")
+        return []
+
+    # 기존 회차가 정정됐으면 증분 결과가 틀리므로 전체 재계산
+    ctx = PostIngestContext(conn, index, [row["ltEpsd"] for row in new_rows], rebuild or index.content_changed)
+    print(f"🔧 후처리 시작: {len(index)}회차 인덱스 ({(time.perf_counter() - started) * 1000:.1f}ms), "
+          f"신규 회차 {ctx.new_rounds or '-'}")
+
+    for name in names:
+        stage = STAGES[name]
+        t0 = time.perf_counter()
+        result = {"stage": name, "ok": True, "elapsed_ms": 0.0, "detail": None, "error": None}
+        try:
+            with conn.cursor() as cursor:
+                result["detail"] = stage(ctx, cursor)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            result["ok"] = False
+            result["error"] = str(e)
+            traceback.print_exc()
+        result["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        results.append(result)
+
+        if result["ok"]:
+            print(f"   ✅ [{name}] {result['detail']} ({result['elapsed_ms']}ms)")
+        else:
+            print(f"   ❌ [{name}] 실패: {result['error']} ({result['elapsed_ms']}ms)")
+
+    save_index(ctx.index)
+
+    failed = [r["stage"] for r in results if not r["ok"]]
+    total_ms = (time.perf_counter() - started) * 1000
+    if failed:
+        print(f"⚠️ 후처리 완료 (실패 단계: {', '.join(failed)}) - {total_ms:.1f}ms")
+    else:
+        print(f"✨ 후처리 모든 단계 성공 - {total_ms:.1f}ms")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로또 수집 후처리 (복구/수동 재실행)")
+    parser.add_argument("stages", nargs="*", help=f"실행할 단계 (생략 시 전체: {', '.join(STAGES)})")
+    parser.add_argument("--rebuild", action="store_true", help="lotto_numbers 전체를 다시 읽고 이월 통계 전체 재계산")
+    args = parser.parse_args()
+    unknown = [n for n in args.stages if n not in STAGES]
+    if unknown:
+        print(f"❌ 알 수 없는 단계: {', '.join(unknown)} (가능: {', '.join(STAGES)})")
+        sys.exit(1)
+    conn = pymysql.connect(**DB_CONFIG)
+    try:
+        with conn.cursor() as cursor:
+            # DDL은 암묵적 커밋이 일어나므로 단계 트랜잭션 시작 전에 확인
+            dataset_version.ensure_table(cursor)
+        results = run_post_ingest(conn, stages=args.stages, rebuild=args.rebuild)
+        sys.exit(0 if all(r["ok"] for r in results) else 1)
+    finally:
+        conn.close()
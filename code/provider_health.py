@@ -0,0 +1,182 @@
+"""
+AI 제공자 호출 기록 / 상태(health) / 서킷 브레이커 (ai_crawler.py에서 사용)
+- 시도(attempt)마다 지연 시간, HTTP 상태, 결과, 토큰 사용량을 ai_provider_attempts에 남김
+- 실행이 끝나면 제공자별 최근 HEALTH_WINDOW회 시도로 오류율 / p95 지연 / 연속 실패 수를 계산해
+  ai_provider_health에 저장 → 다음 실행에서 서킷 브레이커와 hedge 기준으로 사용
+- 서킷 브레이커
+    closed    : 연속 실패 < BREAKER_FAILURES → 정상 호출
+    open      : 연속 실패 ≥ BREAKER_FAILURES 이고 마지막 시도 후 BREAKER_COOLDOWN 초 미만 → 호출 생략
+    half_open : 연속 실패 ≥ BREAKER_FAILURES 이지만 쿨다운이 지남 → 재시도 없이 1회만 시험 호출
+"""
+import threading
+
+HEALTH_WINDOW = 50          # 상태 계산에 쓰는 최근 시도 수
+BREAKER_FAILURES = 5        # 이 횟수만큼 연속 실패하면 open
+BREAKER_COOLDOWN = 6 * 3600  # open 유지 시간(초), 이후 half_open 시험 호출
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+OK = "ok"  # 그 외 결과: invalid_json, http_error, bad_response, timeout, exception
+
+_ATTEMPT_COLUMNS = (
+    "week_key", "provider", "attempt_no", "is_hedge", "latency_ms", "http_status",
+    "outcome", "prompt_tokens", "completion_tokens", "total_tokens", "error",
+)
+
+
+def ensure_tables(cursor):
+    """
+    테이블 생성 확인
+    ⚠️ DDL은 MySQL에서 암묵적 커밋을 일으키므로 트랜잭션 시작 전에 호출하세요.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS ai_provider_attempts (
+      id BIGINT AUTO_INCREMENT PRIMARY KEY,
+      week_key VARCHAR(16) NOT NULL,
+      provider VARCHAR(64) NOT NULL,
+      attempt_no TINYINT NOT NULL,
+      is_hedge TINYINT(1) NOT NULL DEFAULT 0,
+      latency_ms INT NOT NULL,
+      http_status SMALLINT NULL,
+      outcome VARCHAR(16) NOT NULL,
+      prompt_tokens INT NULL,
+      completion_tokens INT NULL,
+      total_tokens INT NULL,
+      error VARCHAR(255) NULL,
+      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      KEY idx_provider_id (provider, id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS ai_provider_health (
+      provider VARCHAR(64) NOT NULL PRIMARY KEY,
+      attempts INT NOT NULL,
+      error_rate DECIMAL(5,4) NOT NULL,
+      p95_latency_ms INT NULL,
+      avg_latency_ms INT NULL,
+      consecutive_failures INT NOT NULL,
+      total_tokens BIGINT NOT NULL DEFAULT 0,
+      last_attempt_at TIMESTAMP NULL,
+      last_success_at TIMESTAMP NULL,
+      updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+class AttemptLog:
+    """실행 중 시도 기록을 메모리에 모아뒀다가 flush()로 한 번에 저장 (스레드 안전)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = []
+
+    def record(self, week_key, provider, attempt_no, is_hedge, latency_ms, http_status, outcome,
+               usage=(None, None, None), error=None):
+        row = (week_key, provider, attempt_no, int(is_hedge), int(latency_ms), http_status, outcome,
+               *usage, (str(error)[:255] if error else None))
+        with self._lock:
+            self._rows.append(row)
+
+    def rows(self):
+        with self._lock:
+            return list(self._rows)
+
+    def flush(self, cursor):
+        """시도 기록 저장 후 비움, 기록이 있었던 제공자 목록 반환"""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if rows:
+            cursor.executemany(
+                f"INSERT INTO ai_provider_attempts ({', '.join(_ATTEMPT_COLUMNS)}) "
+                f"VALUES ({', '.join(['%s'] * len(_ATTEMPT_COLUMNS))})",
+                rows,
+            )
+        return sorted({row[1] for row in rows})
+
+
+def _percentile(values, pct):
+    """최근접 순위(nearest-rank) 백분위"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil
+    return ordered[int(rank) - 1]
+
+
+def summarize(attempts):
+    """
+    최근 시도 목록(최신순, (latency_ms, outcome, total_tokens)) → 상태 값
+    """
+    latencies = [a[0] for a in attempts]
+    failures = [a for a in attempts if a[1] != OK]
+    consecutive = 0
+    for _, outcome, _ in attempts:
+        if outcome == OK:
+            break
+        consecutive += 1
+    return {
+        "attempts": len(attempts),
+        "error_rate": round(len(failures) / len(attempts), 4) if attempts else 0,
+        "p95_latency_ms": _percentile(latencies, 95),
+        "avg_latency_ms": int(sum(latencies) / len(latencies)) if latencies else None,
+        "consecutive_failures": consecutive,
+        "total_tokens": sum(a[2] or 0 for a in attempts),
+    }
+
+
+def refresh_health(cursor, providers):
+    """제공자별 최근 HEALTH_WINDOW회 시도로 ai_provider_health 갱신"""
+    for provider in providers:
+        cursor.execute(
+            "SELECT latency_ms, outcome, total_tokens FROM ai_provider_attempts "
+            "WHERE provider = %s ORDER BY id DESC LIMIT %s",
+            (provider, HEALTH_WINDOW),
+        )
+        attempts = [tuple(row.values()) if isinstance(row, dict) else tuple(row) for row in cursor.fetchall()]
+        s = summarize(attempts)
+        cursor.execute("""
+            INSERT INTO ai_provider_health
+              (provider, attempts, error_rate, p95_latency_ms, avg_latency_ms, consecutive_failures, total_tokens,
+               last_attempt_at, last_success_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s,
+              (SELECT MAX(created_at) FROM ai_provider_attempts WHERE provider = %s),
+              (SELECT MAX(created_at) FROM ai_provider_attempts WHERE provider = %s AND outcome = %s))
+            ON DUPLICATE KEY UPDATE
+              attempts = VALUES(attempts),
+              error_rate = VALUES(error_rate),
+              p95_latency_ms = VALUES(p95_latency_ms),
+              avg_latency_ms = VALUES(avg_latency_ms),
+              consecutive_failures = VALUES(consecutive_failures),
+              total_tokens = VALUES(total_tokens),
+              last_attempt_at = VALUES(last_attempt_at),
+              last_success_at = VALUES(last_success_at)
+        """, (provider, s["attempts"], s["error_rate"], s["p95_latency_ms"], s["avg_latency_ms"],
+              s["consecutive_failures"], s["total_tokens"], provider, provider, OK))
+
+
+def load_health(cursor):
+    """{provider: 상태 dict (+ seconds_since_attempt)}"""
+    cursor.execute("""
+        SELECT provider, attempts, error_rate, p95_latency_ms, avg_latency_ms, consecutive_failures,
+               total_tokens, TIMESTAMPDIFF(SECOND, last_attempt_at, NOW()) AS seconds_since_attempt
+        FROM ai_provider_health
+    """)
+    columns = ("provider", "attempts", "error_rate", "p95_latency_ms", "avg_latency_ms",
+               "consecutive_failures", "total_tokens", "seconds_since_attempt")
+    health = {}
+    for row in cursor.fetchall():
+        if not isinstance(row, dict):
+            row = dict(zip(columns, row))
+        health[row["provider"]] = row
+    return health
+
+
+def breaker_state(health):
+    """제공자 상태 dict(없으면 None) → CLOSED / OPEN / HALF_OPEN"""
+    if not health or (health.get("consecutive_failures") or 0) < BREAKER_FAILURES:
+        return CLOSED
+    since = health.get("seconds_since_attempt")
+    if since is not None and since < BREAKER_COOLDOWN:
+        return OPEN
+    return HALF_OPEN
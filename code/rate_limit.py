@@ -0,0 +1,122 @@
+"""
+요청 속도 제한 + 동시 백필 (네이버 크롤러 lotto_crawler.py --naver / pension_crawler.py Selenium 경로에서 사용)
+- AdaptiveRateLimiter: 초당 요청 수(rate) 예산을 지키는 토큰 버킷 (GCRA 방식, 여러 스레드가 공유)
+    · 요청마다 0 ~ jitter × 간격 만큼 무작위로 더 기다려서 요청 시각이 일정한 패턴이 되지 않게 함
+      (지터를 더한 시각 기준으로 다음 예약을 잡으므로 예산을 넘지 않음)
+    · 429/503 응답이면 penalize(): 속도를 절반으로 낮추고 Retry-After 동안 모든 요청을 멈춤
+    · 연속 성공 recover_after회마다 reward(): 속도를 1.25배씩 원래 예산까지 회복
+- 요청은 http_client.get(url, limiter=...)으로 보내면 시도마다 acquire() / penalize() / reward()가 적용됨
+- run_backfill(): 회차 목록을 작은 작업자 풀에서 가져오기+파싱하고,
+  앞 회차가 모두 끝난 만큼씩 회차 순서대로 호출한 스레드에서 저장 (수집과 DB 쓰기를 겹쳐서 진행)
+"""
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+class AdaptiveRateLimiter:
+    def __init__(self, rate, burst=1, jitter=0.25, min_rate=None, recover_after=10):
+        self.base_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.jitter = jitter
+        self.min_rate = min_rate or self.base_rate / 8
+        self.recover_after = recover_after
+        self._lock = threading.Lock()
+        self._tat = 0.0             # 다음 요청이 예산 안에 들어오는 이론상 시각 (theoretical arrival time)
+        self._blocked_until = 0.0   # Retry-After 동안 전체 정지
+        self._successes = 0
+        self._waited = 0.0
+        self._requests = 0
+        self._slowdowns = 0
+
+    def acquire(self):
+        """요청 1건을 보낼 수 있을 때까지 대기 (실제 대기 시간 초 반환)"""
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            start = max(now, self._tat - (self.burst - 1) * interval, self._blocked_until)
+            start += random.uniform(0, self.jitter * interval)
+            self._tat = max(self._tat, start) + interval
+            self._requests += 1
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+            with self._lock:
+                self._waited += delay
+        return max(delay, 0.0)
+
+    def penalize(self, retry_after=None):
+        """429/503: 속도 절반 + (Retry-After가 있으면) 그동안 전체 정지"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._successes = 0
+            self._slowdowns += 1
+            pause = retry_after if retry_after is not None else 1.0 / self.rate
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+            print(f"🐢 요청 제한 응답: 속도를 {self.rate:.2f}건/초로 낮추고 {pause:.1f}초 대기")
+
+    def reward(self):
+        """성공 응답: recover_after회 연속 성공마다 원래 예산 쪽으로 회복"""
+        with self._lock:
+            self._successes += 1
+            if self.rate < self.base_rate and self._successes >= self.recover_after:
+                self.rate = min(self.base_rate, self.rate * 1.25)
+                self._successes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "base_rate": self.base_rate,
+                "requests": self._requests,
+                "slowdowns": self._slowdowns,
+                "waited_sec": round(self._waited, 2),
+            }
+
+
+def run_backfill(items, work, write, workers=3):
+    """
+    items를 작업자 workers개로 동시에 처리
+    - work(item) → 결과 (None이면 실패로 봄): 작업자 스레드에서 실행 (요청 + 파싱)
+    - write(item, 결과): 호출한 스레드에서 items 순서대로 실행 (DB 연결을 스레드 간에 공유하지 않음)
+        먼저 끝난 결과는 앞 항목이 모두 저장될 때까지 보관했다가 이어지는 만큼만 저장
+    - 한 항목이 실패(예외 / None / 저장 실패)하면 그 뒤 항목은 저장하지 않고 아직 시작 안 한 작업은 취소
+      → 저장된 것은 항상 items의 앞부분이라, MAX(회차)+1부터 다시 시작해도 빠지는 회차가 없음
+    - 반환: 저장한 결과 목록 (items 순서)
+    """
+    written = []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items)))) as pool:
+        futures = {pool.submit(work, item): i for i, item in enumerate(items)}
+        done = {}
+        next_index = 0
+        failed = False
+        for fut in as_completed(futures):
+            if failed:
+                continue
+            i = futures[fut]
+            try:
+                done[i] = fut.result()
+            except Exception as e:
+                print(f"   ∟ ❌ {items[i]} 처리 중 에러: {e}")
+                done[i] = None
+            while next_index in done:
+                item, result = items[next_index], done.pop(next_index)
+                if result is None:
+                    failed = True
+                    break
+                try:
+                    write(item, result)
+                except Exception as e:
+                    print(f"   ∟ ❌ {item} 저장 중 에러: {e}")
+                    failed = True
+                    break
+                written.append(result)
+                next_index += 1
+            if failed:
+                for other in futures:
+                    other.cancel()
+                skipped = len(items) - next_index - 1
+                if skipped:
+                    print(f"   ∟ ⚠️ {items[next_index]} 실패 → 뒤 {skipped}개는 저장하지 않음 (다음 실행에서 다시 수집)")
+    return written
@@ -0,0 +1,241 @@
+"""
+대용량 API 응답 사전 생성 (materialized response blobs)
+- /lotto/numbers/all(JSON/columnar/packed), /lotto/all, /speetto/status, /lotto/carryover/list-all 은
+  매 요청마다 테이블 전체 SELECT + 포맷 + json.dumps를 하던 엔드포인트입니다.
+- 수집(ingest) 작업이 데이터를 바꾼 직후 materialize()를 호출하면
+  응답 바이트 + gzip 바이트 + 내용 해시를 api_response_blobs 테이블에 저장하고,
+  Flask는 이 바이트를 메모리에 올려 그대로 내려줍니다 (요청 경로에서 DB/직렬화 없음).
+- blob은 이 저장소의 수집 스크립트가 쓰는 테이블만 대상입니다.
+  (/speetto의 speetto 테이블은 외부에서 채워져 갱신 시점을 알 수 없으므로 API가 DB에서 직접 응답)
+
+단독 실행: python3 response_blobs.py [blob 이름 ...]  (이름 생략 시 전체 재생성)
+"""
+import sys
+import gzip
+import json
+import hashlib
+import pymysql
+
+import dataset_version
+import lotto_codec
+from api_formatters import (
+    format_lotto_numbers_result,
+    format_lotto_result,
+    format_speetto_status_result,
+    format_combo_analysis_result,
+)
+
+DB_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 3306,
+    "user": "admin",
+    "password": "chaerin",
+    "database": "lottery_app",
+    "charset": "utf8mb4",
+    "autocommit": True,
+}
+
+# blob 이름 (= API 엔드포인트 1:1)
+LOTTO_NUMBERS_ALL = "lotto_numbers_all"    # /lotto/numbers/all
+LOTTO_NUMBERS_COLUMNAR = "lotto_numbers_columnar"  # /lotto/numbers/all?format=columnar
+LOTTO_NUMBERS_PACKED = "lotto_numbers_packed"      # /lotto/numbers/all?format=packed
+LOTTO_ALL = "lotto_all"                    # /lotto/all
+SPEETTO_STATUS = "speetto_status"          # /speetto/status
+CARRYOVER_LIST_ALL = "carryover_list_all"  # /lotto/carryover/list-all
+
+
+def _json_bytes(payload):
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+NO_DATA = _json_bytes({"error": "No data found"})
+
+
+# --- 엔드포인트별 응답 생성기: (body bytes, http status) 반환 ---
+def _lotto_numbers_items(cursor):
+    # ✅ ltEpsd DESC를 통해 최신 회차부터 내림차순 정렬
+    cursor.execute("SELECT * FROM lotto_numbers ORDER BY ltEpsd DESC")
+    return [format_lotto_numbers_result(row) for row in cursor.fetchall()]
+
+
+def build_lotto_numbers_all(cursor):
+    items = _lotto_numbers_items(cursor)
+    if not items:
+        return NO_DATA, 404
+    return _json_bytes(items), 200
+
+
+# 빈 테이블이면 세 포맷 모두 JSON 포맷과 같은 404 + NO_DATA
+def build_lotto_numbers_columnar(cursor):
+    items = _lotto_numbers_items(cursor)
+    if not items:
+        return NO_DATA, 404
+    return lotto_codec.encode_columnar(items), 200
+
+
+def build_lotto_numbers_packed(cursor):
+    items = _lotto_numbers_items(cursor)
+    if not items:
+        return NO_DATA, 404
+    return lotto_codec.encode_packed(items), 200
+
+
+def build_lotto_all(cursor):
+    cursor.execute("SELECT * FROM lotto ORDER BY round DESC")
+    rows = cursor.fetchall()
+    if not rows:
+        return NO_DATA, 404
+    return _json_bytes([format_lotto_result(row) for row in rows]), 200
+
+
+def build_speetto_status(cursor):
+    cursor.execute("SELECT * FROM speetto_status ORDER BY speetto_type DESC, round DESC")
+    rows = cursor.fetchall()
+    if not rows:
+        return NO_DATA, 404
+    return _json_bytes([format_speetto_status_result(row) for row in rows]), 200
+
+
+def build_carryover_list_all(cursor):
+    # 전체 데이터 조회 (최신 회차부터, 적중률 높은 순으로)
+    cursor.execute("""
+        SELECT
+            id, target_round, combo_count, include_bonus,
+            numbers_combo, total_occur, total_appear,
+            hit_rate, history_rounds, created_at
+        FROM lotto_carryover_combo_analysis
+        ORDER BY target_round DESC, hit_rate DESC
+    """)
+    full_list = [format_combo_analysis_result(row) for row in cursor.fetchall()]
+    return _json_bytes({
+        "status": "success",
+        "total_count": len(full_list),
+        "data": full_list
+    }), 200
+
+
+BUILDERS = {
+    LOTTO_NUMBERS_ALL: build_lotto_numbers_all,
+    LOTTO_NUMBERS_COLUMNAR: build_lotto_numbers_columnar,
+    LOTTO_NUMBERS_PACKED: build_lotto_numbers_packed,
+    LOTTO_ALL: build_lotto_all,
+    SPEETTO_STATUS: build_speetto_status,
+    CARRYOVER_LIST_ALL: build_carryover_list_all,
+}
+
+
+def version_name(name):
+    """dataset_versions에 기록되는 blob 버전 키 (Flask가 이 값으로 재로딩 여부 판단)"""
+    return f"blob:{name}"
+
+
+def ensure_table(cursor):
+    """
+    api_response_blobs / dataset_versions 테이블 생성 확인
+    ⚠️ DDL은 MySQL에서 암묵적 커밋을 일으키므로 트랜잭션 시작 전에 호출하세요.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS api_response_blobs (
+      name VARCHAR(64) NOT NULL PRIMARY KEY,
+      status SMALLINT NOT NULL DEFAULT 200,
+      content_hash CHAR(64) NOT NULL,
+      body LONGBLOB NOT NULL,
+      body_gzip LONGBLOB NOT NULL,
+      updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    dataset_version.ensure_table(cursor)
+
+
+def materialize(conn, *names):
+    """
+    지정한 blob(생략 시 전체)을 다시 만들어 저장
+    - 내용 해시가 그대로면 쓰기/버전 증가를 건너뜀
+    - 테이블 확인(ensure_table)과 커밋은 호출한 쪽에서 (호출한 쪽 트랜잭션을 몰래 커밋하지 않음)
+    - 반환: {이름: 변경 여부}
+    """
+    names = names or tuple(BUILDERS)
+    changed = {}
+    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        cursor.execute(
+            f"SELECT name, content_hash FROM api_response_blobs WHERE name IN ({','.join(['%s'] * len(names))})",
+            names,
+        )
+        current = {row["name"]: row["content_hash"] for row in cursor.fetchall()}
+
+        for name in names:
+            body, status = BUILDERS[name](cursor)
+            content_hash = hashlib.sha256(body).hexdigest()
+            if current.get(name) == content_hash:
+                changed[name] = False
+                continue
+
+            cursor.execute("""
+                INSERT INTO api_response_blobs (name, status, content_hash, body, body_gzip)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                  status = VALUES(status),
+                  content_hash = VALUES(content_hash),
+                  body = VALUES(body),
+                  body_gzip = VALUES(body_gzip)
+            """, (name, status, content_hash, body, gzip.compress(body, compresslevel=9)))
+            dataset_version.bump_versions(cursor, version_name(name))
+            changed[name] = True
+            print(f"📦 응답 blob 갱신: {name} ({len(body):,} bytes, {status})")
+    return changed
+
+
+def rebuild(conn, *names):
+    """
+    테이블 확인 → materialize → 커밋 (blob만 갱신하는 독립 작업용, 열린 트랜잭션이 없는 연결에서 호출)
+    """
+    with conn.cursor() as cursor:
+        ensure_table(cursor)
+    changed = materialize(conn, *names)
+    conn.commit()
+    return changed
+
+
+def materialize_quietly(*names):
+    """
+    수집 스크립트 끝에서 호출용: 실패해도 수집 결과에는 영향 주지 않음
+    (blob이 없거나 오래된 경우 API는 마지막 blob 또는 DB 직접 조회로 응답)
+    """
+    try:
+        conn = pymysql.connect(**DB_CONFIG)
+        try:
+            return rebuild(conn, *names)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ 응답 blob 갱신 실패 ({', '.join(names) or 'all'}): {e}")
+        return {}
+
+
+def load_blob(cursor, name):
+    """Flask 쪽에서 사용: 저장된 blob 1건 (없으면 None)"""
+    cursor.execute(
+        "SELECT status, content_hash, body, body_gzip FROM api_response_blobs WHERE name = %s",
+        (name,),
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    if not isinstance(row, dict):
+        row = dict(zip(("status", "content_hash", "body", "body_gzip"), row))
+    return row
+
+
+if __name__ == "__main__":
+    targets = sys.argv[1:]
+    unknown = [n for n in targets if n not in BUILDERS]
+    if unknown:
+        print(f"❌ 알 수 없는 blob: {', '.join(unknown)} (가능: {', '.join(BUILDERS)})")
+        sys.exit(1)
+    conn = pymysql.connect(**DB_CONFIG)
+    try:
+        result = rebuild(conn, *targets)
+        print(f"🎯 blob 재생성 완료: {result}")
+    finally:
+        conn.close()
@@ -0,0 +1,159 @@
+"""
+스피또 상세(speetto_status) 변경 감지
+- 동기화할 때마다 대부분의 상세 응답이 그대로인데도 모든 행을 다시 쓰던 문제를 없애기 위해
+  정규화한 행(mapped_data)의 내용 해시를 speetto_status_hashes에 저장하고, 해시가 바뀐 행만 씁니다.
+- 바뀐 행이 있으면 종류(speetto_type)별 변경 번호(change_seq)와 시각을 speetto_type_changes에 남겨
+  /speetto/status/changes?cursor= 로 바뀐 종류만 내려받을 수 있게 합니다.
+- change_seq는 같은 트랜잭션에서 올린 SPEETTO_STATUS 데이터셋 버전입니다.
+  버전 행 잠금 때문에 쓰는 쪽이 커밋 순서대로 번호를 받으므로, 클라이언트가 본 최대 번호보다
+  나중에 보이는(커밋되는) 변경은 항상 더 큰 번호를 가집니다.
+  (NOW() 기준 시각은 INSERT 시점에 찍히고 커밋 때 보이므로 그 사이에 읽은 클라이언트가 변경을 놓칠 수 있음)
+- 크롤러(speetto_status_crawler.py)와 API(flask/app.py)가 같이 쓰는 모듈이므로 커서만 받습니다.
+"""
+import json
+import hashlib
+
+import dataset_version
+
+
+def ensure_tables(cursor):
+    """
+    테이블 생성 확인
+    ⚠️ DDL은 MySQL에서 암묵적 커밋을 일으키므로 트랜잭션 시작 전에 호출하세요.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS speetto_status_hashes (
+      speetto_type VARCHAR(64) NOT NULL,
+      round INT NOT NULL,
+      content_hash CHAR(64) NOT NULL,
+      updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ON UPDATE CURRENT_TIMESTAMP,
+      PRIMARY KEY (speetto_type, round)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS speetto_type_changes (
+      speetto_type VARCHAR(64) NOT NULL PRIMARY KEY,
+      change_seq BIGINT NOT NULL DEFAULT 0,
+      changed_at DATETIME(3) NOT NULL,
+      changed_rows INT NOT NULL,
+      KEY idx_change_seq (change_seq),
+      KEY idx_changed_at (changed_at)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    # change_seq 이전에 만들어진 테이블 보강
+    cursor.execute("SHOW COLUMNS FROM speetto_type_changes LIKE 'change_seq'")
+    if not cursor.fetchall():
+        cursor.execute("""
+        ALTER TABLE speetto_type_changes
+          ADD COLUMN change_seq BIGINT NOT NULL DEFAULT 0 AFTER speetto_type,
+          ADD KEY idx_change_seq (change_seq)
+        """)
+
+
+def _normalize(value):
+    """해시 입력 정규화: None은 그대로, 나머지는 앞뒤 공백을 제거한 문자열 (DB 타입 변환 차이 무시)"""
+    return None if value is None else str(value).strip()
+
+
+def row_hash(mapped_data, columns):
+    """mapped_data(컬럼 dict) → 컬럼 순서 고정 JSON의 sha256"""
+    payload = json.dumps([_normalize(mapped_data.get(k)) for k in columns], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def stored_hashes(cursor):
+    """
+    {(speetto_type, round): content_hash}
+    - speetto_status에 실제로 남아 있는 행만 (행을 수동으로 지웠으면 해시가 같아도 다시 씀)
+    """
+    cursor.execute("""
+        SELECT h.speetto_type, h.round, h.content_hash
+        FROM speetto_status_hashes h
+        JOIN speetto_status s ON s.speetto_type = h.speetto_type AND s.round = h.round
+    """)
+    hashes = {}
+    for row in cursor.fetchall():
+        if isinstance(row, dict):
+            hashes[(row["speetto_type"], int(row["round"]))] = row["content_hash"]
+        else:
+            hashes[(row[0], int(row[1]))] = row[2]
+    return hashes
+
+
+def changed_only(cursor, mapped_rows, columns):
+    """
+    mapped_data 목록 중 저장된 해시와 다른 행만
+    - 반환: [(mapped_data, content_hash), ...]
+    """
+    current = stored_hashes(cursor)
+    changed = []
+    for mapped_data in mapped_rows:
+        content_hash = row_hash(mapped_data, columns)
+        key = (mapped_data["speetto_type"], mapped_data["round"])
+        if current.get(key) != content_hash:
+            changed.append((mapped_data, content_hash))
+    return changed
+
+
+def record_changes(cursor, changed):
+    """
+    바뀐 행의 해시 + 종류별 변경 번호/시각 저장 (호출한 쪽 트랜잭션과 함께 커밋됨)
+    - SPEETTO_STATUS 데이터셋 버전을 여기서 올리고 그 값을 change_seq로 씀 (호출한 쪽에서 다시 올리지 않음)
+    - 반환: 변경된 종류 목록
+    """
+    if not changed:
+        return []
+    # 버전 행을 먼저 잠가서 동시에 쓰는 다른 트랜잭션과 번호 순서 = 커밋 순서가 되게 함
+    dataset_version.bump_versions(cursor, dataset_version.SPEETTO_STATUS)
+    seq = dataset_version.current_version(cursor, dataset_version.SPEETTO_STATUS)
+
+    cursor.executemany("""
+        INSERT INTO speetto_status_hashes (speetto_type, round, content_hash)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE content_hash = VALUES(content_hash)
+    """, [(m["speetto_type"], m["round"], h) for m, h in changed])
+
+    per_type = {}
+    for m, _ in changed:
+        per_type[m["speetto_type"]] = per_type.get(m["speetto_type"], 0) + 1
+    cursor.executemany("""
+        INSERT INTO speetto_type_changes (speetto_type, change_seq, changed_at, changed_rows)
+        VALUES (%s, %s, NOW(3), %s)
+        ON DUPLICATE KEY UPDATE
+          change_seq = VALUES(change_seq),
+          changed_at = VALUES(changed_at),
+          changed_rows = VALUES(changed_rows)
+    """, [(name, seq, count) for name, count in sorted(per_type.items())])
+    return sorted(per_type)
+
+
+def changed_types(cursor, after_seq=None, since=None, since_epoch=None):
+    """
+    바뀐 종류 + 다음 요청에 쓸 커서
+    - after_seq: 이전 응답의 next_cursor (이 번호보다 큰 변경만)
+    - since / since_epoch: 변경 시각 기준 필터 (첫 동기화용)
+        since는 DB 세션 시간대의 시각(datetime), since_epoch는 epoch 초 → SQL FROM_UNIXTIME으로 변환
+    - 모두 생략하면 전체
+    - 반환: ([{"speetto_type", "change_seq", "changed_at", "changed_rows"}, ...] 번호 오름차순, next_cursor)
+      next_cursor는 같은 SELECT에서 본 최대 change_seq (그 뒤에 커밋되는 변경은 모두 이보다 큼)
+    """
+    if after_seq is not None:
+        selected, params = "change_seq > %s", (after_seq,)
+    elif since_epoch is not None:
+        selected, params = "changed_at > FROM_UNIXTIME(%s)", (since_epoch,)
+    elif since is not None:
+        selected, params = "changed_at > %s", (since,)
+    else:
+        selected, params = "TRUE", ()
+    # 종류 수만큼의 작은 테이블이라 전체를 한 번에 읽어 같은 스냅샷에서 최대 번호를 구함
+    cursor.execute(f"""
+        SELECT speetto_type, change_seq, changed_at, changed_rows, ({selected}) AS selected
+        FROM speetto_type_changes
+        ORDER BY change_seq ASC, speetto_type ASC
+    """, params)
+    columns = ("speetto_type", "change_seq", "changed_at", "changed_rows", "selected")
+    rows = [row if isinstance(row, dict) else dict(zip(columns, row)) for row in cursor.fetchall()]
+    next_cursor = max([int(r["change_seq"]) for r in rows] + [after_seq or 0])
+    types = [{c: r[c] for c in columns[:-1]} for r in rows if r["selected"]]
+    return types, next_cursor
@@ -0,0 +1,205 @@
+"""
+스피또 재고 소진 시계열 (speetto_stock_snapshots)
+- speetto_status는 최신 잔여 수량(rankN_left_count) / 출고율(stocking_rate)만 덮어쓰므로
+  1등 등이 얼마나 빨리 소진되는지 추정할 이력이 남지 않습니다.
+- sync_speetto_status가 동기화할 때마다 게임(종류+회차)별 직전 스냅샷과 비교해
+  값이 바뀐 게임만 한 행씩 추가합니다 (append-only, 변화가 없으면 행도 없음).
+- API(/speetto/depletion)는 일/주 단위 버킷의 마지막 스냅샷만 SQL에서 골라(다운샘플)
+  소진 곡선 + 등수별 잔여율/소진 속도 추정을 계산합니다.
+- 크롤러(speetto_status_crawler.py)와 API(flask/app.py)가 같이 쓰는 모듈이므로 커서만 받습니다.
+"""
+from datetime import timedelta
+
+RANKS = range(1, 7)
+TRACKED = ["stocking_rate"] + [f"rank{i}_left_count" for i in RANKS]
+
+# 다운샘플 버킷: 이름 → 버킷 키 SQL
+BUCKETS = {
+    "day": "DATE(captured_at)",
+    "week": "YEARWEEK(captured_at, 3)",  # ISO 주 (월요일 시작)
+}
+
+
+def ensure_table(cursor):
+    """
+    테이블 생성 확인
+    ⚠️ DDL은 MySQL에서 암묵적 커밋을 일으키므로 트랜잭션 시작 전에 호출하세요.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS speetto_stock_snapshots (
+      id BIGINT AUTO_INCREMENT PRIMARY KEY,
+      speetto_type VARCHAR(64) NOT NULL,
+      round INT NOT NULL,
+      captured_at DATETIME NOT NULL,
+      stocking_rate DECIMAL(5,2) NULL,
+      rank1_left_count INT NULL,
+      rank2_left_count INT NULL,
+      rank3_left_count INT NULL,
+      rank4_left_count INT NULL,
+      rank5_left_count INT NULL,
+      rank6_left_count INT NULL,
+      KEY idx_game_id (speetto_type, round, id),
+      KEY idx_captured_at (captured_at)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def _rate(value):
+    """출고율("95.58", "95.58%", 95.58 등) → 소수 둘째 자리 float (해석 불가 시 None)"""
+    if value is None:
+        return None
+    try:
+        return round(float(str(value).replace("%", "").strip()), 2)
+    except ValueError:
+        return None
+
+
+def snapshot_values(mapped_data):
+    """mapped_data(speetto_status 컬럼 dict) → TRACKED 순서 튜플"""
+    values = [_rate(mapped_data.get("stocking_rate"))]
+    for i in RANKS:
+        left = mapped_data.get(f"rank{i}_left_count")
+        values.append(int(left) if left is not None else None)
+    return tuple(values)
+
+
+def latest_snapshots(cursor):
+    """{(speetto_type, round): 마지막 스냅샷의 TRACKED 튜플}"""
+    cursor.execute(f"""
+        SELECT s.speetto_type, s.round, {', '.join('s.' + c for c in TRACKED)}
+        FROM speetto_stock_snapshots s
+        JOIN (SELECT MAX(id) AS id FROM speetto_stock_snapshots GROUP BY speetto_type, round) m
+          ON m.id = s.id
+    """)
+    latest = {}
+    for row in cursor.fetchall():
+        if isinstance(row, dict):
+            key = (row["speetto_type"], int(row["round"]))
+            values = [row[c] for c in TRACKED]
+        else:
+            key = (row[0], int(row[1]))
+            values = list(row[2:])
+        values[0] = _rate(values[0])
+        latest[key] = tuple(values)
+    return latest
+
+
+def append_deltas(cursor, mapped_rows):
+    """
+    직전 스냅샷과 값이 다른 게임만 스냅샷 추가 (호출한 쪽 트랜잭션과 함께 커밋됨)
+    - 반환: 추가한 행 수
+    """
+    latest = latest_snapshots(cursor)
+    rows = []
+    for mapped_data in mapped_rows:
+        if mapped_data.get("round") is None:
+            continue
+        values = snapshot_values(mapped_data)
+        if latest.get((mapped_data["speetto_type"], mapped_data["round"])) != values:
+            rows.append((mapped_data["speetto_type"], mapped_data["round"], *values))
+    if rows:
+        cursor.executemany(
+            f"INSERT INTO speetto_stock_snapshots (speetto_type, round, captured_at, {', '.join(TRACKED)}) "
+            f"VALUES (%s, %s, NOW(), {', '.join(['%s'] * len(TRACKED))})",
+            rows,
+        )
+    return len(rows)
+
+
+def _bucket_start(captured_at, bucket):
+    day = captured_at.date()
+    return day - timedelta(days=day.weekday()) if bucket == "week" else day
+
+
+def _estimates(points, totals):
+    """
+    등수별 잔여율 / 하루 소진 수 / 소진까지 남은 일수 추정
+    - 소진 속도는 첫 버킷 → 마지막 버킷 사이의 평균 (데이터가 1개 버킷뿐이면 None)
+    """
+    first, last = points[0], points[-1]
+    days = (last["captured_at"] - first["captured_at"]).total_seconds() / 86400
+    ranks = {}
+    for i in RANKS:
+        key = f"rank{i}_left_count"
+        left = last[key]
+        if left is None:
+            continue
+        total = totals.get(f"rank{i}_total_count")
+        per_day = None
+        if days > 0 and first[key] is not None:
+            per_day = round((first[key] - left) / days, 4)
+        ranks[f"rank{i}"] = {
+            "left": left,
+            "total": total,
+            "remaining_rate": round(left / total * 100, 2) if total else None,
+            "depleted_per_day": per_day,
+            "days_to_empty": round(left / per_day, 1) if per_day and per_day > 0 else None,
+        }
+    stocking_per_day = None
+    if days > 0 and first["stocking_rate"] is not None and last["stocking_rate"] is not None:
+        stocking_per_day = round((last["stocking_rate"] - first["stocking_rate"]) / days, 4)
+    return {"span_days": round(days, 2), "stocking_rate_per_day": stocking_per_day, "ranks": ranks}
+
+
+def depletion_curves(cursor, bucket="day", speetto_type=None, round_no=None):
+    """
+    게임별 소진 곡선 (버킷마다 마지막 스냅샷 1개) + 추정치
+    - 반환: [{"speetto_type", "round", "bucket", "points": [...], "estimates": {...}}, ...]
+    """
+    where, params = [], []
+    if speetto_type:
+        where.append("speetto_type = %s")
+        params.append(speetto_type)
+    if round_no is not None:
+        where.append("round = %s")
+        params.append(round_no)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    # 다운샘플은 DB에서: 게임 × 버킷마다 MAX(id) 1행만 가져옴
+    cursor.execute(f"""
+        SELECT s.speetto_type, s.round, s.captured_at, {', '.join('s.' + c for c in TRACKED)}
+        FROM speetto_stock_snapshots s
+        JOIN (
+            SELECT MAX(id) AS id FROM speetto_stock_snapshots {where_sql}
+            GROUP BY speetto_type, round, {BUCKETS[bucket]}
+        ) b ON b.id = s.id
+        ORDER BY s.speetto_type DESC, s.round DESC, s.id ASC
+    """, params)
+    columns = ["speetto_type", "round", "captured_at"] + TRACKED
+    games = {}
+    for row in cursor.fetchall():
+        if not isinstance(row, dict):
+            row = dict(zip(columns, row))
+        point = {c: row[c] for c in columns[2:]}
+        point["stocking_rate"] = _rate(point["stocking_rate"])
+        games.setdefault((row["speetto_type"], int(row["round"])), []).append(point)
+    if not games:
+        return []
+
+    # 등수별 전체 수량은 현재 speetto_status 기준
+    total_columns = [f"rank{i}_total_count" for i in RANKS]
+    cursor.execute(f"SELECT speetto_type, round, {', '.join(total_columns)} FROM speetto_status")
+    totals = {}
+    for row in cursor.fetchall():
+        if not isinstance(row, dict):
+            row = dict(zip(["speetto_type", "round"] + total_columns, row))
+        totals[(row["speetto_type"], int(row["round"]))] = row
+
+    result = []
+    for (name, round_value), points in games.items():
+        result.append({
+            "speetto_type": name,
+            "round": round_value,
+            "bucket": bucket,
+            "points": [
+                {
+                    "date": _bucket_start(p["captured_at"], bucket).isoformat(),
+                    "captured_at": p["captured_at"].isoformat(),
+                    # 없는 등수(종류별 최대 등수 초과)는 빼서 응답 크기를 줄임
+                    **{c: p[c] for c in TRACKED if p[c] is not None or c == "stocking_rate"},
+                }
+                for p in points
+            ],
+            "estimates": _estimates(points, totals.get((name, round_value), {})),
+        })
+    return result
@@ -1,8 +1,16 @@
-import requests
 import pymysql
 import re
+import time
 import urllib.parse
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import dataset_version
+import http_client
+import rate_limit
+import response_blobs
+import speetto_changes
+import speetto_history
 
 # --- DB 설정 ---
 DB_CONFIG = {
@@ -75,21 +83,77 @@ def encode_url_safe(path):
     safe_path = urllib.parse.quote(path)
     return f"{base_domain}{safe_path}"
 
-def sync_speetto_status():
-    session = requests.Session()
-    session.headers.update({
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36",
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": "https://www.dhlottery.co.kr/st/pblcnDsctn"
-    })
+# 상세 조회 동시 요청 설정
+MAX_WORKERS = 8          # 동시에 진행할 상세 요청 수
+MIN_INTERVAL = 0.05      # 요청 시작 간 최소 간격(초) — 서버 부담을 줄이기 위한 예의상 제한 (초당 최대 20건)
+
+# speetto_status 저장 컬럼 (순서 고정 → executemany 튜플)
+COLUMNS = [
+    "speetto_type", "round", "sales_end_date", "publish_qty", "stocking_rate", "image_source", "data_chg_dt",
+] + [f"rank{i}_{field}" for i in range(1, 7) for field in ("prize", "total_count", "left_count")]
+
+UPSERT_SQL = (
+    f"INSERT INTO speetto_status ({', '.join(COLUMNS)}) VALUES ({', '.join(['%s'] * len(COLUMNS))}) "
+    f"ON DUPLICATE KEY UPDATE {', '.join(f'{k}=VALUES({k})' for k in COLUMNS if k not in ['speetto_type', 'round'])}"
+)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36",
+    "Accept": "application/json, text/javascript, */*; q=0.01",
+    "X-Requested-With": "XMLHttpRequest",
+    "Referer": "https://www.dhlottery.co.kr/st/pblcnDsctn"
+}
+
+def fetch_detail(limiter, sn):
+    """상세 1건 (selectPblcnDsctnDtl.do) → result dict (실패 시 빈 dict)"""
+    detail_url = f"https://www.dhlottery.co.kr/st/selectPblcnDsctnDtl.do?ntslWnSn={sn}"
+    detail_res = http_client.get(detail_url, headers=HEADERS, timeout=10, limiter=limiter)
+    return detail_res.json().get('data', {}).get('result', {})
+
+def map_detail(data):
+    """상세 응답 → speetto_status 컬럼 dict"""
+    speetto_name = data.get("stGmTypeNm", "")
+    
+    # ✅ 종류별 최대 등수 설정
+    if "2000" in speetto_name:
+        max_rank = 6
+    elif "1000" in speetto_name:
+        max_rank = 5
+    elif "500" in speetto_name:
+        max_rank = 4
+    else:
+        max_rank = 6 # 기본값
+
+    mapped_data = {
+        "speetto_type": speetto_name,
+        "round": to_int_or_none(data.get("stEpsd")),
+        "sales_end_date": data.get("stNtslEndDt"),
+        "publish_qty": to_int_or_none(data.get("pblcnQty")),
+        "stocking_rate": data.get("stSpmtRt"),
+        "image_source": encode_url_safe(data.get("tm1StWnImgStrgPathNm")),
+        "data_chg_dt": format_date(data.get("dataChgDt"))
+    }
+
+    # ✅ 1~6등 매핑 (종류별 등수 제한 적용)
+    for i in range(1, 7):
+        if i <= max_rank:
+            mapped_data[f"rank{i}_prize"] = parse_prize(data.get(f"stRnk{i}GdsLstcCharCn"))
+            mapped_data[f"rank{i}_total_count"] = to_int_or_none(data.get(f"stRnk{i}WnQty"))
+            mapped_data[f"rank{i}_left_count"] = to_int_or_none(data.get(f"stIvtRnk{i}Qty"))
+        else:
+            # ✅ 해당 등수가 없는 경우 명시적으로 None(NULL) 처리
+            mapped_data[f"rank{i}_prize"] = None
+            mapped_data[f"rank{i}_total_count"] = None
+            mapped_data[f"rank{i}_left_count"] = None
+    return mapped_data
 
+def sync_speetto_status():
     try:
         print("1️⃣ 판매중인 스피또 목록 수집 중...")
         list_url = "https://www.dhlottery.co.kr/st/selectPblcnDsctn.do"
         payload = {"gdsType": "", "gdsPrice": "", "gdsStatus": "판매중"}
         
-        list_res = session.get(list_url, params=payload, timeout=10)
+        list_res = http_client.get(list_url, params=payload, headers=HEADERS, timeout=10)
         list_data = list_res.json()
         
         items = list_data.get('data', {}).get('list', [])
@@ -99,69 +163,69 @@ def sync_speetto_status():
             return
 
         print(f"✅ 총 {len(items)}개의 스피또 발견. 상세 데이터 수집 시작...")
-
-        conn = pymysql.connect(**DB_CONFIG)
-        cur = conn.cursor()
-
-        for item in items:
-            sn = item.get('ntslWnSn')
-            detail_url = f"https://www.dhlottery.co.kr/st/selectPblcnDsctnDtl.do?ntslWnSn={sn}"
-            detail_res = session.get(detail_url, timeout=10)
-            data = detail_res.json().get('data', {}).get('result', {})
-
-            if not data:
-                print(f"⚠️ {sn} 상세 데이터 수집 실패")
-                continue
-
-            speetto_name = data.get("stGmTypeNm", "")
-            
-            # ✅ 종류별 최대 등수 설정
-            if "2000" in speetto_name:
-                max_rank = 6
-            elif "1000" in speetto_name:
-                max_rank = 5
-            elif "500" in speetto_name:
-                max_rank = 4
-            else:
-                max_rank = 6 # 기본값
-
-            mapped_data = {
-                "speetto_type": speetto_name,
-                "round": to_int_or_none(data.get("stEpsd")),
-                "sales_end_date": data.get("stNtslEndDt"),
-                "publish_qty": to_int_or_none(data.get("pblcnQty")),
-                "stocking_rate": data.get("stSpmtRt"),
-                "image_source": encode_url_safe(data.get("tm1StWnImgStrgPathNm")),
-                "data_chg_dt": format_date(data.get("dataChgDt"))
-            }
-
-            # ✅ 1~6등 매핑 (종류별 등수 제한 적용)
-            for i in range(1, 7):
-                if i <= max_rank:
-                    mapped_data[f"rank{i}_prize"] = parse_prize(data.get(f"stRnk{i}GdsLstcCharCn"))
-                    mapped_data[f"rank{i}_total_count"] = to_int_or_none(data.get(f"stRnk{i}WnQty"))
-                    mapped_data[f"rank{i}_left_count"] = to_int_or_none(data.get(f"stIvtRnk{i}Qty"))
-                else:
-                    # ✅ 해당 등수가 없는 경우 명시적으로 None(NULL) 처리
-                    mapped_data[f"rank{i}_prize"] = None
-                    mapped_data[f"rank{i}_total_count"] = None
-                    mapped_data[f"rank{i}_left_count"] = None
-
-            # SQL 작성 및 실행
-            cols = ', '.join(mapped_data.keys())
-            vals = ', '.join(['%s'] * len(mapped_data))
-            updates = ', '.join([f"{k}=VALUES({k})" for k in mapped_data.keys() if k not in ['speetto_type', 'round']])
-            
-            sql = f"INSERT INTO speetto_status ({cols}) VALUES ({vals}) ON DUPLICATE KEY UPDATE {updates}"
-            cur.execute(sql, list(mapped_data.values()))
-            
-            print(f"   ∟ 업데이트 완료: {mapped_data['speetto_type']} {mapped_data['round']}회")
-
-        conn.close()
+        started = time.perf_counter()
+
+        # 2️⃣ 상세 데이터 동시 수집 (http_client 공용 세션 keep-alive, 요청 간격 제한)
+        limiter = rate_limit.AdaptiveRateLimiter(1 / MIN_INTERVAL)
+        sns = [item.get('ntslWnSn') for item in items]
+        mapped_rows = []
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(sns))) as pool:
+            futures = {pool.submit(fetch_detail, limiter, sn): sn for sn in sns}
+            for fut in as_completed(futures):
+                sn = futures[fut]
+                try:
+                    data = fut.result()
+                except Exception as e:
+                    print(f"⚠️ {sn} 상세 데이터 수집 실패: {e}")
+                    continue
+                if not data:
+                    print(f"⚠️ {sn} 상세 데이터 수집 실패")
+                    continue
+                mapped_data = map_detail(data)
+                mapped_rows.append(mapped_data)
+                print(f"   ∟ 수집 완료: {mapped_data['speetto_type']} {mapped_data['round']}회")
+        print(f"⏱️ 상세 {len(mapped_rows)}/{len(sns)}건 수집 ({time.perf_counter() - started:.2f}s)")
+        http_client.print_metrics()
+
+        # 3️⃣ 내용 해시가 바뀐 행 + 재고 스냅샷 변화분만 한 트랜잭션에서 일괄 저장
+        changed_types = []
+        if mapped_rows:
+            conn = pymysql.connect(**DB_CONFIG)
+            try:
+                with conn.cursor() as cur:
+                    # DDL은 암묵적 커밋이 일어나므로 트랜잭션 시작 전에 확인
+                    speetto_changes.ensure_tables(cur)
+                    speetto_history.ensure_table(cur)
+                    dataset_version.ensure_table(cur)
+                conn.begin()
+                with conn.cursor() as cur:
+                    changed = speetto_changes.changed_only(cur, mapped_rows, COLUMNS)
+                    if changed:
+                        cur.executemany(UPSERT_SQL, [tuple(m[k] for k in COLUMNS) for m, _ in changed])
+                        changed_types = speetto_changes.record_changes(cur, changed)
+                    snapshots = speetto_history.append_deltas(cur, mapped_rows)
+                    if snapshots and not changed:
+                        # 바뀐 행이 있으면 record_changes가 이미 버전을 올림 (변경 번호로 사용)
+                        dataset_version.bump_versions(cur, dataset_version.SPEETTO_STATUS)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            print(f"💾 변경 {len(changed)}/{len(mapped_rows)}건 저장 (변경 종류: {', '.join(changed_types) or '없음'}), "
+                  f"재고 스냅샷 {snapshots}건 추가")
+
+        if not changed_types:
+            print("\n🎯 변경된 데이터가 없어 저장을 건너뛰었습니다.")
+            return
         print("\n🎯 모든 데이터가 종류별 등수 제한을 포함하여 성공적으로 업데이트되었습니다.")
 
+        # /speetto/status 응답 사전 생성 (바뀐 행이 있을 때만)
+        response_blobs.materialize_quietly(response_blobs.SPEETTO_STATUS)
+
     except Exception as e:
         print(f"❌ 오류 발생: {e}")
 
 if __name__ == "__main__":
-    sync_speetto_status()
\ No newline at end of file
+    sync_speetto_status()
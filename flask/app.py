@@ -1,11 +1,33 @@
 from flask import Flask, jsonify, request, Response
+import os
+import sys
+import threading
 import pymysql
+import numpy as np
 import json
 from datetime import datetime, date
-from decimal import Decimal
 from werkzeug.middleware.proxy_fix import ProxyFix
 import logging
 
+from db_pool import ConnectionPool
+from response_cache import RoundResponseCache, DatasetVersionWatcher, ScheduledResponseCache, MaterializedBlobStore
+from draw_schedule import LOTTO_SCHEDULE, PENSION_SCHEDULE
+
+# code/ 폴더의 공용 모듈(크롤러와 함께 쓰는 모듈) 경로 추가
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+import dataset_version
+import response_blobs
+import lotto_codec
+import lotto_index
+import lotto_gaps
+import speetto_changes
+import speetto_history
+from api_formatters import (
+    format_speetto_status_result,
+    format_pension_result,
+    format_lotto_numbers_result,
+)
+
 app = Flask(__name__)
 
 # 1. 로드밸런서 설정 (앞에 LB가 1대 있을 때)
@@ -37,30 +59,191 @@ DB_CONFIG = {
     'cursorclass': pymysql.cursors.DictCursor
 }
 
+# ✅ 워커(프로세스)별 커넥션 풀: 요청마다 TCP + 인증 핸드셰이크를 하지 않도록 재사용
+DB_POOL = ConnectionPool(
+    DB_CONFIG,
+    min_size=2,          # 워커 기동 후 첫 요청 시 미리 열어둘 개수
+    max_size=10,         # 워커당 최대 동시 커넥션
+    borrow_timeout=5.0,  # 풀이 꽉 찼을 때 최대 대기(초)
+    max_age=1800,        # 30분 지난 커넥션은 재생성 (MySQL wait_timeout 대비)
+    ping_interval=30,    # 30초 이상 놀던 커넥션은 ping으로 생존 확인
+)
+
+
+# ✅ 회차별 응답 캐시 (워커별 LRU)
+# - 확정 회차: 만료 없음 + strong ETag + Cache-Control: immutable
+# - 없는 회차(404): 60초만 기억 (추첨 직후 곧 생길 수 있으므로)
+LOTTO_ROUND_CACHE = RoundResponseCache(max_entries=2048, negative_ttl=60)
+PENSION_ROUND_CACHE = RoundResponseCache(max_entries=1024, negative_ttl=60)
+
+ROUND_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MISSING_ROUND_CACHE_CONTROL = "public, max-age=60"
+
+
+def make_round_response(entry):
+    """캐시된 회차 응답 → Flask Response (If-None-Match 일치 시 304)"""
+    resp = app.response_class(response=entry.body, status=entry.status, mimetype='application/json')
+    if entry.status == 200:
+        resp.set_etag(entry.etag)
+        resp.headers['Cache-Control'] = ROUND_CACHE_CONTROL
+        return resp.make_conditional(request)
+    resp.headers['Cache-Control'] = MISSING_ROUND_CACHE_CONTROL
+    return resp
+
+
+# ✅ "최신" 계열 응답 캐시
+# - 다음 추첨(+2시간 여유)까지 유효, 크롤러가 새 회차를 커밋하면(dataset_versions) 즉시 무효
+# - 버전 확인은 워커당 10초에 한 번만 DB 조회
+def _load_dataset_versions():
+    with DB_POOL.connection() as conn:
+        with conn.cursor() as cursor:
+            return dataset_version.fetch_versions(cursor)
+
+
+DATASET_VERSIONS = DatasetVersionWatcher(_load_dataset_versions, interval=10.0)
+
+LOTTO_LATEST_CACHE = ScheduledResponseCache(LOTTO_SCHEDULE, [dataset_version.LOTTO], DATASET_VERSIONS)
+PENSION_LATEST_CACHE = ScheduledResponseCache(PENSION_SCHEDULE, [dataset_version.PENSION], DATASET_VERSIONS)
+LOTTO_GAPS_CACHE = ScheduledResponseCache(
+    LOTTO_SCHEDULE, [dataset_version.LOTTO, dataset_version.LOTTO_GAP_STATS], DATASET_VERSIONS)
+LOTTO_GAP_DISTRIBUTION_CACHE = ScheduledResponseCache(LOTTO_SCHEDULE, [dataset_version.LOTTO], DATASET_VERSIONS)
+LOTTO_NUMBER_STATS_CACHE = ScheduledResponseCache(
+    LOTTO_SCHEDULE, [dataset_version.LOTTO, dataset_version.LOTTO_NUMBER_STATS], DATASET_VERSIONS)
+PENSION_DIGIT_STATS_CACHE = ScheduledResponseCache(
+    PENSION_SCHEDULE, [dataset_version.PENSION, dataset_version.PENSION_DIGIT_STATS], DATASET_VERSIONS)
+# 스피또는 추첨 일정이 없으므로 주 1회 만료 + 동기화로 값이 바뀌면(speetto_status 버전) 즉시 무효
+SPEETTO_DEPLETION_CACHE = ScheduledResponseCache(LOTTO_SCHEDULE, [dataset_version.SPEETTO_STATUS], DATASET_VERSIONS)
+
+
+def serve_scheduled(cache, build):
+    """
+    캐시에 있으면 그대로, 없으면 build() -> (body bytes, status)로 만들어 저장 후 반환
+    - ETag를 붙이고 Cache-Control: no-cache로 내려서 클라이언트는 304 재검증만 하도록 함
+    """
+    key = request.full_path
+    token = cache.token()
+    entry = cache.get(key, token)
+    if entry is None:
+        body, status = build()
+        entry = cache.put(key, token, body, status)
+
+    resp = app.response_class(response=entry.body, status=entry.status, mimetype='application/json')
+    resp.headers['Cache-Control'] = 'no-cache'
+    if entry.status == 200:
+        resp.set_etag(entry.etag)
+        return resp.make_conditional(request)
+    return resp
+
+
+# ✅ 대용량 목록 응답: 수집 배치가 미리 만들어둔 blob(원본 + gzip)을 메모리에서 바로 반환
+def _load_blob(name):
+    with DB_POOL.connection() as conn:
+        with conn.cursor() as cursor:
+            return response_blobs.load_blob(cursor, name)
+
+
+BLOB_STORE = MaterializedBlobStore(_load_blob, DATASET_VERSIONS, response_blobs.version_name)
+
+
+def serve_materialized(name, content_type='application/json'):
+    """
+    사전 생성된 blob 응답
+    - Accept-Encoding에 gzip이 있으면 미리 압축해둔 바이트를 그대로 전송
+    - blob이 아직 없으면(배치 미실행) 기존처럼 DB에서 직접 만들어 응답
+    - 200이 아닌 응답(NO_DATA 등)은 포맷과 관계없이 JSON 에러 본문이므로 application/json
+    """
+    blob = BLOB_STORE.get(name)
+    if blob is None:
+        app.logger.warning(f"materialized blob '{name}' 없음: DB에서 직접 생성합니다.")
+        with DB_POOL.connection() as conn:
+            with conn.cursor() as cursor:
+                body, status = response_blobs.BUILDERS[name](cursor)
+        return app.response_class(
+            response=body, status=status, content_type=content_type if status == 200 else 'application/json',
+        )
+
+    use_gzip = request.accept_encodings.quality('gzip') > 0
+    resp = app.response_class(
+        response=blob.body_gzip if use_gzip else blob.body,
+        status=blob.status,
+        content_type=content_type if blob.status == 200 else 'application/json',
+    )
+    resp.headers['Vary'] = 'Accept-Encoding'
+    resp.headers['Cache-Control'] = 'no-cache'
+    if use_gzip:
+        resp.headers['Content-Encoding'] = 'gzip'
+    if blob.status == 200:
+        # 압축 여부에 따라 바이트가 다르므로 ETag도 구분 (strong ETag 규칙)
+        resp.set_etag(blob.etag + ('-gz' if use_gzip else ''))
+        return resp.make_conditional(request)
+    return resp
+
+
+# ✅ 로또 분석용 비트마스크 인덱스 (워커별 1개, 새 회차가 커밋되면 그 회차만 추가 로딩)
+LOTTO_INDEX = lotto_index.LottoIndex()
+_lotto_index_lock = threading.Lock()
+_lotto_index_version = [None]
+
+
+def current_lotto_index():
+    """
+    현재 인덱스 스냅샷 (읽기 전용, 요청 처리 중에 다른 스레드가 갱신해도 이 객체는 그대로)
+    - 버전이 바뀌면 refresh: 새 회차만 추가, 중간 회차 백필/삭제는 감지해 전체 재로딩
+    """
+    version = DATASET_VERSIONS.versions().get(dataset_version.LOTTO, 0)
+    with _lotto_index_lock:
+        if _lotto_index_version[0] != version or not len(LOTTO_INDEX):
+            with DB_POOL.connection() as conn:
+                with conn.cursor() as cursor:
+                    LOTTO_INDEX.refresh(cursor)
+            _lotto_index_version[0] = version
+    return LOTTO_INDEX.snapshot()
+
+
+def query_rows_body(sql, params=None, formatter=None):
+    """목록 조회 결과를 JSON 바이트로 (serve_scheduled의 build용)"""
+    with DB_POOL.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+    if formatter:
+        rows = [formatter(row) for row in rows]
+    return json.dumps(rows, ensure_ascii=False).encode('utf-8'), 200
+
 
 @app.route('/lotto/latest', methods=['GET'])
 def get_latest_lotto():
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
-            with conn.cursor() as cursor:
-                # ✅ lotto 대신 lotto_numbers 테이블에서 최신 회차(ltEpsd DESC) 1건 조회
-                cursor.execute("SELECT * FROM lotto_numbers ORDER BY ltEpsd DESC LIMIT 1")
-                result = cursor.fetchone()
-                
-                if result:
-                    # ✅ 기존에 정의하신 상세 포맷터(format_lotto_numbers_result)를 사용하여 반환
-                    formatted = format_lotto_numbers_result(result)
-                    return jsonify(formatted)
-                
-                return jsonify({"error": "No data found"}), 404
+        return serve_scheduled(LOTTO_LATEST_CACHE, build_latest_lotto)
     except Exception as e:
         print(f"Error in /lotto/latest: {e}")
         return jsonify({"error": str(e)}), 500
 
+
+def build_latest_lotto():
+    with DB_POOL.connection() as conn:
+        with conn.cursor() as cursor:
+            # ✅ lotto 대신 lotto_numbers 테이블에서 최신 회차(ltEpsd DESC) 1건 조회
+            cursor.execute("SELECT * FROM lotto_numbers ORDER BY ltEpsd DESC LIMIT 1")
+            result = cursor.fetchone()
+
+    if result:
+        # ✅ 기존에 정의하신 상세 포맷터(format_lotto_numbers_result)를 사용하여 반환
+        formatted = format_lotto_numbers_result(result)
+        return app.json.dumps(formatted).encode('utf-8'), 200
+
+    return app.json.dumps({"error": "No data found"}).encode('utf-8'), 404
+
+
 @app.route('/lotto/round/<int:round_number>', methods=['GET'])
 def get_lotto_by_round(round_number):
+    # ✅ 추첨이 끝난 회차는 바뀌지 않으므로 직렬화된 응답을 캐시에서 바로 반환
+    cached = LOTTO_ROUND_CACHE.get(round_number)
+    if cached is not None:
+        return make_round_response(cached)
+
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
+        with DB_POOL.connection() as conn:
             with conn.cursor() as cursor:
                 # 1. lotto_numbers 테이블에서 해당 회차 데이터만 정확히 조회
                 sql = """
@@ -74,24 +257,26 @@ def get_lotto_by_round(round_number):
                 cursor.execute(sql, (round_number,))
                 row = cursor.fetchone()
                 
-                if row:
-                    # 2. 요청하신 JSON 형식으로 직접 매핑
-                    result = {
-                        "round": row["ltEpsd"],
-                        "draw_date": row["ltRflYmd"].isoformat() if isinstance(row["ltRflYmd"], (date, datetime)) else str(row["ltRflYmd"]),
-                        "numbers": [
-                            row["tm1WnNo"], row["tm2WnNo"], row["tm3WnNo"], 
-                            row["tm4WnNo"], row["tm5WnNo"], row["tm6WnNo"]
-                        ],
-                        "bonus": row["bnsWnNo"],
-                        "first_prize_amt": int(row["rnk1WnAmt"]),
-                        "first_winner_count": int(row["rnk1WnNope"]),
-                        "second_prize_amt": int(row["rnk2WnAmt"]),
-                        "total_sales": int(row["wholEpsdSumNtslAmt"])
-                    }
-                    return jsonify(result)
-                
-                return jsonify({"error": "Round not found"}), 404
+        if row:
+            # 2. 요청하신 JSON 형식으로 직접 매핑
+            result = {
+                "round": row["ltEpsd"],
+                "draw_date": row["ltRflYmd"].isoformat() if isinstance(row["ltRflYmd"], (date, datetime)) else str(row["ltRflYmd"]),
+                "numbers": [
+                    row["tm1WnNo"], row["tm2WnNo"], row["tm3WnNo"], 
+                    row["tm4WnNo"], row["tm5WnNo"], row["tm6WnNo"]
+                ],
+                "bonus": row["bnsWnNo"],
+                "first_prize_amt": int(row["rnk1WnAmt"]),
+                "first_winner_count": int(row["rnk1WnNope"]),
+                "second_prize_amt": int(row["rnk2WnAmt"]),
+                "total_sales": int(row["wholEpsdSumNtslAmt"])
+            }
+            entry = LOTTO_ROUND_CACHE.put(round_number, app.json.dumps(result).encode('utf-8'))
+        else:
+            # 아직 없는 회차는 짧게만 기억 (negative cache)
+            entry = LOTTO_ROUND_CACHE.put(round_number, app.json.dumps({"error": "Round not found"}).encode('utf-8'), status=404)
+        return make_round_response(entry)
     except Exception as e:
         app.logger.error(f"Error in /lotto/round/{round_number}: {e}")
         return jsonify({"error": str(e)}), 500
@@ -100,7 +285,7 @@ def get_lotto_by_round(round_number):
 @app.route('/lotto/count', methods=['GET'])
 def get_lotto_count():
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
+        with DB_POOL.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT COUNT(*) as count FROM lotto")
                 result = cursor.fetchone()
@@ -126,19 +311,33 @@ def get_lotto_gaps():
             ORDER BY number ASC
         """
 
-        with pymysql.connect(**DB_CONFIG) as conn:
-            with conn.cursor(pymysql.cursors.DictCursor) as cursor:
-                cursor.execute(sql)
-                rows = cursor.fetchall()
+        # ✅ date/datetime 객체를 JSON 전송 가능하도록 문자열로 변환 (format_speetto_status_result)
+        return serve_scheduled(LOTTO_GAPS_CACHE, lambda: query_rows_body(sql, formatter=format_speetto_status_result))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # ✅ date/datetime 객체를 JSON 전송 가능하도록 문자열로 변환
-        formatted_rows = [format_speetto_status_result(row) for row in rows]
 
-        return app.response_class(
-            response=json.dumps(formatted_rows, ensure_ascii=False),
-            status=200,
-            mimetype='application/json'
-        )
+@app.route('/lotto/gaps/distribution', methods=['GET'])
+def get_lotto_gap_distribution():
+    """
+    로또 번호별 과거 미출현 간격 분포 (최대/평균/백분위 + 현재 미출현 기간의 백분위)
+    - 쿼리 파라미터: includeBonus=true 면 보너스 번호 출현도 포함
+    - 메모리 비트마스크 인덱스(LottoIndex)에서 계산하므로 요청마다 SQL 없음
+    """
+    try:
+        include_bonus = request.args.get('includeBonus', default='false').lower() == 'true'
+
+        def build():
+            index = current_lotto_index()
+            payload = {
+                "include_bonus": include_bonus,
+                "latest_round": index.last_round,
+                "percentiles": list(lotto_gaps.PERCENTILES),
+                "data": lotto_gaps.gap_distribution(index, include_bonus),
+            }
+            return json.dumps(payload, ensure_ascii=False).encode('utf-8'), 200
+
+        return serve_scheduled(LOTTO_GAP_DISTRIBUTION_CACHE, build)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -163,7 +362,7 @@ def get_ai_recommendations():
             LIMIT %s
         """
 
-        with pymysql.connect(**DB_CONFIG) as conn:
+        with DB_POOL.connection() as conn:
             with conn.cursor(pymysql.cursors.DictCursor) as cursor:
                 cursor.execute(sql, (limit,))
                 rows = cursor.fetchall()
@@ -250,15 +449,7 @@ def get_lotto_number_stats():
     """
 
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
-            with conn.cursor() as cur:
-                cur.execute(sql, params)
-                rows = cur.fetchall()
-        return app.response_class(
-            response=json.dumps(rows, ensure_ascii=False),
-            status=200,
-            mimetype='application/json'
-        )
+        return serve_scheduled(LOTTO_NUMBER_STATS_CACHE, lambda: query_rows_body(sql, params))
     except Exception as e:
         # 필요하면 아래 주석을 잠시 해제해서 실제 SQL/파라미터를 확인하세요.
         # return jsonify({"error": str(e), "sql": sql, "params": params}), 500
@@ -274,7 +465,7 @@ def get_shops_in_bounds():
         max_lng = float(request.args.get('maxLng'))
         lotto_only = request.args.get('lottoOnly') == 'true'
 
-        with pymysql.connect(**DB_CONFIG) as conn:
+        with DB_POOL.connection() as conn:
             with conn.cursor(pymysql.cursors.DictCursor) as cursor:
                 # 기본 쿼리
                 query = """
@@ -373,7 +564,7 @@ def get_total_shops_in_bounds():
         # SQL 파라미터 매핑
         params = [min_lat, max_lat, min_lng, max_lng, mw_lotto, mw_pension, mw_speetto]
 
-        with pymysql.connect(**DB_CONFIG) as conn:
+        with DB_POOL.connection() as conn:
             with conn.cursor(pymysql.cursors.DictCursor) as cursor:
                 cursor.execute(sql, params)
                 results = cursor.fetchall()
@@ -395,35 +586,39 @@ def get_total_shops_in_bounds():
 @app.route('/pension/latest', methods=['GET'])
 def get_latest_pension():
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT * FROM pension ORDER BY round DESC LIMIT 1")
-                result = cursor.fetchone()
-                if result:
-                    return app.response_class(
-                        response=json.dumps(format_pension_result(result), ensure_ascii=False, indent=2),
-                        status=200,
-                        mimetype='application/json'
-                    )
-                return jsonify({"error": "No data found"}), 404
+        return serve_scheduled(PENSION_LATEST_CACHE, build_latest_pension)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def build_latest_pension():
+    with DB_POOL.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT * FROM pension ORDER BY round DESC LIMIT 1")
+            result = cursor.fetchone()
+    if result:
+        body = json.dumps(format_pension_result(result), ensure_ascii=False, indent=2)
+        return body.encode('utf-8'), 200
+    return app.json.dumps({"error": "No data found"}).encode('utf-8'), 404
+
+
 @app.route('/pension/round/<int:round_number>', methods=['GET'])
 def get_pension_by_round(round_number):
+    cached = PENSION_ROUND_CACHE.get(round_number)
+    if cached is not None:
+        return make_round_response(cached)
+
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
+        with DB_POOL.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT * FROM pension WHERE round = %s", (round_number,))
                 result = cursor.fetchone()
-                if result:
-                    return app.response_class(
-                        response=json.dumps(format_pension_result(result), ensure_ascii=False, indent=2),
-                        status=200,
-                        mimetype='application/json'
-                    )
-                return jsonify({"error": "Round not found"}), 404
+        if result:
+            body = json.dumps(format_pension_result(result), ensure_ascii=False, indent=2)
+            entry = PENSION_ROUND_CACHE.put(round_number, body.encode('utf-8'))
+        else:
+            entry = PENSION_ROUND_CACHE.put(round_number, app.json.dumps({"error": "Round not found"}).encode('utf-8'), status=404)
+        return make_round_response(entry)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -431,7 +626,7 @@ def get_pension_by_round(round_number):
 @app.route('/pension/count', methods=['GET'])
 def get_pension_count():
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
+        with DB_POOL.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT COUNT(*) as count FROM pension")
                 result = cursor.fetchone()
@@ -511,15 +706,7 @@ def get_pension_digit_stats():
     """
 
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(sql, params)
-                rows = cursor.fetchall()
-        return app.response_class(
-            response=json.dumps(rows, ensure_ascii=False),
-            status=200,
-            mimetype='application/json'
-        )
+        return serve_scheduled(PENSION_DIGIT_STATS_CACHE, lambda: query_rows_body(sql, params))
     except Exception as e:
         # 필요하면 아래 주석을 잠시 해제해서 실제 SQL/파라미터를 확인하세요.
         # return jsonify({"error": str(e), "sql": sql, "params": params}), 500
@@ -529,64 +716,144 @@ def get_pension_digit_stats():
 
 @app.route("/speetto", methods=["GET"])
 def get_speetto_data():
-    conn = pymysql.connect(**DB_CONFIG)
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
-    cursor.execute("""
-        SELECT 
-            speetto_type, round,
-            first_prize, first_count,
-            second_prize, second_count,
-            third_prize, third_count,
-            stocking_rate,
-            image_source
-        FROM speetto
-        ORDER BY speetto_type DESC, round DESC
-    """)
-    rows = cursor.fetchall()
-    conn.close()
-
-    # 한글 깨짐 방지용 JSON 직렬화
-    response_json = json.dumps(rows, ensure_ascii=False)
+    # speetto 테이블은 외부에서 채워져 갱신 시점을 알 수 없으므로 blob/캐시 없이 매번 DB에서 조회
+    with DB_POOL.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT 
+                    speetto_type, round,
+                    first_prize, first_count,
+                    second_prize, second_count,
+                    third_prize, third_count,
+                    stocking_rate,
+                    image_source
+                FROM speetto
+                ORDER BY speetto_type DESC, round DESC
+            """)
+            rows = cursor.fetchall()
+
+    # 한글 깨짐 방지용 JSON 직렬화 (Decimal 등은 변환, 데이터가 없어도 빈 배열)
+    response_json = json.dumps([format_speetto_status_result(row) for row in rows], ensure_ascii=False)
     return Response(response_json, content_type='application/json; charset=utf-8')
 
 @app.route('/speetto/status', methods=['GET'])
 def get_speetto_status():
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
-            with conn.cursor() as cursor:
-                # DictCursor 설정이 DB_CONFIG에 있으므로 row는 딕셔너리 형태입니다.
-                sql = "SELECT * FROM speetto_status ORDER BY speetto_type DESC, round DESC"
-                cursor.execute(sql)
-                results = cursor.fetchall()
-                
-                if results:
-                    # 모든 행에 대해 향상된 포맷터 적용
-                    formatted_results = [format_speetto_status_result(row) for row in results]
-                    
-                    return app.response_class(
-                        response=json.dumps(formatted_results, ensure_ascii=False),
-                        status=200,
-                        mimetype='application/json'
-                    )
-                return jsonify({"error": "No data found"}), 404
+        # 모든 행에 format_speetto_status_result가 적용된 응답 (response_blobs.build_speetto_status)
+        return serve_materialized(response_blobs.SPEETTO_STATUS)
     except Exception as e:
         # 에러 발생 시 로그를 찍어주면 디버깅이 더 쉬워집니다.
         print(f"Error in /speetto/status: {e}")
         return jsonify({"error": str(e)}), 500
 
-def format_speetto_status_result(row):
+
+
+def parse_since(value):
+    """
+    ?since= 값 → (datetime, epoch 초) 중 하나만 채운 튜플, 비어 있으면 (None, None)
+    - epoch 초와 시간대가 붙은 ISO 시각은 epoch 초로 돌려주고, DB에서 FROM_UNIXTIME으로 세션 시간대 시각으로 바꿈
+      (Flask 호스트의 로컬 시간대는 DB 세션 시간대와 다를 수 있음)
+    - 시간대 없는 ISO 시각은 changed_at과 같은 DB 로컬 시각으로 보고 그대로 비교
+    """
+    if not value:
+        return None, None
+    if value.replace('.', '', 1).isdigit():
+        return None, float(value)
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo:
+        return None, parsed.timestamp()
+    return parsed, None
+
+
+@app.route('/speetto/status/changes', methods=['GET'])
+def get_speetto_status_changes():
     """
-    모든 컬럼을 순회하며 JSON 직렬화가 불가능한 객체(datetime, date, decimal)를 변환합니다.
+    cursor(또는 since) 이후 내용이 바뀐 스피또 종류와 그 종류의 speetto_status 행만 반환
+    - cursor: 이전 응답의 next_cursor (변경 번호, 권장) — 이 번호보다 나중에 커밋된 변경만
+    - since: 첫 동기화용 시각 필터 (ISO 8601 또는 epoch 초), cursor가 있으면 무시
+    - 둘 다 생략 시 전체, 응답의 next_cursor를 다음 요청의 cursor로 사용
+    - 변경 번호/시각은 speetto_status_crawler.py가 해시가 바뀐 행을 쓸 때만 갱신 (speetto_changes.py)
+      시각(changed_at)은 INSERT 시점이라 커밋 전에 읽은 요청에서 빠질 수 있으므로 폴링에는 cursor를 쓰세요.
+    - 항목 포맷은 /speetto/status와 동일 (format_speetto_status_result)
     """
-    for key, value in row.items():
-        # datetime 또는 date 객체인 경우 ISO 포맷 문자열로 변환
-        if isinstance(value, (datetime, date)):
-            row[key] = value.isoformat()
-        # Decimal 객체인 경우 float으로 변환
-        elif isinstance(value, Decimal):
-            row[key] = float(value)
-    return row
+    after_seq = request.args.get('cursor')
+    if after_seq is not None:
+        if not after_seq.isdigit():
+            return jsonify({"error": "cursor는 0 이상의 정수여야 합니다."}), 400
+        after_seq = int(after_seq)
+    since_raw = request.args.get('since')
+    try:
+        since, since_epoch = parse_since(since_raw)
+    except ValueError:
+        return jsonify({"error": "since는 ISO 8601 시각 또는 epoch 초여야 합니다."}), 400
+
+    try:
+        with DB_POOL.connection() as conn:
+            with conn.cursor() as cursor:
+                types, next_cursor = speetto_changes.changed_types(
+                    cursor, after_seq=after_seq, since=since, since_epoch=since_epoch,
+                )
+                rows = []
+                if types:
+                    names = [t['speetto_type'] for t in types]
+                    cursor.execute(
+                        f"SELECT * FROM speetto_status WHERE speetto_type IN ({','.join(['%s'] * len(names))}) "
+                        "ORDER BY speetto_type DESC, round DESC",
+                        names,
+                    )
+                    rows = cursor.fetchall()
+
+        payload = {
+            "cursor": after_seq,
+            "since": since_raw if after_seq is None else None,
+            "next_cursor": next_cursor,
+            "changed_types": [
+                {
+                    "speetto_type": t['speetto_type'],
+                    "change_seq": t['change_seq'],
+                    "changed_at": t['changed_at'].isoformat(),
+                    "changed_rows": t['changed_rows'],
+                }
+                for t in types
+            ],
+            "count": len(rows),
+            "data": [format_speetto_status_result(row) for row in rows],
+        }
+        resp = app.response_class(
+            response=json.dumps(payload, ensure_ascii=False),
+            status=200,
+            mimetype='application/json'
+        )
+        resp.headers['Cache-Control'] = 'no-cache'
+        return resp
+    except Exception as e:
+        print(f"Error in /speetto/status/changes: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/speetto/depletion', methods=['GET'])
+def get_speetto_depletion():
+    """
+    스피또 게임별 재고 소진 곡선 + 등수별 잔여율/소진 속도 추정 (speetto_history.py)
+    - bucket: day(기본) / week — 버킷마다 마지막 스냅샷 1개만 내려줌
+    - type: 스피또 종류(예: 스피또2000), round: 회차 (생략 시 전체)
+    """
+    bucket = request.args.get('bucket', default='day')
+    if bucket not in speetto_history.BUCKETS:
+        return jsonify({"error": f"bucket은 {', '.join(speetto_history.BUCKETS)} 중 하나여야 합니다."}), 400
+    speetto_type = request.args.get('type')
+    round_no = request.args.get('round', type=int)
+
+    def build():
+        with DB_POOL.connection() as conn:
+            with conn.cursor() as cursor:
+                games = speetto_history.depletion_curves(cursor, bucket, speetto_type, round_no)
+        return json.dumps({"bucket": bucket, "count": len(games), "data": games}, ensure_ascii=False).encode('utf-8'), 200
 
+    try:
+        return serve_scheduled(SPEETTO_DEPLETION_CACHE, build)
+    except Exception as e:
+        print(f"Error in /speetto/depletion: {e}")
+        return jsonify({"error": str(e)}), 500
 
 @app.route('/lotto/all', methods=['GET'])
 def get_all_lotto():
@@ -594,52 +861,15 @@ def get_all_lotto():
     모든 로또 회차 데이터를 한 번에 조회
     - 안드로이드 앱에서 초기 실행 시 전체 데이터를 로컬에 저장하기 위한 용도
     - 최신 회차부터 내림차순 정렬
+    - 초기 저장 이후에는 /lotto/numbers/since/<보유 최고 회차>로 새 회차만 받으세요.
+    - lotto_numbers 수집 후처리(post_ingest.py legacy → blobs 단계)에서 만들어진 blob을 그대로 반환 (format_lotto_result 적용)
     """
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
-            with conn.cursor() as cursor:
-                # 모든 회차 정보를 최신순으로 가져옴
-                cursor.execute("SELECT * FROM lotto ORDER BY round DESC")
-                results = cursor.fetchall()
-                
-                if results:
-                    # 기존에 작성하신 format_lotto_result 함수를 활용하여 데이터 가공
-                    formatted_results = [format_lotto_result(row) for row in results]
-                    
-                    # 한글 깨짐 방지 및 효율적인 전송을 위해 json.dumps 사용
-                    return app.response_class(
-                        response=json.dumps(formatted_results, ensure_ascii=False),
-                        status=200,
-                        mimetype='application/json'
-                    )
-                return jsonify({"error": "No data found"}), 404
+        return serve_materialized(response_blobs.LOTTO_ALL)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-def format_pension_result(row):
-    return {
-        "round": row["round"],
-        "draw_date": row["draw_date"].isoformat(),
-        "first_prize": row.get("first_prize"),
-        "second_prize": row.get("second_prize"),
-        "third_prize": row.get("third_prize"),
-        "fourth_prize": row.get("fourth_prize"),
-        "fifth_prize": row.get("fifth_prize"),
-        "sixth_prize": row.get("sixth_prize"),
-        "seventh_prize": row.get("seventh_prize"),
-        "bonus": row.get("bonus")
-    }
-
-def format_lotto_result(row):
-    return {
-        "round": row["round"],
-        "draw_date": row["draw_date"].isoformat(),
-        "numbers": [row["num1"], row["num2"], row["num3"], row["num4"], row["num5"], row["num6"]],
-        "bonus": row["bonus"]
-    }
-
-
 
 #@app.route('/api/interviews', methods=['GET'])
 #def get_winner_interviews():
@@ -648,7 +878,7 @@ def format_lotto_result(row):
 #    - 최신순(id DESC)으로 정렬하여 반환합니다.
 #    """
 #    try:
-#        with pymysql.connect(**DB_CONFIG) as conn:
+#        with DB_POOL.connection() as conn:
 #            with conn.cursor() as cursor:
 #                # 1. 모든 인터뷰 데이터를 최신순으로 조회
 #                sql = """
@@ -686,62 +916,114 @@ def format_lotto_result(row):
 #        return jsonify({"error": str(e)}), 500
 
 
+# /lotto/numbers/all 표현 선택: ?format= 우선, 없으면 Accept 헤더 (기본은 기존 JSON)
+LOTTO_NUMBERS_FORMATS = {
+    'json': (response_blobs.LOTTO_NUMBERS_ALL, 'application/json'),
+    'columnar': (response_blobs.LOTTO_NUMBERS_COLUMNAR, lotto_codec.COLUMNAR_MEDIA_TYPE),
+    'packed': (response_blobs.LOTTO_NUMBERS_PACKED, lotto_codec.PACKED_MEDIA_TYPE),
+}
+
+
 @app.route('/lotto/numbers/all', methods=['GET'])
 def get_all_lotto_numbers():
+    """
+    전체 당첨번호 (최신 회차부터 내림차순)
+    - format=json(기본) | columnar | packed  또는
+      Accept: application/vnd.lotto645.columnar+json | application/vnd.lotto645.packed
+    - columnar/packed 레이아웃과 디코더는 code/lotto_codec.py 참고
+    """
+    fmt = (request.args.get('format') or '').lower()
+    if fmt not in LOTTO_NUMBERS_FORMATS:
+        best = request.accept_mimetypes.best_match(
+            [media for _, media in LOTTO_NUMBERS_FORMATS.values()], default='application/json')
+        fmt = next(k for k, (_, media) in LOTTO_NUMBERS_FORMATS.items() if media == best)
+    blob_name, media_type = LOTTO_NUMBERS_FORMATS[fmt]
+
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
+        # ✅ format_lotto_numbers_result 적용 결과를 각 포맷으로 미리 만든 blob (lotto_numbers_crawler.py가 갱신)
+        resp = serve_materialized(blob_name, content_type=media_type)
+        resp.headers['Vary'] = 'Accept, Accept-Encoding'
+        return resp
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def delta_sync_response(since, latest, dataset, load_rows, formatter):
+    """
+    안드로이드 로컬 저장소 증분 동기화 공통 응답
+    - 클라이언트가 가진 최고 회차(since) 이후 회차만 반환
+    - version: 데이터셋 버전 토큰 (최신 회차 + dataset_versions 버전), ETag로도 내려줌
+    - 이미 최신이면 MAX() 한 번 조회 + 100바이트 남짓 응답으로 끝남
+    """
+    latest = latest or 0
+    version = f"r{latest}-v{DATASET_VERSIONS.versions().get(dataset, 0)}"
+    rows = load_rows() if latest > since else []
+    payload = {
+        "since": since,
+        "latest_round": latest,
+        "version": version,
+        "count": len(rows),
+        "data": [formatter(row) for row in rows],
+    }
+    resp = app.response_class(
+        response=json.dumps(payload, ensure_ascii=False),
+        status=200,
+        mimetype='application/json'
+    )
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.set_etag(f"{since}-{version}")
+    return resp.make_conditional(request)
+
+
+@app.route('/lotto/numbers/since/<int:round_number>', methods=['GET'])
+def get_lotto_numbers_since(round_number):
+    """
+    round_number(클라이언트 보유 최고 회차) 이후의 lotto_numbers만 반환 (최신 회차부터 내림차순)
+    - 항목 포맷은 /lotto/numbers/all과 동일 (format_lotto_numbers_result)
+    """
+    try:
+        with DB_POOL.connection() as conn:
             with conn.cursor() as cursor:
-                # ✅ 포인트 1: ltEpsd DESC를 통해 최신 회차부터 내림차순 정렬
-                sql = "SELECT * FROM lotto_numbers ORDER BY ltEpsd DESC"
-                cursor.execute(sql)
-                results = cursor.fetchall()
-                
-                if results:
-                    # ✅ 포인트 2: 기존 앱 호환성 + 누락 데이터 처리 포맷터 적용
-                    formatted_results = [format_lotto_numbers_result(row) for row in results]
-                    
-                    return app.response_class(
-                        response=json.dumps(formatted_results, ensure_ascii=False),
-                        status=200,
-                        mimetype='application/json'
+                # PK(ltEpsd) 인덱스만 보는 조회
+                cursor.execute("SELECT MAX(ltEpsd) AS latest FROM lotto_numbers")
+                latest = cursor.fetchone()['latest']
+
+                def load_rows():
+                    cursor.execute(
+                        "SELECT * FROM lotto_numbers WHERE ltEpsd > %s ORDER BY ltEpsd DESC",
+                        (round_number,)
                     )
-                return jsonify({"error": "No data found"}), 404
+                    return cursor.fetchall()
+
+                return delta_sync_response(round_number, latest, dataset_version.LOTTO,
+                                           load_rows, format_lotto_numbers_result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def format_lotto_numbers_result(row):
-    # 1. 안드로이드 기존 모델 호환용 필드
-    formatted = {
-        "round": row["ltEpsd"],
-        "draw_date": row["ltRflYmd"].isoformat() if isinstance(row["ltRflYmd"], (date, datetime)) else row["ltRflYmd"],
-        "numbers": [row["tm1WnNo"], row["tm2WnNo"], row["tm3WnNo"], row["tm4WnNo"], row["tm5WnNo"], row["tm6WnNo"]],
-        "bonus": row["bnsWnNo"]
-    }
 
-    # 2. 이월(0명)과 누락(데이터 없음) 판별 로직
-    # 모든 주요 수치가 0이면 데이터가 아예 없는 '누락' 회차로 판단합니다.
-    is_data_missing = (row.get("rnk1WnAmt", 0) == 0 and 
-                       row.get("rnk1WnNope", 0) == 0 and 
-                       row.get("wholEpsdSumNtslAmt", 0) == 0)
-
-    # 3. 추가 상세 정보 처리 (누락 시 null 반환)
-    detail_keys = {
-        "first_prize_amt": "rnk1WnAmt",
-        "first_winner_count": "rnk1WnNope",
-        "second_prize_amt": "rnk2WnAmt",
-        "total_sales": "wholEpsdSumNtslAmt"
-    }
+@app.route('/pension/since/<int:round_number>', methods=['GET'])
+def get_pension_since(round_number):
+    """
+    round_number(클라이언트 보유 최고 회차) 이후의 연금복권 회차만 반환 (최신 회차부터 내림차순)
+    - 항목 포맷은 /pension/round와 동일 (format_pension_result)
+    """
+    try:
+        with DB_POOL.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT MAX(round) AS latest FROM pension")
+                latest = cursor.fetchone()['latest']
 
-    for key, db_col in detail_keys.items():
-        val = row.get(db_col, 0)
-        if is_data_missing:
-            formatted[key] = None # 데이터 자체가 없으면 null
-        elif db_col == "rnk1WnNope" and val == 0:
-            formatted[key] = 0    # 다른 데이터는 있는데 당첨자만 0이면 '이월'
-        else:
-            formatted[key] = int(val) if isinstance(val, (int, float, Decimal)) else val
-            
-    return formatted
+                def load_rows():
+                    cursor.execute(
+                        "SELECT * FROM pension WHERE round > %s ORDER BY round DESC",
+                        (round_number,)
+                    )
+                    return cursor.fetchall()
+
+                return delta_sync_response(round_number, latest, dataset_version.PENSION,
+                                           load_rows, format_pension_result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
 
 @app.route('/lotto/carryover/stats', methods=['GET'])
@@ -751,61 +1033,51 @@ def get_carryover_stats():
     Case 1: 보너스 번호가 이번 주 당첨 번호에 포함된 경우를 완전히 배제 (순수 메인 이월)
     Case 2: 보너스 번호 포함 여부 상관없이 개수만 체크
     Case 3: 반드시 보너스 번호가 포함된 경우만 체크
+    - lotto_carryover_history + FIND_IN_SET 조회 대신 메모리 비트마스크 인덱스(LottoIndex)로 계산
     """
     try:
         count = request.args.get('count', default=1, type=int)
         include_bonus = request.args.get('includeBonus', default='false').lower() == 'true'
         must_include_bonus = request.args.get('mustIncludeBonus', default='false').lower() == 'true'
 
-        with pymysql.connect(**DB_CONFIG) as conn:
-            with conn.cursor() as cursor:
-                # 1. 컬럼 결정
-                target_col = "match_count_with_bonus" if include_bonus else "match_count"
-
-                # 2. CASE별 엄격한 조건절(WHERE) 구성
-                where_clause = f"WHERE h.{target_col} = %s"
-                
-                if must_include_bonus: # [CASE 3] 보너스 번호 포함 필수
-                    where_clause += " AND FIND_IN_SET(n.bnsWnNo, h.matched_numbers) > 0"
-                
-                elif not include_bonus: # [CASE 1] 보너스 번호가 포함된 사례를 '절대' 내보내지 않음
-                    # 메인끼리 count개가 겹쳤더라도, 만약 보너스 번호까지 겹쳤다면 리스트에서 탈락시킵니다.
-                    where_clause += " AND NOT (FIND_IN_SET(n.bnsWnNo, h.matched_numbers) > 0)"
-
-                # 3. 히스토리 조회 (최근 10건)
-                sql_history = f"""
-                    SELECT h.round, h.matched_numbers 
-                    FROM lotto_carryover_history h
-                    LEFT JOIN lotto_numbers n ON n.ltEpsd = h.round - 1
-                    {where_clause}
-                    ORDER BY h.round DESC LIMIT 10
-                """
-                cursor.execute(sql_history, (count,))
-                history = cursor.fetchall()
-
-                # 4. 확률 계산 (실시간 카운트 방식)
-                # CASE 1과 CASE 3는 조건이 까다로우므로 전체 로그를 기준으로 실시간 계산하여 정확도를 높입니다.
-                cursor.execute("SELECT COUNT(*) as total FROM lotto_carryover_history")
-                total_all = cursor.fetchone()['total']
-
-                if total_all > 0:
-                    cursor.execute(f"""
-                        SELECT COUNT(*) as target_cnt 
-                        FROM lotto_carryover_history h
-                        JOIN lotto_numbers n ON n.ltEpsd = h.round - 1
-                        {where_clause}
-                    """, (count,))
-                    occ_count = cursor.fetchone()['target_cnt']
-                    actual_prob = round((occ_count / total_all) * 100, 2)
-                else:
-                    actual_prob = 0
-
-                return jsonify({
-                    "case": 3 if must_include_bonus else (2 if include_bonus else 1),
-                    "actual_prob": f"{actual_prob}%",
-                    "history": history,
-                    "description": "보너스 번호 이월 사례가 제외된 순수 메인 이월 통계입니다." if not include_bonus else ""
-                })
+        index = current_lotto_index()
+        prev, curr = index.next_round_pairs()
+
+        # 1. 회차별 이월 마스크 (history 테이블의 matched_numbers = 지난주 메인+보너스 ∩ 이번 주 메인)
+        matched = index.masks(include_bonus=True)[prev] & index.main[curr]
+        bonus_carried = (index.bonus[prev] & index.main[curr]) != 0
+
+        # 2. 컬럼 결정 (match_count_with_bonus vs match_count)
+        match_count = lotto_index.popcount(matched if include_bonus else index.main[prev] & index.main[curr])
+
+        # 3. CASE별 엄격한 조건
+        hit = match_count == count
+        if must_include_bonus:  # [CASE 3] 보너스 번호 포함 필수
+            hit &= bonus_carried
+        elif not include_bonus:  # [CASE 1] 보너스 번호가 포함된 사례를 '절대' 내보내지 않음
+            # 메인끼리 count개가 겹쳤더라도, 만약 보너스 번호까지 겹쳤다면 리스트에서 탈락시킵니다.
+            hit &= ~bonus_carried
+
+        # 4. 히스토리 (최근 10건)
+        hit_pos = np.nonzero(hit)[0][::-1][:10]
+        history = [
+            {
+                "round": int(index.rounds[curr[i]]),
+                "matched_numbers": ",".join(map(str, lotto_index.numbers_of(matched[i]))),
+            }
+            for i in hit_pos
+        ]
+
+        # 5. 확률 계산 (전체 이월 기록 대비)
+        total_all = len(curr)
+        actual_prob = round((int(hit.sum()) / total_all) * 100, 2) if total_all > 0 else 0
+
+        return jsonify({
+            "case": 3 if must_include_bonus else (2 if include_bonus else 1),
+            "actual_prob": f"{actual_prob}%",
+            "history": history,
+            "description": "보너스 번호 이월 사례가 제외된 순수 메인 이월 통계입니다." if not include_bonus else ""
+        })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -823,7 +1095,7 @@ def get_carryover_stats():
 #         include_bonus = request.args.get('includeBonus', default='true').lower() == 'true'
 #         picks = [int(x.strip()) for x in pick_param.split(',')] if pick_param else []
 
-#         with pymysql.connect(**DB_CONFIG) as conn:
+#         with DB_POOL.connection() as conn:
 #             with conn.cursor() as cursor:
 #                 # 1. 지난주 당첨 번호 가져오기
 #                 cursor.execute("SELECT * FROM lotto_numbers ORDER BY ltEpsd DESC LIMIT 1")
@@ -911,49 +1183,10 @@ def get_all_combo_analysis():
     [분석 테이블 전체 데이터 출력]
     - history_rounds: 최대 5개까지만 포함
     - 정렬: 최신 회차 -> 적중률 높은 순
+    - carryover_init.py 분석 직후 만들어진 blob을 그대로 반환 (format_combo_analysis_result 적용)
     """
     try:
-        with pymysql.connect(**DB_CONFIG) as conn:
-            with conn.cursor() as cursor:
-                # 1. 전체 데이터 조회 (최신 회차부터, 적중률 높은 순으로)
-                sql = """
-                    SELECT 
-                        id, target_round, combo_count, include_bonus, 
-                        numbers_combo, total_occur, total_appear, 
-                        hit_rate, history_rounds, created_at
-                    FROM lotto_carryover_combo_analysis
-                    ORDER BY target_round DESC, hit_rate DESC
-                """
-                cursor.execute(sql)
-                rows = cursor.fetchall()
-
-                full_list = []
-                for row in rows:
-                    # 2. history_rounds 가공 (쉼표 분리 -> 5개 제한)
-                    raw_history = row['history_rounds'].split(',') if row['history_rounds'] else []
-                    # 빈 문자열('')이 들어있는 경우 필터링 및 최대 5개 슬라이싱
-                    clean_history = [int(r) for r in raw_history if r.strip()][:5]
-
-                    full_list.append({
-                        "id": row['id'],
-                        "target_round": row['target_round'],
-                        "combo_count": row['combo_count'],
-                        "include_bonus": bool(row['include_bonus']),
-                        "numbers": [int(n) for n in row['numbers_combo'].split(',')],
-                        "total_occur": row['total_occur'],
-                        "total_appear": row['total_appear'],
-                        "hit_rate": f"{row['hit_rate']}%",
-                        "history_sample": clean_history, # 최대 5개
-                        "history_count": len(raw_history), # 전체 몇 번이었는지 참고용
-                        "created_at": row['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-                    })
-
-                return jsonify({
-                    "status": "success",
-                    "total_count": len(full_list),
-                    "data": full_list
-                })
-
+        return serve_materialized(response_blobs.CARRYOVER_LIST_ALL)
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -961,8 +1194,8 @@ def get_all_combo_analysis():
 @app.route('/api/promotions', methods=['GET'])
 def get_promotions():
     try:
-        # ✅ get_db_connection() 대신 다른 코드들처럼 DB_CONFIG를 직접 사용합니다.
-        with pymysql.connect(**DB_CONFIG) as conn:
+        # ✅ 다른 라우트와 동일하게 DB_POOL에서 커넥션을 빌려 씁니다.
+        with DB_POOL.connection() as conn:
             with conn.cursor() as cursor:
                 sql = """
                     SELECT 
@@ -1000,6 +1233,33 @@ def get_promotions():
 def health_check():
     return jsonify({"status": "working", "timestamp": datetime.now().isoformat()}), 200
 
+
+@app.route('/health/db-pool', methods=['GET'])
+def db_pool_stats():
+    """
+    현재 워커의 DB 커넥션 풀 상태 (in_use, idle, 대기 횟수/시간 등)
+    - gunicorn 워커마다 풀이 따로 있으므로 pid 기준으로 보세요.
+    """
+    return jsonify(DB_POOL.stats()), 200
+
+
+@app.route('/health/cache', methods=['GET'])
+def response_cache_stats():
+    """현재 워커의 응답 캐시 적중률/항목 수"""
+    return jsonify({
+        "lotto_round": LOTTO_ROUND_CACHE.stats(),
+        "pension_round": PENSION_ROUND_CACHE.stats(),
+        "lotto_latest": LOTTO_LATEST_CACHE.stats(),
+        "pension_latest": PENSION_LATEST_CACHE.stats(),
+        "lotto_gaps": LOTTO_GAPS_CACHE.stats(),
+        "lotto_gap_distribution": LOTTO_GAP_DISTRIBUTION_CACHE.stats(),
+        "lotto_number_stats": LOTTO_NUMBER_STATS_CACHE.stats(),
+        "pension_digit_stats": PENSION_DIGIT_STATS_CACHE.stats(),
+        "speetto_depletion": SPEETTO_DEPLETION_CACHE.stats(),
+        "dataset_versions": DATASET_VERSIONS.versions(),
+        "materialized_blobs": BLOB_STORE.stats(),
+    }), 200
+
 if __name__ == '__main__':
     # host='0.0.0.0'은 외부(로드 밸런서)의 접근을 허용한다는 뜻입니다.
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
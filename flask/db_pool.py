@@ -0,0 +1,255 @@
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+
+
+class PoolTimeout(Exception):
+    """대여 대기 시간(borrow_timeout) 안에 커넥션을 얻지 못했을 때 발생"""
+
+
+class _PooledConnection:
+    """커넥션 + 생성/마지막 사용 시각 메타데이터"""
+
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    gunicorn 워커(프로세스)마다 하나씩 쓰는 pymysql 커넥션 풀
+    - min_size: 워커가 처음 커넥션을 빌릴 때 미리 열어두는 개수
+    - max_size: 동시에 열 수 있는 최대 커넥션 수 (초과 시 반납 대기)
+    - borrow_timeout: 반납 대기 최대 시간(초), 초과 시 PoolTimeout
+    - max_age: 이 시간(초)보다 오래된 커넥션은 닫고 새로 연결 (MySQL wait_timeout 대비)
+    - ping_interval: 이 시간(초) 이상 놀던 커넥션은 대여 전에 ping으로 생존 확인
+    """
+
+    def __init__(self, config, min_size=1, max_size=10, borrow_timeout=5.0,
+                 max_age=1800, ping_interval=30):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("0 <= min_size <= max_size, max_size >= 1 이어야 합니다.")
+
+        # ✅ 읽기 전용 API에서 커넥션을 재사용하므로 autocommit으로 열어야
+        # 이전 요청의 트랜잭션 스냅샷(REPEATABLE READ)에 갇히지 않습니다.
+        self._config = dict(config, autocommit=True)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.borrow_timeout = borrow_timeout
+        self.max_age = max_age
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()
+        self._in_use = 0
+        self._opening = 0  # lock 밖에서 미리 여는 중인 커넥션 수 (max_size 계산에 포함)
+        self._pid = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "borrows": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "discarded": 0,
+        }
+
+    # --- 내부 유틸 ---
+    def _check_pid(self):
+        """
+        fork 이후(gunicorn 워커) 부모의 커넥션을 물려받지 않도록 워커별로 초기화 (lock 보유 상태에서 호출)
+        - 반환: lock 밖에서 미리 열어야 할 커넥션 수 (자리는 _opening으로 예약해 둠)
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return 0
+        # 부모 프로세스 소켓은 닫지 않고(부모 세션에 COM_QUIT가 전송됨) 참조만 버립니다.
+        self._idle = deque()
+        self._in_use = 0
+        self._opening = self.min_size
+        self._pid = pid
+        self._reset_stats()
+        return self.min_size
+
+    def _prefill(self, count):
+        """min_size개를 lock 밖에서 미리 연결 (연결하는 동안 다른 대여를 막지 않음)"""
+        opened = []
+        for _ in range(count):
+            try:
+                opened.append(self._open())
+            except Exception:
+                # DB가 아직 안 떠 있어도 워커는 기동되도록 미리 열기 실패는 무시
+                break
+        with self._cond:
+            self._opening -= count
+            self._idle.extend(opened)
+            self._cond.notify_all()
+
+    def _open(self):
+        """새 커넥션 (lock 밖에서 호출)"""
+        conn = pymysql.connect(**self._config)
+        with self._cond:
+            self._stats["created"] += 1
+        return _PooledConnection(conn)
+
+    @staticmethod
+    def _close_quietly(entry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def _unusable_reason(self, entry):
+        """
+        재사용 불가 사유(통계 키) 또는 None (lock 밖에서 호출 — ping은 DB 왕복이라 느리거나 멈출 수 있음)
+        """
+        now = time.monotonic()
+        if self.max_age and now - entry.created_at > self.max_age:
+            return "recycled"
+        if self.ping_interval is not None and now - entry.last_used > self.ping_interval:
+            try:
+                entry.conn.ping(reconnect=False)
+            except Exception:
+                return "discarded"
+        return None
+
+    # --- 대여 / 반납 ---
+    def acquire(self):
+        """
+        커넥션 1개 대여
+        - lock 안에서는 idle 커넥션을 꺼내거나 새 연결 자리만 예약하고,
+          ping / 새 연결 / 워커 첫 대여 시 미리 열기는 모두 lock 밖에서 합니다.
+          (DB 왕복 1번이 느려도 같은 워커의 다른 대여가 막히지 않음)
+        """
+        deadline = None
+        wait_started = None
+        while True:
+            entry = None
+            with self._cond:
+                prefill = self._check_pid()
+                if not prefill:
+                    while not self._idle and self._in_use + self._opening >= self.max_size:
+                        if deadline is None:
+                            wait_started = time.monotonic()
+                            deadline = wait_started + self.borrow_timeout
+                            self._stats["waits"] += 1
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            self._record_wait(wait_started)
+                            raise PoolTimeout(
+                                f"{self.borrow_timeout}초 안에 DB 커넥션을 얻지 못했습니다. (max_size={self.max_size})"
+                            )
+                        self._cond.wait(remaining)
+                    if self._idle:
+                        entry = self._idle.pop()  # LIFO: 최근에 쓴 커넥션부터 (살아있을 확률 ↑)
+                    # 자리 예약 (꺼낸 커넥션 확인 / 새 연결은 lock 밖에서)
+                    self._in_use += 1
+
+            if prefill:
+                self._prefill(prefill)
+                continue
+
+            if entry is not None:
+                reason = self._unusable_reason(entry)
+                if reason is None:
+                    with self._cond:
+                        self._finish_borrow(wait_started)
+                    return entry
+                self._close_quietly(entry)
+                with self._cond:
+                    self._stats[reason] += 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                continue
+
+            try:
+                entry = self._open()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._finish_borrow(wait_started)
+            return entry
+
+    def _finish_borrow(self, wait_started):
+        self._stats["borrows"] += 1
+        if wait_started is not None:
+            self._record_wait(wait_started)
+
+    def _record_wait(self, wait_started):
+        waited = time.monotonic() - wait_started
+        self._stats["wait_time_total"] += waited
+        self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+
+    def release(self, entry, discard=False):
+        with self._cond:
+            if self._pid != os.getpid():
+                # fork 이전에 빌린 커넥션이 자식에서 반납되는 경우: 풀에 넣지 않음
+                return
+            self._in_use -= 1
+            if discard or entry.conn.open is False:
+                self._stats["discarded"] += 1
+                self._close_quietly(entry)
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        with DB_POOL.connection() as conn: 형태로 사용
+        - 쿼리 중 연결 계열 오류가 나면 해당 커넥션은 풀에 돌려놓지 않고 폐기합니다.
+        """
+        entry = self.acquire()
+        discard = False
+        try:
+            yield entry.conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(entry, discard=discard)
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                self._close_quietly(self._idle.pop())
+
+    def stats(self):
+        """풀 사이징용 지표 (워커 프로세스 단위)"""
+        with self._cond:
+            s = dict(self._stats)
+            idle = len(self._idle) if self._pid == os.getpid() else 0
+            in_use = self._in_use if self._pid == os.getpid() else 0
+        return {
+            "pid": os.getpid(),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "in_use": in_use,
+            "idle": idle,
+            "borrows": s["borrows"],
+            "waits": s["waits"],
+            "wait_time_total_ms": round(s["wait_time_total"] * 1000, 2),
+            "wait_time_avg_ms": round(s["wait_time_total"] * 1000 / s["waits"], 2) if s["waits"] else 0.0,
+            "wait_time_max_ms": round(s["wait_time_max"] * 1000, 2),
+            "timeouts": s["timeouts"],
+            "created": s["created"],
+            "recycled": s["recycled"],
+            "discarded": s["discarded"],
+        }
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone, time as dtime
+
+KST = timezone(timedelta(hours=9))
+
+
+class DrawSchedule:
+    """
+    주 1회 추첨 일정 (KST)
+    - weekday: 0=월 ... 3=목, 5=토
+    - grace: 추첨 후 크롤러가 결과를 수집할 때까지 기다려주는 여유 시간
+    """
+
+    def __init__(self, weekday, draw_time, grace=timedelta(hours=2)):
+        self.weekday = weekday
+        self.draw_time = draw_time
+        self.grace = grace
+
+    def next_draw(self, now=None):
+        """now 이후(초과) 가장 가까운 추첨 시각"""
+        now = now or datetime.now(KST)
+        days = (self.weekday - now.weekday()) % 7
+        candidate = datetime.combine(now.date() + timedelta(days=days), self.draw_time, tzinfo=KST)
+        if candidate <= now:
+            candidate += timedelta(days=7)
+        return candidate
+
+    def cache_deadline(self, now=None):
+        """
+        지금 만든 캐시를 언제까지 써도 되는지
+        - 직전 추첨 후 grace 이내라면 → grace 끝까지만 (곧 새 회차가 들어올 수 있음)
+        - 그 외 → 다음 추첨 + grace
+        """
+        now = now or datetime.now(KST)
+        upcoming = self.next_draw(now)
+        last_draw = upcoming - timedelta(days=7)
+        if now < last_draw + self.grace:
+            return last_draw + self.grace
+        return upcoming + self.grace
+
+    def seconds_until_deadline(self, now=None):
+        now = now or datetime.now(KST)
+        return max(0.0, (self.cache_deadline(now) - now).total_seconds())
+
+
+# 로또 6/45: 매주 토요일 20:35 / 연금복권 720+: 매주 목요일 19:05
+LOTTO_SCHEDULE = DrawSchedule(weekday=5, draw_time=dtime(20, 35))
+PENSION_SCHEDULE = DrawSchedule(weekday=3, draw_time=dtime(19, 5))
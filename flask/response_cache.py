@@ -0,0 +1,233 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def make_etag(body: bytes) -> str:
+    """응답 바이트의 내용 해시 → strong ETag 값 (따옴표는 werkzeug가 붙여줌)"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+class CachedBody:
+    """직렬화가 끝난 응답 본문 + 상태코드 + ETag"""
+
+    __slots__ = ("body", "status", "etag", "expires_at")
+
+    def __init__(self, body: bytes, status: int, expires_at=None):
+        self.body = body
+        self.status = status
+        self.etag = make_etag(body)
+        self.expires_at = expires_at  # None이면 만료 없음 (확정된 회차)
+
+    def is_expired(self, now=None) -> bool:
+        return self.expires_at is not None and (now or time.monotonic()) >= self.expires_at
+
+
+class RoundResponseCache:
+    """
+    회차 번호 → 직렬화된 응답 본문 LRU 캐시 (워커 프로세스 내부)
+    - 추첨이 끝난 회차(200)는 바뀌지 않으므로 만료 없이 보관하고, max_entries 초과 시 오래 안 쓴 것부터 제거
+    - 아직 없는 회차(404)는 negative_ttl 초 동안만 보관 (곧 추첨/수집될 수 있으므로)
+    """
+
+    def __init__(self, max_entries=2048, negative_ttl=60):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry.is_expired():
+                del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key, body: bytes, status=200):
+        expires_at = None
+        if status == 404:
+            expires_at = time.monotonic() + self.negative_ttl
+        entry = CachedBody(body, status, expires_at)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+class DatasetVersionWatcher:
+    """
+    dataset_versions 테이블을 최대 interval 초에 한 번만 읽어 메모리에 들고 있는 감시자
+    - 요청마다 DB를 치지 않으면서도 크롤러의 커밋(버전 증가)을 수 초 안에 반영
+    - loader 실패 시 마지막으로 읽은 버전을 그대로 사용
+    """
+
+    def __init__(self, loader, interval=10.0):
+        self._loader = loader
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._checked_at = None
+
+    def versions(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < self.interval:
+                return self._versions
+            # 동시에 여러 요청이 만료를 봐도 한 번만 읽도록 먼저 시각을 갱신
+            self._checked_at = now
+        try:
+            loaded = self._loader()
+        except Exception:
+            return self._versions
+        with self._lock:
+            self._versions = loaded
+        return loaded
+
+
+class ScheduledResponseCache:
+    """
+    추첨 일정 기반 응답 캐시 ("최신" 계열 엔드포인트용)
+    - 항목은 schedule.cache_deadline() (다음 추첨 + 여유 시간)까지 유효
+    - 의존하는 데이터셋 버전(token)이 바뀌면 즉시 무효 (크롤러가 새 회차 커밋 시)
+    - 키는 쿼리스트링까지 포함한 요청 경로
+    """
+
+    def __init__(self, schedule, datasets, watcher, max_entries=256):
+        self.schedule = schedule
+        self.datasets = tuple(datasets)
+        self.watcher = watcher
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def token(self):
+        versions = self.watcher.versions()
+        return tuple(versions.get(name, 0) for name in self.datasets)
+
+    def get(self, key, token):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] != token or item[1].is_expired():
+                if item is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return item[1]
+
+    def put(self, key, token, body: bytes, status=200):
+        expires_at = time.monotonic() + self.schedule.seconds_until_deadline()
+        entry = CachedBody(body, status, expires_at)
+        with self._lock:
+            self._entries[key] = (token, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "datasets": list(self.datasets),
+                "valid_until": self.schedule.cache_deadline().isoformat(),
+            }
+
+
+class MaterializedBlob:
+    """배치가 미리 만들어둔 응답 (원본 바이트 + gzip 바이트 + 내용 해시)"""
+
+    __slots__ = ("body", "body_gzip", "etag", "status")
+
+    def __init__(self, body: bytes, body_gzip: bytes, content_hash: str, status=200):
+        self.body = body
+        self.body_gzip = body_gzip
+        self.etag = content_hash[:32]
+        self.status = status
+
+
+class MaterializedBlobStore:
+    """
+    api_response_blobs → 워커 메모리
+    - 요청 경로에서는 메모리의 바이트를 그대로 반환 (DB 조회/JSON 직렬화 없음)
+    - dataset_versions의 "blob:<이름>" 버전이 바뀌었을 때만 해당 blob을 다시 읽음
+    - 다시 읽기에 실패하면 마지막으로 읽은 blob을 계속 사용
+    """
+
+    def __init__(self, loader, watcher, version_key):
+        self._loader = loader
+        self.watcher = watcher
+        self._version_key = version_key
+        self._lock = threading.Lock()
+        self._blobs = {}
+        self._loads = 0
+
+    def get(self, name):
+        version = self.watcher.versions().get(self._version_key(name), 0)
+        with self._lock:
+            item = self._blobs.get(name)
+        if item is not None and item[0] == version:
+            return item[1]
+
+        try:
+            row = self._loader(name)
+        except Exception:
+            if item is not None:
+                return item[1]
+            raise
+        if row is None:
+            return None
+
+        blob = MaterializedBlob(bytes(row["body"]), bytes(row["body_gzip"]), row["content_hash"], int(row["status"]))
+        with self._lock:
+            self._blobs[name] = (version, blob)
+            self._loads += 1
+        return blob
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loads": self._loads,
+                "blobs": {
+                    name: {"version": v, "bytes": len(b.body), "gzip_bytes": len(b.body_gzip), "etag": b.etag}
+                    for name, (v, b) in self._blobs.items()
+                },
+            }